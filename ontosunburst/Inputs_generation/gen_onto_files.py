@@ -1,21 +1,118 @@
 import json
+import time
+from typing import Dict, Iterator, List
 import kegg2bipartitegraph.reference as keggr
 from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper.SPARQLExceptions import SPARQLWrapperException
 from padmet.classes.padmetRef import PadmetRef
 from ontosunburst.ontosunburst import METACYC, EC, CHEBI, CHEBI_R, GO_MF, GO_BP, GO_CC, KEGG, \
     ROOTS, CLASSES_SUFFIX, LABELS_SUFFIX
+from ontosunburst.Inputs_generation.obo_parser import read_terms, extract_ontology, \
+    extract_roles_ontology
 
 
 URL = {CHEBI: 'http://localhost:3030/chebi/',
        GO_MF: 'http://localhost:3030/go/'}
 
 GO_ROOTS = [GO_CC, GO_BP, GO_MF]
+CHEBI_CLASSES_ROOT = 'CHEBI:24431'
+
+# SPARQL paging : results fetched PAGE_SIZE bindings at a time, each page retried MAX_RETRIES times
+PAGE_SIZE = 10000
+MAX_RETRIES = 3
+RETRY_DELAY = 5
+# Comment line of the queries WHERE clause replaced by the filter of the next page bindings
+CURSOR_FILTER = '# CURSOR FILTER'
 
 
 def get_output_path(prefix, version, suffix):
     return prefix + '__' + version + '__' + suffix
 
 
+def write_ontology_files(prefix, version, d_ontology, d_labels):
+    output_classes = get_output_path(prefix, version, CLASSES_SUFFIX)
+    output_labels = get_output_path(prefix, version, LABELS_SUFFIX)
+    with open(output_classes, 'w') as oc, open(output_labels, 'w') as ol:
+        json.dump(d_ontology, oc, indent=1)
+        json.dump(d_labels, ol, indent=1)
+
+
+def query_page(sparql: SPARQLWrapper, retries: int) -> List[Dict]:
+    """ Returns the bindings of a query page, the query being retried on endpoint or connection
+    errors (with increasing delays).
+    """
+    for attempt in range(retries + 1):
+        try:
+            return sparql.query().convert()['results']['bindings']
+        except (SPARQLWrapperException, OSError) as e:
+            if attempt == retries:
+                raise
+            print(f'Query page failed ({e}), retry {attempt + 1}/{retries}')
+            time.sleep(RETRY_DELAY * 2 ** attempt)
+
+
+def query_pages(query: str, endpoint_url: str, keys: List[str], page_size: int = PAGE_SIZE,
+                retries: int = MAX_RETRIES) -> Iterator[Dict]:
+    """ Iterates over the bindings of a query, fetched page by page : only one page of results is
+    held in memory at a time. Pages are ordered by the keys variables and each page starts after
+    the last binding of the previous one (keyset paging), the endpoint never skips the results of
+    the previous pages as with OFFSET.
+
+    Parameters
+    ----------
+    query: str
+        SPARQL query without ORDER BY clause, with the CURSOR_FILTER line in its WHERE clause
+    endpoint_url: str
+        Endpoint URL of Jena Fuseki server
+    keys: List[str]
+        Names of the variables ordering the bindings, a binding must be identified by its keys
+    page_size: int, optional (default=PAGE_SIZE)
+        Number of bindings per page
+    retries: int, optional (default=MAX_RETRIES)
+        Number of retries of a failed page
+
+    Yields
+    ------
+    Dict
+        Query result binding
+    """
+    sparql = SPARQLWrapper(endpoint_url)
+    sparql.setReturnFormat(JSON)
+    order = ' '.join(f'STR(?{k})' for k in keys)
+    page_query = query
+    while True:
+        sparql.setQuery(f'{page_query}\nORDER BY {order}\nLIMIT {page_size}')
+        bindings = query_page(sparql, retries)
+        yield from bindings
+        if len(bindings) < page_size:
+            return
+        last = [bindings[-1][k]['value'] for k in keys]
+        page_query = query.replace(CURSOR_FILTER, get_cursor_filter(keys, last))
+
+
+def get_cursor_filter(keys: List[str], values: List[str]) -> str:
+    """ Returns the SPARQL FILTER keeping the bindings after values in the keys order.
+
+    Parameters
+    ----------
+    keys: List[str]
+        Names of the variables ordering the bindings
+    values: List[str]
+        Keys values of the last binding of the previous page
+
+    Returns
+    -------
+    str
+        FILTER clause
+    """
+    conditions = list()
+    for i, key in enumerate(keys):
+        terms = [f'STR(?{k}) = {json.dumps(v)}' for k, v in zip(keys[:i], values[:i])]
+        terms.append(f'STR(?{key}) > {json.dumps(values[i])}')
+        conditions.append(f'({" && ".join(terms)})')
+    return f'FILTER({" || ".join(conditions)})'
+
+
 def get_sub_roots(dict_onto):
     sub_roots = set()
     for v in dict_onto.values():
@@ -100,19 +197,21 @@ def generate_kegg_input():
 # CHEBI CLASS
 # ==================================================================================================
 
-def chebi_onto_query(endpoint_url: str) -> dict:
-    """ Returns the query results to get the chebi classes ontology tree from the role root
+def chebi_onto_query(endpoint_url: str, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+    """ Returns the query results iterator to get the chebi classes ontology tree from the role root
     (Root_id = 24431)
 
     Parameters
     ----------
     endpoint_url: str
         Endpoint URL of Jena Fuseki server
+    page_size: int, optional (default=PAGE_SIZE)
+        Number of results fetched per query page
 
     Returns
     -------
-    dict
-        Dictionary of query results
+    Iterator[Dict]
+        Iterator over the query results (fetched page by page)
     """
     query = f"""
             PREFIX rdfs:<http://www.w3.org/2000/01/rdf-schema#>
@@ -131,20 +230,17 @@ def chebi_onto_query(endpoint_url: str) -> dict:
                 ?child rdfs:subClassOf ?parent .
                 ?parent rdfs:label ?parentLabel .
                 ?parent oboInOwl:id ?parentId . 
+                {CURSOR_FILTER}
             }}
             """
-    sparql = SPARQLWrapper(endpoint_url)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return query_pages(query, endpoint_url, ['childId', 'parentId', 'childLabel', 'parentLabel'],
+                       page_size)
 
 
-def generate_chebi_input(version='', url_endpoint=URL[CHEBI]):
+def generate_chebi_input(version='', url_endpoint=URL[CHEBI], page_size=PAGE_SIZE):
     d_ontology = dict()
     d_labels = dict()
-    results = chebi_onto_query(url_endpoint)
-    for result in results['results']['bindings']:
+    for result in chebi_onto_query(url_endpoint, page_size):
         child_label = result['childLabel']['value']
         parent_label = result['parentLabel']['value']
         child_id = result['childId']['value']
@@ -166,19 +262,22 @@ def generate_chebi_input(version='', url_endpoint=URL[CHEBI]):
 
 # CHEBI ROLES
 # ==================================================================================================
-def chebi_role_onto_query(endpoint_url: str) -> dict:
-    """ Returns the query results to get the chebi roles ontology tree from the role root
+def chebi_role_onto_query(endpoint_url: str, page_size: int = PAGE_SIZE) \
+        -> Iterator[Dict]:
+    """ Returns the query results iterator to get the chebi roles ontology tree from the role root
     (Root_id = 50906)
 
     Parameters
     ----------
     endpoint_url: str
         Endpoint URL of Jena Fuseki server
+    page_size: int, optional (default=PAGE_SIZE)
+        Number of results fetched per query page
 
     Returns
     -------
-    dict
-        Dictionary of query results
+    Iterator[Dict]
+        Iterator over the query results (fetched page by page)
     """
     query = f"""
             PREFIX rdfs:<http://www.w3.org/2000/01/rdf-schema#>
@@ -197,27 +296,30 @@ def chebi_role_onto_query(endpoint_url: str) -> dict:
                 ?childRole rdfs:subClassOf ?parentRole .
                 ?parentRole rdfs:label ?parentRoleLabel .
                 ?parentRole oboInOwl:id ?parentRoleId . 
+                {CURSOR_FILTER}
             }}
             """
-    sparql = SPARQLWrapper(endpoint_url)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return query_pages(query, endpoint_url,
+                       ['childRoleId', 'parentRoleId', 'childRoleLabel', 'parentRoleLabel'],
+                       page_size)
 
 
-def chebi_chem_roles_query(endpoint_url: str) -> dict:
-    """ Returns the query results to get the chebi roles associated to each chemical having a role.
+def chebi_chem_roles_query(endpoint_url: str, page_size: int = PAGE_SIZE) \
+        -> Iterator[Dict]:
+    """ Returns the query results iterator to get the chebi roles associated to each chemical
+    having a role.
 
     Parameters
     ----------
     endpoint_url: str
         Endpoint URL of Jena Fuseki server
+    page_size: int, optional (default=PAGE_SIZE)
+        Number of results fetched per query page
 
     Returns
     -------
-    dict
-        Dictionary of query results
+    Iterator[Dict]
+        Iterator over the query results (fetched page by page)
     """
     query = f"""
             PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
@@ -236,20 +338,17 @@ def chebi_chem_roles_query(endpoint_url: str) -> dict:
                 ?role oboInOwl:id ?roleId .
                 ?chem rdfs:label ?chemLabel .
                 ?chem oboInOwl:id ?chemId .
+                {CURSOR_FILTER}
             }}
             """
-    sparql = SPARQLWrapper(endpoint_url)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return query_pages(query, endpoint_url, ['chemId', 'roleId', 'chemLabel', 'roleLabel'],
+                       page_size)
 
 
-def generate_chebi_roles_input(version='', url_endpoint=URL[CHEBI]):
+def generate_chebi_roles_input(version='', url_endpoint=URL[CHEBI], page_size=PAGE_SIZE):
     d_roles_ontology = dict()
     d_labels = dict()
-    results = chebi_role_onto_query(url_endpoint)
-    for result in results['results']['bindings']:
+    for result in chebi_role_onto_query(url_endpoint, page_size):
         child_role_label = result['childRoleLabel']['value']
         parent_role_label = result['parentRoleLabel']['value']
         child_role_id = result['childRoleId']['value']
@@ -260,8 +359,7 @@ def generate_chebi_roles_input(version='', url_endpoint=URL[CHEBI]):
         d_labels[parent_role_id] = parent_role_label
         d_labels[child_role_id] = child_role_label
 
-    results = chebi_chem_roles_query(url_endpoint)
-    for result in results['results']['bindings']:
+    for result in chebi_chem_roles_query(url_endpoint, page_size):
         chem_label = result['chemLabel']['value']
         role_label = result['roleLabel']['value']
         chem_id = result['chemId']['value']
@@ -282,19 +380,23 @@ def generate_chebi_roles_input(version='', url_endpoint=URL[CHEBI]):
 
 # GO
 # ==================================================================================================
-def go_onto_query(root: str, endpoint_url: str) -> dict:
-    """ Returns the query results to get the chebi roles associated to each chemical having a role.
+def go_onto_query(root: str, endpoint_url: str, page_size: int = PAGE_SIZE) \
+        -> Iterator[Dict]:
+    """ Returns the query results iterator to get a GO sub-ontology tree from its root
 
     Parameters
     ----------
     root: str
+        GO sub-ontology root ID (GO:0005575, GO:0008150 or GO:0003674)
     endpoint_url: str
         Endpoint URL of Jena Fuseki server
+    page_size: int, optional (default=PAGE_SIZE)
+        Number of results fetched per query page
 
     Returns
     -------
-    dict
-        Dictionary of query results
+    Iterator[Dict]
+        Iterator over the query results (fetched page by page)
     """
     query = f"""
             PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
@@ -322,22 +424,19 @@ def go_onto_query(root: str, endpoint_url: str) -> dict:
                 ?child rdfs:subClassOf ?parent .
                 ?parent rdfs:label ?parentLabel .
                 ?parent oboInOwl:id ?parentId .
+                {CURSOR_FILTER}
             }}
             """
-    sparql = SPARQLWrapper(endpoint_url)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results
+    return query_pages(query, endpoint_url, ['childId', 'parentId', 'childLabel', 'parentLabel'],
+                       page_size)
 
 
-def generate_go_input(version='', url_endpoint=URL[GO_MF]):
+def generate_go_input(version='', url_endpoint=URL[GO_MF], page_size=PAGE_SIZE):
     for root_name in GO_ROOTS:
         root = ROOTS[root_name]
         d_ontology = dict()
         d_labels = dict()
-        results = go_onto_query(root, url_endpoint)
-        for result in results['results']['bindings']:
+        for result in go_onto_query(root, url_endpoint, page_size):
             child_label = result['childLabel']['value']
             parent_label = result['parentLabel']['value']
             child_id = result['childId']['value']
@@ -353,3 +452,34 @@ def generate_go_input(version='', url_endpoint=URL[GO_MF]):
         with open(output_classes, 'w') as oc, open(output_labels, 'w') as ol:
             json.dump(d_ontology, oc, indent=1)
             json.dump(d_labels, ol, indent=1)
+
+
+# OBO / OWL RELEASES (no SPARQL server)
+# ==================================================================================================
+def generate_chebi_release_input(chebi_file: str, version=''):
+    """ Generate the ChEBI classes input from a ChEBI release file (chebi.obo, chebi_lite.obo or
+    chebi.owl, optionally gzip compressed), same files as generate_chebi_input.
+    """
+    d_ontology, d_labels = extract_ontology(read_terms(chebi_file), CHEBI_CLASSES_ROOT)
+    for sub_root in get_sub_roots(d_ontology):
+        d_ontology[sub_root] = [ROOTS[CHEBI]]
+    write_ontology_files(CHEBI, version, d_ontology, d_labels)
+
+
+def generate_chebi_roles_release_input(chebi_file: str, version=''):
+    """ Generate the ChEBI roles input from a ChEBI release file (chebi.obo or chebi.owl,
+    optionally gzip compressed), same files as generate_chebi_roles_input.
+    """
+    d_ontology, d_labels = extract_roles_ontology(read_terms(chebi_file), ROOTS[CHEBI_R])
+    write_ontology_files(CHEBI_R, version, d_ontology, d_labels)
+
+
+def generate_go_release_input(go_file: str, version=''):
+    """ Generate the GO sub-ontologies inputs from a GO release file (go-basic.obo or
+    go-basic.owl, optionally gzip compressed), same files as generate_go_input. The release is
+    read once for the 3 sub-ontologies.
+    """
+    terms = read_terms(go_file)
+    for root_name in GO_ROOTS:
+        d_ontology, d_labels = extract_ontology(terms, ROOTS[root_name])
+        write_ontology_files(root_name, version, d_ontology, d_labels)
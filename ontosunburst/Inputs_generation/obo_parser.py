@@ -0,0 +1,258 @@
+import gzip
+from collections import deque
+from typing import List, Dict, Tuple, Iterator, IO
+from xml.etree.ElementTree import iterparse
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+# Term keys
+ID = 'id'
+NAME = 'name'
+IS_A = 'is_a'
+HAS_ROLE = 'has_role'
+OBSOLETE = 'obsolete'
+
+# Relation of chemicals to their roles (ChEBI)
+HAS_ROLE_RELATIONS = {'has_role', 'RO:0000087'}
+HAS_ROLE_IRI = 'http://purl.obolibrary.org/obo/RO_0000087'
+
+# RDF/XML tags and attributes
+RDF_NS = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+RDFS_NS = '{http://www.w3.org/2000/01/rdf-schema#}'
+OWL_NS = '{http://www.w3.org/2002/07/owl#}'
+OBO_IN_OWL_NS = '{http://www.geneontology.org/formats/oboInOwl#}'
+OWL_CLASS = OWL_NS + 'Class'
+OWL_RESTRICTION = OWL_NS + 'Restriction'
+OWL_ON_PROPERTY = OWL_NS + 'onProperty'
+OWL_SOME_VALUES_FROM = OWL_NS + 'someValuesFrom'
+OWL_DEPRECATED = OWL_NS + 'deprecated'
+RDFS_LABEL = RDFS_NS + 'label'
+RDFS_SUB_CLASS_OF = RDFS_NS + 'subClassOf'
+OBO_IN_OWL_ID = OBO_IN_OWL_NS + 'id'
+RDF_ABOUT = RDF_NS + 'about'
+RDF_RESOURCE = RDF_NS + 'resource'
+
+OWL_EXTENSIONS = ('.owl', '.rdf', '.xml')
+
+
+# ==================================================================================================
+# TERMS READING
+# ==================================================================================================
+
+def open_release(release_file: str, mode: str = 'rt') -> IO:
+    """ Open an ontology release file, gzip compressed if ending with .gz """
+    if release_file.endswith('.gz'):
+        return gzip.open(release_file, mode, encoding='utf-8' if 't' in mode else None)
+    return open(release_file, mode, encoding='utf-8' if 't' in mode else None)
+
+
+def iter_obo_terms(obo_file: str) -> Iterator[Dict]:
+    """ Read the terms of an OBO file, one [Term] stanza at a time.
+
+    Parameters
+    ----------
+    obo_file: str
+        OBO file (optionally gzip compressed)
+
+    Yields
+    ------
+    Dict
+        Term {id, name, is_a, has_role, obsolete} (is_a and has_role : lists of terms IDs)
+    """
+    term = None
+    with open_release(obo_file) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('['):
+                if term is not None and term[ID] is not None:
+                    yield term
+                term = None
+                if line == '[Term]':
+                    term = {ID: None, NAME: None, IS_A: [], HAS_ROLE: [], OBSOLETE: False}
+            elif term is not None and ':' in line:
+                tag, value = line.split(':', 1)
+                value = value.strip()
+                if tag == 'id':
+                    term[ID] = value
+                elif tag == 'name':
+                    term[NAME] = value
+                elif tag == 'is_a' and value:
+                    term[IS_A].append(value.split()[0])
+                elif tag == 'relationship':
+                    relation = value.split()
+                    if len(relation) > 1 and relation[0] in HAS_ROLE_RELATIONS:
+                        term[HAS_ROLE].append(relation[1])
+                elif tag == 'is_obsolete':
+                    term[OBSOLETE] = value == 'true'
+        if term is not None and term[ID] is not None:
+            yield term
+
+
+def iter_owl_terms(owl_file: str) -> Iterator[Dict]:
+    """ Read the terms of an OWL (RDF/XML) file, one top-level owl:Class element at a time (each
+    element is freed once read).
+
+    Parameters
+    ----------
+    owl_file: str
+        OWL file (optionally gzip compressed)
+
+    Yields
+    ------
+    Dict
+        Term {id, name, is_a, has_role, obsolete} (is_a and has_role : lists of terms IDs)
+    """
+    depth = 0
+    root = None
+    with open_release(owl_file, 'rb') as f:
+        for event, elem in iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            if elem.tag == OWL_CLASS and elem.get(RDF_ABOUT) is not None:
+                yield get_owl_term(elem)
+            root.clear()  # Top-level elements read : freed
+
+
+def get_owl_term(elem) -> Dict:
+    term = {ID: elem.findtext(OBO_IN_OWL_ID) or get_iri_id(elem.get(RDF_ABOUT)),
+            NAME: elem.findtext(RDFS_LABEL), IS_A: [], HAS_ROLE: [],
+            OBSOLETE: elem.findtext(OWL_DEPRECATED) == 'true'}
+    for sub_class_of in elem.iterfind(RDFS_SUB_CLASS_OF):
+        parent = sub_class_of.get(RDF_RESOURCE)
+        if parent is not None:
+            term[IS_A].append(get_iri_id(parent))
+            continue
+        restriction = sub_class_of.find(OWL_RESTRICTION)
+        if restriction is not None:
+            on_property = restriction.find(OWL_ON_PROPERTY)
+            values_from = restriction.find(OWL_SOME_VALUES_FROM)
+            if on_property is not None and values_from is not None \
+                    and on_property.get(RDF_RESOURCE) == HAS_ROLE_IRI \
+                    and values_from.get(RDF_RESOURCE) is not None:
+                term[HAS_ROLE].append(get_iri_id(values_from.get(RDF_RESOURCE)))
+    return term
+
+
+def get_iri_id(iri: str) -> str:
+    """ Get the ID of an OBO class IRI
+    (http://purl.obolibrary.org/obo/GO_0008150 : GO:0008150) """
+    return iri.rsplit('/', 1)[-1].replace('_', ':', 1)
+
+
+def read_terms(release_file: str) -> Dict[str, Dict]:
+    """ Read the terms of an ontology release in one pass (OBO, or OWL if the file extension is
+    .owl, .rdf or .xml). Only the ID, name and relations of non-obsolete terms are kept.
+
+    Parameters
+    ----------
+    release_file: str
+        OBO or OWL file (optionally gzip compressed)
+
+    Returns
+    -------
+    Dict[str, Dict]
+        Dictionary associating for each term ID, its term (in file order)
+    """
+    if release_file.removesuffix('.gz').endswith(OWL_EXTENSIONS):
+        terms = iter_owl_terms(release_file)
+    else:
+        terms = iter_obo_terms(release_file)
+    return {t[ID]: t for t in terms if not t[OBSOLETE]}
+
+
+# ==================================================================================================
+# ONTOLOGY EXTRACTION
+# ==================================================================================================
+
+def get_descendants(terms: Dict[str, Dict], root: str) -> List[str]:
+    """ Get the terms descending from a root by is_a relations (root included), in terms order.
+    """
+    children = dict()
+    for term_id, term in terms.items():
+        for parent in term[IS_A]:
+            children.setdefault(parent, []).append(term_id)
+    descendants = {root}
+    queue = deque([root])
+    while queue:
+        for child in children.get(queue.popleft(), []):
+            if child not in descendants:
+                descendants.add(child)
+                queue.append(child)
+    return [t for t in terms if t in descendants]
+
+
+def extract_ontology(terms: Dict[str, Dict], root: str) \
+        -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """ Extract the classes ontology of the terms descending from a root : each named descending
+    term associated to its named is_a parents.
+
+    Parameters
+    ----------
+    terms: Dict[str, Dict]
+        Ontology terms (see read_terms)
+    root: str
+        Root term ID
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        Dictionary associating for each class, its parents classes
+    Dict[str, str]
+        Dictionary associating for each class, its label
+    """
+    d_ontology = dict()
+    d_labels = dict()
+    for term_id in get_descendants(terms, root):
+        term = terms[term_id]
+        parents = [p for p in term[IS_A] if p in terms and terms[p][NAME] is not None]
+        if term[NAME] is None or not parents:
+            continue
+        d_ontology[term_id] = parents
+        d_labels[term_id] = term[NAME]
+        for parent in parents:
+            d_labels[parent] = terms[parent][NAME]
+    return d_ontology, d_labels
+
+
+def extract_roles_ontology(terms: Dict[str, Dict], root: str) \
+        -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """ Extract the roles ontology of the roles descending from a root, with the chemicals having
+    roles : each chemical associated to the is_a parents of its roles (as ChEBI roles SPARQL
+    queries).
+
+    Parameters
+    ----------
+    terms: Dict[str, Dict]
+        Ontology terms (see read_terms)
+    root: str
+        Root role ID
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        Dictionary associating for each role or chemical, its parents roles
+    Dict[str, str]
+        Dictionary associating for each role or chemical, its label
+    """
+    d_ontology, d_labels = extract_ontology(terms, root)
+    for term_id, term in terms.items():
+        if term[NAME] is None:
+            continue
+        roles = [p for r in term[HAS_ROLE] if r in terms for p in terms[r][IS_A]
+                 if p in terms and terms[p][NAME] is not None]
+        if not roles:
+            continue
+        for role in roles:
+            if role not in d_labels:
+                print(f'Role {terms[role][NAME]} not in the ontology.')
+        d_ontology[term_id] = list(dict.fromkeys(d_ontology.get(term_id, []) + roles))
+        d_labels[term_id] = term[NAME]
+    return d_ontology, d_labels
@@ -1,6 +1,8 @@
-from ontosunburst.ontosunburst import ontosunburst, METACYC, KEGG, CHEBI, CHEBI_R, EC, GO, GO_MF, \
-    GO_BP, GO_CC, ENRICHMENT_A, TOPOLOGY_A, BINOMIAL_TEST, HYPERGEO_TEST, PATH_HIGHER, \
-    PATH_DEEPER, PATH_BOUND, PATH_UNCUT, ROOT_UNCUT, ROOT_CUT, ROOT_TOTAL_CUT
+from ontosunburst.ontosunburst import ontosunburst, ontosunburst_sweep, METACYC, KEGG, CHEBI, \
+    CHEBI_R, EC, GO, GO_MF, GO_BP, GO_CC, ENRICHMENT_A, TOPOLOGY_A, BINOMIAL_TEST, HYPERGEO_TEST, \
+    PATH_HIGHER, PATH_DEEPER, PATH_BOUND, PATH_UNCUT, ROOT_UNCUT, ROOT_CUT, ROOT_TOTAL_CUT
+from ontosunburst.aio import ontosunburst_async
+from ontosunburst.shared_ontology import preload
 from ontosunburst import Inputs
 
 __version__ = '0.1.0'
@@ -0,0 +1,143 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Tuple, TYPE_CHECKING
+
+from ontosunburst.ontosunburst import _global_analysis, BINOMIAL_TEST, ROOT_CUT, PATH_UNCUT, \
+    TOPOLOGY_A
+from ontosunburst.ontology_store import LoadedOntology, load_ontology, get_loaded_ontology
+from ontosunburst.profiling import PipelineProfile, StageObserver, CancellationObserver, \
+    merge_observers, LOAD_S
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+
+# ==================================================================================================
+#                                            WORKFLOW
+# ==================================================================================================
+
+async def ontosunburst_async(interest_set: List[str],
+                             ontology: str = None,
+                             abundances: List[float] = None,
+                             reference_set: List[str] = None,
+                             ref_abundances: List[float] = None,
+                             analysis: str = TOPOLOGY_A,
+                             output: str = 'sunburst',
+                             scores: Dict[str, float] = None,
+                             write_output: bool = True,
+                             ontology_dag_input: str or Dict[str, str] = None,
+                             input_root: str = None,
+                             id_to_label_input: str or Dict[str, str] = None,
+                             labels: bool = True,
+                             test: str = BINOMIAL_TEST,
+                             root_cut: str = ROOT_CUT,
+                             path_cut: str = PATH_UNCUT,
+                             ref_base: bool = False,
+                             show_leaves: bool = False,
+                             profile: bool = False,
+                             observer: StageObserver = None,
+                             executor: Executor = None,
+                             timeout: float = None,
+                             loaded_ontology: LoadedOntology = None,
+                             cache_ontology: bool = True,
+                             **kwargs) -> 'go.Figure' or Tuple['go.Figure', PipelineProfile]:
+    """ Asyncio version of ontosunburst() : ontology files are loaded in a thread and the pipeline
+    stages run in an executor, the event loop is never blocked.
+
+    If the coroutine is cancelled or times out, the run stops at the start of its next stage
+    (thread executors only, a run started in a process executor goes to the end but its result is
+    dropped).
+
+    Parameters
+    ----------
+    interest_set ... show_leaves, profile, observer, **kwargs
+        Same as ontosunburst() parameters
+    executor: Executor (optional, default=None)
+        Executor running the pipeline stages, None for the event loop default thread executor.
+        With a process executor, the ontology is sent to the worker at each call, the observer
+        must be picklable (a copy is called in the worker) and profile is not available.
+    timeout: float (optional, default=None)
+        Maximal duration in seconds of the run (loading included), None for no limit. Raises
+        asyncio.TimeoutError when exceeded.
+    loaded_ontology: LoadedOntology (optional, default=None)
+        Ontology already loaded (see ontology_store), ontology files parameters are then ignored
+    cache_ontology: bool (optional, default=True)
+        True to keep default ontologies loaded between calls (see get_loaded_ontology), False to
+        load files at each call. Tailored ontologies are never cached.
+
+    Returns
+    -------
+    go.Figure
+        Plotly graph_objects figure of the sunburst
+    PipelineProfile
+        Per-stage report of the pipeline run, only returned if profile
+    """
+    in_process = isinstance(executor, ProcessPoolExecutor)
+    if profile and in_process:
+        raise ValueError('profile is not available with a process executor, stages are measured '
+                         'in the worker process')
+    pipeline_profile = PipelineProfile() if profile else None
+    cancellation = None
+    if not in_process:
+        cancellation = CancellationObserver()
+    observer = merge_observers(cancellation, pipeline_profile, observer)
+    try:
+        return await asyncio.wait_for(
+            _run_async(interest_set=interest_set, ontology=ontology, abundances=abundances,
+                       reference_set=reference_set, ref_abundances=ref_abundances,
+                       analysis=analysis, output=output, scores=scores,
+                       write_output=write_output, ontology_dag_input=ontology_dag_input,
+                       input_root=input_root, id_to_label_input=id_to_label_input, labels=labels,
+                       test=test, root_cut=root_cut, path_cut=path_cut, ref_base=ref_base,
+                       show_leaves=show_leaves, pipeline_profile=pipeline_profile,
+                       observer=observer, executor=executor, in_process=in_process,
+                       loaded_ontology=loaded_ontology, cache_ontology=cache_ontology,
+                       **kwargs),
+            timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if cancellation is not None:
+            cancellation.cancel()
+        raise
+    finally:
+        if pipeline_profile is not None:
+            pipeline_profile.stop()
+
+
+async def _run_async(interest_set, ontology, abundances, reference_set, ref_abundances, analysis,
+                     output, scores, write_output, ontology_dag_input, input_root,
+                     id_to_label_input, labels, test, root_cut, path_cut, ref_base, show_leaves,
+                     pipeline_profile, observer, executor, in_process, loaded_ontology,
+                     cache_ontology, **kwargs):
+    loop = asyncio.get_running_loop()
+    # LOAD ONTOLOGY --------------------------------------------------------------------------------
+    if observer is not None:
+        observer.on_stage_start(LOAD_S)
+    if loaded_ontology is None:
+        if cache_ontology and ontology is not None and ontology_dag_input is None \
+                and id_to_label_input is None:
+            loaded_ontology = await asyncio.to_thread(get_loaded_ontology, ontology, labels)
+        else:
+            loaded_ontology = await asyncio.to_thread(
+                load_ontology, ontology, ontology_dag_input, input_root, id_to_label_input,
+                labels)
+    id_to_label = loaded_ontology.labels if labels else None
+    if observer is not None:
+        observer.on_stage_end(LOAD_S, classes=len(loaded_ontology.dag),
+                              labels=len(id_to_label) if id_to_label is not None else 0)
+    # WORKFLOW -------------------------------------------------------------------------------------
+    run = functools.partial(_global_analysis, analysis=analysis,
+                            interest_concepts=interest_set, abundances=abundances, scores=scores,
+                            reference_concepts=reference_set, ref_abundances=ref_abundances,
+                            ontology_dag=loaded_ontology.dag, output=output,
+                            write_output=write_output, id_to_label=id_to_label, test=test,
+                            root=loaded_ontology.root, root_cut=root_cut, path_cut=path_cut,
+                            ref_base=ref_base, show_leaves=show_leaves, observer=observer,
+                            ontology_index=None if in_process else loaded_ontology.index,
+                            **kwargs)
+    fig = await loop.run_in_executor(executor, run)
+    if pipeline_profile is not None:
+        if write_output:
+            await asyncio.to_thread(pipeline_profile.write_json, f'{output}_profile.json')
+        return fig, pipeline_profile
+    return fig
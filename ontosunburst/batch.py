@@ -0,0 +1,247 @@
+import os
+import copy
+import glob
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import List, Dict, Tuple
+
+from ontosunburst.ontosunburst import _global_analysis
+from ontosunburst.ontology_store import LoadedOntology
+from ontosunburst.shared_ontology import publish_ontology, attach_ontology, detach_ontology
+from ontosunburst.reader import extract_input, MERGE_LAST
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+GLOB_CHARS = {'*', '?', '['}
+SUMMARY_FILE = 'batch_summary.tsv'
+
+# Sample results keys
+INPUT = 'input'
+OUTPUT = 'output'
+STATUS = 'status'
+DURATION = 'time'
+ERROR = 'error'
+OK_STATUS = 'ok'
+FAILED_STATUS = 'failed'
+
+# Worker process context (see init_batch_worker)
+_WORKER_CONTEXT = None
+
+
+# ==================================================================================================
+# CLASS
+# ==================================================================================================
+class BatchContext:
+    """
+    BatchContext class: parameters shared by all samples of a batch, loaded once (in each worker
+    process if jobs > 1).
+
+    Attributes
+    ----------
+    self.loaded: LoadedOntology
+        Loaded ontology
+    self.reference_set: List[str] or None
+        Reference list of concepts IDs
+    self.ref_abundances: List[float] or None
+        Reference abundances
+    self.merge: str
+        Merge rule of samples duplicated IDs (see reader.read_input)
+    self.params: Dict
+        Other _global_analysis parameters (analysis, test, root_cut, path_cut, ref_base,
+        show_leaves, labels) and figure keyword arguments
+    """
+
+    def __init__(self, loaded: LoadedOntology, reference_set: List[str] = None,
+                 ref_abundances: List[float] = None, merge: str = MERGE_LAST, **params):
+        self.loaded = loaded
+        self.reference_set = reference_set
+        self.ref_abundances = ref_abundances
+        self.merge = merge
+        self.params = params
+        if params.get('checkpoint') is not None:
+            loaded.get_fingerprint()  # Computed once, sent with the ontology to the workers
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def is_batch_input(input_arg: str, manifest: bool = False) -> bool:
+    """ True if the input is a directory, a glob pattern or a manifest file. An existing file is
+    a single input, even if its name has glob characters (sample[1].tsv). """
+    if manifest or os.path.isdir(input_arg):
+        return True
+    return not os.path.isfile(input_arg) and bool(GLOB_CHARS.intersection(input_arg))
+
+
+def get_batch_inputs(input_arg: str, output_dir: str, manifest: bool = False) \
+        -> List[Tuple[str, str]]:
+    """ List the inputs of a batch with their output path (without extension).
+
+    Parameters
+    ----------
+    input_arg: str
+        Directory (all its files), glob pattern or manifest TSV file (input path and optional
+        output name on each line, paths relative to the manifest directory)
+    output_dir: str
+        Directory of outputs, an input output name is its file name without extension if not
+        given in manifest
+    manifest: bool (optional, default=False)
+        True if input_arg is a manifest file
+
+    Returns
+    -------
+    List[Tuple[str, str]]
+        List of (input file, output path)
+    """
+    if manifest:
+        inputs = list()
+        manifest_dir = os.path.dirname(input_arg)
+        with open(input_arg, 'r') as f:
+            for line in f:
+                line = line.strip().split('\t')
+                if not line[0] or line[0].startswith('#'):
+                    continue
+                input_file = os.path.join(manifest_dir, line[0])
+                name = line[1] if len(line) > 1 and line[1] else get_sample_name(input_file)
+                inputs.append((input_file, os.path.join(output_dir, name)))
+        return inputs
+    if os.path.isdir(input_arg):
+        files = [os.path.join(input_arg, f) for f in sorted(os.listdir(input_arg))
+                 if not f.startswith('.') and os.path.isfile(os.path.join(input_arg, f))]
+    else:
+        files = sorted(f for f in glob.glob(input_arg) if os.path.isfile(f))
+    return [(f, os.path.join(output_dir, get_sample_name(f))) for f in files]
+
+
+def get_sample_name(input_file: str) -> str:
+    return os.path.splitext(os.path.basename(input_file))[0]
+
+
+def run_sample(context: BatchContext, input_file: str, output: str) -> Dict:
+    """ Generate the sunburst of one batch sample, errors are returned in the result.
+
+    Parameters
+    ----------
+    context: BatchContext
+        Batch shared parameters
+    input_file: str
+        Sample input TSV file
+    output: str
+        Sample output path without extension
+
+    Returns
+    -------
+    Dict
+        Sample result {input, output, status, time, error}
+    """
+    start_time = perf_counter()
+    result = {INPUT: input_file, OUTPUT: output, STATUS: OK_STATUS, ERROR: ''}
+    try:
+        concepts, abundances, scores = extract_input(input_file, context.merge)
+        params = dict(context.params)
+        labels = params.pop('labels', True)
+        if params.get('checkpoint') is not None:
+            params['checkpoint'].set_fingerprint(context.loaded.dag,
+                                                 context.loaded.get_fingerprint())
+        _global_analysis(interest_concepts=concepts, abundances=abundances, scores=scores,
+                         reference_concepts=context.reference_set,
+                         ref_abundances=context.ref_abundances,
+                         ontology_dag=context.loaded.dag, output=output, write_output=True,
+                         id_to_label=context.loaded.labels if labels else None,
+                         root=context.loaded.root, ontology_index=context.loaded.index,
+                         **params)
+    except Exception as e:
+        result[STATUS] = FAILED_STATUS
+        result[ERROR] = f'{type(e).__name__}: {e}'
+        traceback.print_exc()
+    result[DURATION] = perf_counter() - start_time
+    return result
+
+
+def init_batch_worker(context: BatchContext):
+    global _WORKER_CONTEXT
+    _WORKER_CONTEXT = context
+
+
+def run_worker_sample(input_file: str, output: str) -> Dict:
+    return run_sample(_WORKER_CONTEXT, input_file, output)
+
+
+def run_batch(context: BatchContext, inputs: List[Tuple[str, str]], jobs: int = 1,
+              summary: bool = True, share_ontology: bool = False) -> List[Dict]:
+    """ Generate the sunbursts of all batch samples, continues on samples errors.
+
+    Parameters
+    ----------
+    context: BatchContext
+        Batch shared parameters
+    inputs: List[Tuple[str, str]]
+        List of (input file, output path) (see get_batch_inputs)
+    jobs: int (optional, default=1)
+        Number of worker processes, 1 to run samples in the current process
+    summary: bool (optional, default=True)
+        True to print the summary and write it in the batch_summary.tsv file of the outputs
+        directories
+    share_ontology: bool (optional, default=False)
+        True to publish the ontology in a shared file attached read-only by the worker processes
+        (see shared_ontology), instead of a copy of the ontology in each worker (if jobs > 1)
+
+    Returns
+    -------
+    List[Dict]
+        Samples results {input, output, status, time, error} in inputs order
+    """
+    duplicated = sorted(o for o, n in Counter(o for i, o in inputs).items() if n > 1)
+    if duplicated:
+        raise ValueError(f'Samples outputs must be unique, duplicated : {", ".join(duplicated)}')
+    for output_dir in {os.path.dirname(o) for i, o in inputs}:
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+    if jobs > 1:
+        shared_file = None
+        if share_ontology:
+            shared_file = publish_ontology(context.loaded)
+            context = copy.copy(context)
+            context.loaded = attach_ontology(shared_file)
+        try:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=init_batch_worker,
+                                     initargs=(context,)) as executor:
+                futures = [executor.submit(run_worker_sample, i, o) for i, o in inputs]
+                results = [f.result() for f in futures]
+        finally:
+            if shared_file is not None:
+                detach_ontology(shared_file)
+                os.remove(shared_file)
+    else:
+        results = [run_sample(context, i, o) for i, o in inputs]
+    if summary:
+        print(format_batch_summary(results))
+        for output_dir in {os.path.dirname(r[OUTPUT]) for r in results}:
+            write_batch_summary([r for r in results if os.path.dirname(r[OUTPUT]) == output_dir],
+                                os.path.join(output_dir, SUMMARY_FILE))
+    return results
+
+
+def format_batch_summary(results: List[Dict]) -> str:
+    """ Format the batch results : failed samples with their error and counts. """
+    failed = [r for r in results if r[STATUS] == FAILED_STATUS]
+    lines = [f'{r[INPUT]} failed : {r[ERROR]}' for r in failed]
+    total_time = sum(r[DURATION] for r in results)
+    lines.append(f'{len(results) - len(failed)}/{len(results)} samples succeeded, '
+                 f'{len(failed)} failed ({total_time:.2f} s of samples computation)')
+    return '\n'.join(lines)
+
+
+def write_batch_summary(results: List[Dict], output: str):
+    """ Write the batch results in a TSV file (one line per sample). """
+    keys = [INPUT, OUTPUT, STATUS, DURATION, ERROR]
+    with open(output, 'w') as f:
+        f.write('\t'.join(keys) + '\n')
+        for r in results:
+            f.write('\t'.join(f'{r[k]:.4f}' if k == DURATION else str(r[k]).replace('\t', ' ')
+                              for k in keys) + '\n')
@@ -0,0 +1,439 @@
+import io
+import os
+import json
+import math
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from contextlib import redirect_stdout
+from typing import List, Dict, Tuple
+
+from ontosunburst.ontosunburst import ontosunburst, _global_analysis, get_file, \
+    get_ontology_dag_dict, METACYC, KEGG, CHEBI_R, EC, GO, GO_BP, GO_CC, GO_MF, \
+    GO_SUB_ONTOLOGIES, CLASSES_SUFFIX
+from ontosunburst.dag2tree import BINOMIAL_TEST, ROOT_CUT, PATH_DEEPER
+from ontosunburst.tree2sunburst import ENRICHMENT_A, TOPOLOGY_A
+from ontosunburst.profiling import PipelineProfile, get_max_rss, STAGE, TIME, COUNTS, TREE_S, \
+    WRITE_S
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+SYNTHETIC_ROOT = 'root'
+
+# Synthetic ontologies shapes modelled on the shipped ontologies files :
+# (maximal depth, mean number of children of non leaf classes, rate of classes with several parents)
+DEPTH = 'depth'
+BRANCHING = 'branching'
+MULTI_PARENT_RATE = 'multi_parent_rate'
+SYNTHETIC_PRESETS = {GO_BP: {DEPTH: 13, BRANCHING: 3.7, MULTI_PARENT_RATE: 0.53},
+                     GO_MF: {DEPTH: 10, BRANCHING: 6.3, MULTI_PARENT_RATE: 0.20},
+                     GO_CC: {DEPTH: 10, BRANCHING: 5.4, MULTI_PARENT_RATE: 0.13},
+                     CHEBI_R: {DEPTH: 9, BRANCHING: 103, MULTI_PARENT_RATE: 0.41},
+                     KEGG: {DEPTH: 6, BRANCHING: 42.7, MULTI_PARENT_RATE: 0.37},
+                     METACYC: {DEPTH: 36, BRANCHING: 6.9, MULTI_PARENT_RATE: 0.38},
+                     EC: {DEPTH: 4, BRANCHING: 21.6, MULTI_PARENT_RATE: 0.0}}
+
+DEFAULT_SIZES = [1000, 4000, 16000, 64000]
+
+# Shipped ontologies benchmark
+BENCH_ONTOLOGIES = [METACYC, KEGG, EC, CHEBI_R, GO_BP, GO_CC, GO_MF, GO]  # Shipped files only
+BENCH_INTEREST_SIZES = [10, 100, 1000, 10000]
+BENCH_REF_FACTOR = 10
+BENCH_COLUMNS = ['ontology', 'analysis', 'concepts', 'ref_concepts', 'sectors', 'html bytes',
+                 'max rss']
+
+
+# ==================================================================================================
+# SYNTHETIC ONTOLOGIES
+# ==================================================================================================
+
+def generate_synthetic_ontology(nb_classes: int, depth: int, branching: float,
+                                multi_parent_rate: float, seed: int = 0,
+                                root: str = SYNTHETIC_ROOT) -> Dict[str, List[str]]:
+    """ Generate a random ontology DAG. Classes are distributed in levels growing by a factor
+    branching (the deepest level gets all remaining classes), each class has one parent in the
+    level above and, with probability multi_parent_rate, a second parent in any higher level.
+
+    Parameters
+    ----------
+    nb_classes: int
+        Number of classes (root excluded)
+    depth: int
+        Maximal depth of the DAG
+    branching: float
+        Growth factor of the number of classes between two levels
+    multi_parent_rate: float
+        Probability for a class to have a second parent
+    seed: int (optional, default=0)
+        Seed of the random generator
+    root: str (optional, default='root')
+        Name of the root class
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        Dictionary of the ontology associating for each class its +1 parent classes.
+    """
+    rand = random.Random(seed)
+    levels = [[root]]
+    nb_created = 0
+    while nb_created < nb_classes:
+        if len(levels) == depth:
+            size = nb_classes - nb_created
+        else:
+            size = min(max(1, round(len(levels[-1]) * branching)), nb_classes - nb_created)
+        levels.append([f'C{i}' for i in range(nb_created, nb_created + size)])
+        nb_created += size
+    ontology_dag = dict()
+    higher = [root]
+    for lvl in range(1, len(levels)):
+        for c in levels[lvl]:
+            parents = [rand.choice(levels[lvl - 1])]
+            if lvl > 1 and rand.random() < multi_parent_rate:
+                other = rand.choice(higher)
+                if other != parents[0]:
+                    parents.append(other)
+            ontology_dag[c] = parents
+        higher.extend(levels[lvl])
+    return ontology_dag
+
+
+def get_leaves(ontology_dag: Dict[str, List[str]]) -> List[str]:
+    """ Get the classes without children of an ontology. """
+    inner = {p for ps in ontology_dag.values() for p in ps}
+    return [c for c in ontology_dag if c not in inner]
+
+
+def sample_concepts(concepts: List[str], nb_concepts: int, seed: int = 0) \
+        -> Tuple[List[str], List[int]]:
+    """ Sample concepts and random abundances.
+
+    Parameters
+    ----------
+    concepts: List[str]
+        Concepts to sample in
+    nb_concepts: int
+        Number of concepts to sample (all concepts if greater than the number of concepts)
+    seed: int (optional, default=0)
+        Seed of the random generator
+
+    Returns
+    -------
+    List[str]
+        Sampled concepts
+    List[int]
+        Abundance of each sampled concept
+    """
+    rand = random.Random(seed)
+    sample = rand.sample(concepts, min(nb_concepts, len(concepts)))
+    return sample, [rand.randint(1, 10) for _ in sample]
+
+
+# ==================================================================================================
+# BENCHMARK
+# ==================================================================================================
+
+def time_pipeline_stages(interest_set: List[str], abundances: List[float],
+                         reference_set: List[str], ref_abundances: List[float],
+                         ontology_dag: Dict[str, List[str]], root: str,
+                         id_to_label: Dict[str, str] = None, analysis: str = ENRICHMENT_A,
+                         path_cut: str = PATH_DEEPER, repeats: int = 1) -> Dict:
+    """ Run the pipeline (without writing outputs) and measure each stage wall time.
+
+    Parameters
+    ----------
+    interest_set: List[str]
+        Interest list of concepts IDs
+    abundances: List[float]
+        Abundances of the interest concepts
+    reference_set: List[str]
+        Reference list of concepts IDs
+    ref_abundances: List[float]
+        Abundances of the reference concepts
+    ontology_dag: Dict[str, List[str]]
+        Dictionary of the ontology associating for each class its +1 parent classes
+    root: str
+        Root of the ontology
+    id_to_label: Dict[str, str] (optional, default=None)
+        Labels of the ontology classes
+    analysis: str (optional, default='enrichment')
+        Analysis mode : topology or enrichment
+    path_cut: str (optional, default='deeper')
+        Mode for nested path cutting
+    repeats: int (optional, default=1)
+        Number of runs, the minimal time of each stage is kept
+
+    Returns
+    -------
+    Dict
+        {stage: minimal time (s)} and 'sectors': number of sectors of the tree
+    """
+    times = dict()
+    sectors = 0
+    for _ in range(repeats):
+        profile = PipelineProfile(trace_memory=False)
+        with redirect_stdout(io.StringIO()):
+            _global_analysis(analysis=analysis, interest_concepts=interest_set,
+                             abundances=abundances, scores=None, reference_concepts=reference_set,
+                             ref_abundances=ref_abundances, ontology_dag=ontology_dag,
+                             output='benchmark', write_output=False, id_to_label=id_to_label,
+                             test=BINOMIAL_TEST, root=root, root_cut=ROOT_CUT, path_cut=path_cut,
+                             ref_base=False, show_leaves=False, observer=profile)
+        for s in profile.stages:
+            times[s[STAGE]] = min(times.get(s[STAGE], math.inf), s[TIME])
+            if s[STAGE] == TREE_S:
+                sectors = s[COUNTS]['sectors']
+    return {'stages': times, 'sectors': sectors}
+
+
+def warm_up():
+    """ Run the pipeline once on a tiny ontology so lazily imported modules (scipy, plotly) are
+    not measured in the first benchmark case.
+    """
+    time_pipeline_stages(['a'], [1], ['a', 'b'], [1, 1], {'a': ['ab'], 'b': ['ab'], 'ab': ['r']},
+                         'r')
+
+
+def run_synthetic_benchmark(sizes: List[int] = None, presets: List[str] = None,
+                            interest_ratio: float = 0.05, repeats: int = 3, seed: int = 0,
+                            output: str = None) -> List[Dict]:
+    """ Time each pipeline stage on synthetic ontologies of increasing sizes.
+
+    Parameters
+    ----------
+    sizes: List[int] (optional, default=[1000, 4000, 16000, 64000])
+        Numbers of classes of the synthetic ontologies
+    presets: List[str] (optional, default=all SYNTHETIC_PRESETS)
+        Ontologies shapes to generate
+    interest_ratio: float (optional, default=0.05)
+        Size of the interest set relative to the number of leaves (reference set = all leaves)
+    repeats: int (optional, default=3)
+        Number of runs of each case, the minimal time of each stage is kept
+    seed: int (optional, default=0)
+        Seed of the random generators
+    output: str (optional, default=None)
+        Path of the json file to write results in, None to not write
+
+    Returns
+    -------
+    List[Dict]
+        Results of each case : preset, shape, sizes, stages times and scaling exponent of each stage
+        time relative to the previous size of the same preset
+    """
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+    if presets is None:
+        presets = list(SYNTHETIC_PRESETS)
+    warm_up()
+    results = list()
+    for preset in presets:
+        shape = SYNTHETIC_PRESETS[preset]
+        previous = None
+        for size in sorted(sizes):
+            ontology_dag = generate_synthetic_ontology(size, seed=seed, **shape)
+            leaves = get_leaves(ontology_dag)
+            reference_set, ref_abundances = sample_concepts(leaves, len(leaves), seed)
+            interest_set, abundances = sample_concepts(
+                leaves, max(1, int(len(leaves) * interest_ratio)), seed + 1)
+            res = time_pipeline_stages(interest_set, abundances, reference_set, ref_abundances,
+                                       ontology_dag, SYNTHETIC_ROOT, repeats=repeats)
+            res.update({'preset': preset, 'classes': size, 'concepts': len(interest_set),
+                        'ref_concepts': len(reference_set), **shape})
+            res['scaling'] = get_scaling_exponents(previous, res)
+            results.append(res)
+            previous = res
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=1)
+    return results
+
+
+def get_scaling_exponents(previous: Dict or None, current: Dict) -> Dict[str, float]:
+    """ Get for each stage the exponent k of the time growth between two benchmark cases
+    (time ~ classes^k) : ~1 for linear stages, ~2 for quadratic stages.
+
+    Parameters
+    ----------
+    previous: Dict or None
+        Results of the smaller case (None if no smaller case)
+    current: Dict
+        Results of the bigger case
+
+    Returns
+    -------
+    Dict[str, float]
+        Exponent of each stage (empty if no previous case)
+    """
+    if previous is None or previous['classes'] == current['classes']:
+        return dict()
+    size_ratio = math.log(current['classes'] / previous['classes'])
+    scaling = dict()
+    for stage, t in current['stages'].items():
+        t_prev = previous['stages'].get(stage)
+        if t_prev and t:
+            scaling[stage] = round(math.log(t / t_prev) / size_ratio, 2)
+    return scaling
+
+
+def format_results(results: List[Dict], columns: List[str] = None) -> str:
+    """ Format benchmark results as a text table (one line per case, times in ms).
+
+    Parameters
+    ----------
+    results: List[Dict]
+        Benchmark results
+    columns: List[str] (optional, default=['preset', 'classes', 'concepts', 'sectors'])
+        Results keys to show before the stages times
+
+    Returns
+    -------
+    str
+        Tab separated table
+    """
+    if columns is None:
+        columns = ['preset', 'classes', 'concepts', 'sectors']
+    stages = list(dict.fromkeys(s for r in results for s in r['stages']))
+    lines = ['\t'.join(columns + stages)]
+    for r in results:
+        lines.append('\t'.join([str(r.get(c, '-')) for c in columns] +
+                               [f'{r["stages"][s] * 1000:.1f}' if s in r['stages'] else '-'
+                                for s in stages]))
+    return '\n'.join(lines)
+
+
+# ==================================================================================================
+# SHIPPED ONTOLOGIES BENCHMARK
+# ==================================================================================================
+
+def is_ontology_available(ontology: str) -> bool:
+    """ True if the classes file of a default ontology is shipped. """
+    if ontology == GO:
+        return all(is_ontology_available(o) for o in GO_SUB_ONTOLOGIES)
+    return get_file(ontology, CLASSES_SUFFIX) is not None
+
+
+def get_bench_cases(ontology: str, interest_sizes: List[int], analyses: List[str],
+                    seed: int = 0) -> List[Dict]:
+    """ Sample the interest and reference sets of each benchmark case of an ontology. Concepts are
+    sampled in the ontology leaves, the reference set is BENCH_REF_FACTOR times bigger than the
+    interest set (or all leaves) and contains the interest set.
+
+    Parameters
+    ----------
+    ontology: str
+        Default ontology name
+    interest_sizes: List[int]
+        Sizes of the interest sets (sizes over the number of leaves are reduced to it)
+    analyses: List[str]
+        Analyses to run on each set
+    seed: int (optional, default=0)
+        Seed of the random generators
+
+    Returns
+    -------
+    List[Dict]
+        Cases {ontology, analysis, interest_set, abundances, reference_set, ref_abundances}
+    """
+    leaves = get_leaves(get_ontology_dag_dict(ontology, None))
+    cases = list()
+    sizes = sorted({min(size, len(leaves)) for size in interest_sizes})
+    for size in sizes:
+        reference_set, ref_abundances = sample_concepts(
+            leaves, min(len(leaves), size * BENCH_REF_FACTOR), seed)
+        interest_set = reference_set[:size]
+        abundances = [max(1, ab // 2) for ab in ref_abundances[:size]]
+        for analysis in analyses:
+            cases.append({'ontology': ontology, 'analysis': analysis,
+                          'interest_set': interest_set, 'abundances': abundances,
+                          'reference_set': reference_set, 'ref_abundances': ref_abundances})
+    return cases
+
+
+def run_bench_case(case: Dict, output_dir: str) -> Dict:
+    """ Run the whole pipeline (files loading and html writing included) for a benchmark case.
+
+    Parameters
+    ----------
+    case: Dict
+        Benchmark case (see get_bench_cases)
+    output_dir: str
+        Directory to write the figure in
+
+    Returns
+    -------
+    Dict
+        Results : ontology, analysis, concepts, ref_concepts, sectors, stages times (s),
+        html bytes, max rss (bytes) of the process
+    """
+    profile = PipelineProfile(trace_memory=False)
+    output = os.path.join(output_dir, f'{case["ontology"]}_{case["analysis"]}_'
+                                      f'{len(case["interest_set"])}')
+    with redirect_stdout(io.StringIO()):
+        ontosunburst(interest_set=case['interest_set'], ontology=case['ontology'],
+                     abundances=case['abundances'], reference_set=case['reference_set'],
+                     ref_abundances=case['ref_abundances'], analysis=case['analysis'],
+                     output=output, write_output=True, path_cut=PATH_DEEPER, observer=profile)
+    counts = {s[STAGE]: s[COUNTS] for s in profile.stages}
+    return {'ontology': case['ontology'], 'analysis': case['analysis'],
+            'concepts': len(case['interest_set']), 'ref_concepts': len(case['reference_set']),
+            'sectors': counts[TREE_S]['sectors'],
+            'stages': {s[STAGE]: s[TIME] for s in profile.stages},
+            'html bytes': counts[WRITE_S]['html_bytes'],
+            'max rss': get_max_rss()}
+
+
+def run_ontologies_benchmark(ontologies: List[str] = None, interest_sizes: List[int] = None,
+                             analyses: List[str] = None, isolate: bool = True, seed: int = 0,
+                             output: str = None) -> List[Dict]:
+    """ Run topology and enrichment analyses on the shipped ontologies with interest sets of
+    increasing sizes, measuring each stage latency, the peak RSS and the html output size.
+
+    Parameters
+    ----------
+    ontologies: List[str] (optional, default=BENCH_ONTOLOGIES)
+        Default ontologies to benchmark, ontologies without shipped files are skipped
+    interest_sizes: List[int] (optional, default=[10, 100, 1000, 10000])
+        Sizes of the interest sets
+    analyses: List[str] (optional, default=['topology', 'enrichment'])
+        Analyses to run
+    isolate: bool (optional, default=True)
+        True to run each case in a new process (peak RSS of the case only), False to run all cases
+        in the current process (faster, peak RSS is cumulative)
+    seed: int (optional, default=0)
+        Seed of the random generators
+    output: str (optional, default=None)
+        Path of the json file to write results in, None to not write
+
+    Returns
+    -------
+    List[Dict]
+        Results of each case (see run_bench_case)
+    """
+    if ontologies is None:
+        ontologies = BENCH_ONTOLOGIES
+    if interest_sizes is None:
+        interest_sizes = BENCH_INTEREST_SIZES
+    if analyses is None:
+        analyses = [TOPOLOGY_A, ENRICHMENT_A]
+    results = list()
+    with tempfile.TemporaryDirectory() as output_dir:
+        for ontology in ontologies:
+            if not is_ontology_available(ontology):
+                print(f'{ontology} ontology files not found, skipped.')
+                continue
+            for case in get_bench_cases(ontology, interest_sizes, analyses, seed):
+                if isolate:
+                    with ProcessPoolExecutor(max_workers=1,
+                                             mp_context=get_context('spawn')) as executor:
+                        res = executor.submit(run_bench_case, case, output_dir).result()
+                else:
+                    res = run_bench_case(case, output_dir)
+                print(format_results([res], BENCH_COLUMNS).split('\n')[-1])
+                results.append(res)
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=1)
+    return results
@@ -0,0 +1,167 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from typing import Dict, List, Tuple, Any
+
+from ontosunburst.profiling import WEIGHT_S, REDUCE_S, TREE_S, ENRICHMENT_S
+from ontosunburst.label_store import LabelStore, get_files_signature
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+# Checkpointed stages, in pipeline order :
+# - weight : (interest weights, reference weights, classes scores)
+# - reduce : (reduced ontology DAG, reduced labels, interest weights, reference weights,
+#             classes scores)
+# - tree : (TreeData with proportions, classes scores)
+# - enrichment : (enriched TreeData, significant)
+CHECKPOINT_STAGES = [WEIGHT_S, REDUCE_S, TREE_S, ENRICHMENT_S]
+# Changed when checkpoints content changes : previous checkpoints are no more used
+CHECKPOINT_VERSION = 2
+CHECKPOINT_EXT = '.pkl'
+
+
+# ==================================================================================================
+# CLASS
+# ==================================================================================================
+class CheckpointCache:
+    """
+    CheckpointCache class: on-disk cache of the pipeline stages outputs, each stored under a
+    content hash of all the inputs and parameters it depends on. A run with only downstream
+    parameters (root_cut, path_cut, figure kwargs) changed resumes from the last valid checkpoint.
+
+    Attributes
+    ----------
+    self.cache_dir: str
+        Directory of the checkpoints files
+    self.hits: Dict[str, int]
+        Number of checkpoints loaded for each stage
+    self.misses: Dict[str, int]
+        Number of checkpoints computed and saved for each stage
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = {s: 0 for s in CHECKPOINT_STAGES}
+        self.misses = {s: 0 for s in CHECKPOINT_STAGES}
+        self.__fingerprints = dict()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_CheckpointCache__fingerprints'] = dict()  # Ontologies not sent with the cache
+        return state
+
+    def get_fingerprint(self, obj) -> str:
+        """ Get the content hash of a large input (ontology DAG or labels), computed once per
+        object for this cache (objects must not be modified between runs). Labels compiled from
+        files are identified by their sources signature, other objects are hashed unless their
+        fingerprint was set (see set_fingerprint).
+        """
+        try:
+            return self.__fingerprints[id(obj)][1]
+        except KeyError:
+            if isinstance(obj, LabelStore) and obj.signature != bytes(len(obj.signature)):
+                digest = obj.signature.hex()
+            else:
+                digest = get_hash(obj)
+            self.set_fingerprint(obj, digest)
+            return digest
+
+    def set_fingerprint(self, obj, fingerprint: str):
+        """ Set the fingerprint of a large input loaded from files (see get_files_fingerprint),
+        used instead of hashing its content. """
+        self.__fingerprints[id(obj)] = (obj, fingerprint)  # Object kept : its id is not reused
+
+    def get_stages_keys(self, analysis, interest_concepts, abundances, scores, reference_concepts,
+                        ref_abundances, ontology_dag, id_to_label, test, root, ref_base,
+                        show_leaves) -> Dict[str, str]:
+        """ Get the key of each checkpointed stage, chaining the key of the previous stage with
+        the parameters used by the stage. Parameters are the same as _tree_analysis.
+
+        Returns
+        -------
+        Dict[str, str]
+            Dictionary associating for each checkpointed stage its key
+        """
+        keys = dict()
+        keys[WEIGHT_S] = get_hash((CHECKPOINT_VERSION, interest_concepts, abundances, scores,
+                                   reference_concepts, ref_abundances, root, show_leaves,
+                                   self.get_fingerprint(ontology_dag)))
+        keys[REDUCE_S] = get_hash((keys[WEIGHT_S], ref_base, self.get_fingerprint(id_to_label)))
+        keys[TREE_S] = get_hash((keys[REDUCE_S],))
+        keys[ENRICHMENT_S] = get_hash((keys[TREE_S], analysis, test))
+        return keys
+
+    def get_path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{stage}_{key}{CHECKPOINT_EXT}')
+
+    def load_last(self, keys: Dict[str, str], stages: List[str] = None) -> Tuple[str, Any]:
+        """ Load the checkpoint of the last stage available, unreadable files are ignored.
+
+        Parameters
+        ----------
+        keys: Dict[str, str]
+            Stages keys (see get_stages_keys)
+        stages: List[str] (optional, default=None)
+            Stages to look for, in pipeline order (None for all checkpointed stages)
+
+        Returns
+        -------
+        str
+            Last stage loaded (None if no checkpoint found)
+        Any
+            Stage output (None if no checkpoint found)
+        """
+        if stages is None:
+            stages = CHECKPOINT_STAGES
+        for stage in reversed(stages):
+            try:
+                with open(self.get_path(stage, keys[stage]), 'rb') as f:
+                    state = pickle.load(f)
+            except Exception:  # Missing, truncated or incompatible checkpoint : computed again
+                continue
+            self.hits[stage] += 1
+            return stage, state
+        return None, None
+
+    def save(self, stage: str, key: str, state: Any):
+        """ Save a stage output (written in a temporary file then renamed, concurrent runs never
+        read a partial checkpoint).
+        """
+        self.misses[stage] += 1
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.get_path(stage, key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def clear(self):
+        """ Remove all checkpoints files of the cache directory. """
+        for file in os.listdir(self.cache_dir):
+            if file.endswith(CHECKPOINT_EXT):
+                os.remove(os.path.join(self.cache_dir, file))
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """ Get the hits and misses numbers of each stage : {stage: {hits, misses}} """
+        return {s: {'hits': self.hits[s], 'misses': self.misses[s]} for s in CHECKPOINT_STAGES}
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def get_hash(obj) -> str:
+    """ Get the sha256 content hash of a picklable object. """
+    return hashlib.sha256(pickle.dumps(obj, protocol=4)).hexdigest()
+
+
+def get_files_fingerprint(files: List[str]) -> str:
+    """ Get the fingerprint of an input loaded from files : hash of the files paths, sizes and
+    modification times (files contents are not read). """
+    return get_hash(([os.path.abspath(f) for f in files], get_files_signature(files)))
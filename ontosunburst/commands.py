@@ -1,17 +1,32 @@
 from ontosunburst.ontosunburst import *
+from ontosunburst.reader import extract_input, MERGE_RULES, MERGE_LAST
 import argparse
+import sys
 
+BENCH_COMMAND = 'bench'
+SERVE_COMMAND = 'serve'
 
-def get_command_line_args():
+
+def get_command_line_args(argv=None):
     parser = argparse.ArgumentParser()
-    parser.add_argument('--input', '-i', type=str, required=True, help='Interest set input')
+    parser.add_argument('--input', '-i', type=str, required=False,
+                        help='Interest set input (TSV, gzip TSV or - for stdin), or directory, '
+                             'glob pattern or manifest of interest sets inputs (batch)')
+    parser.add_argument('--manifest', action='store_true', required=False, default=False,
+                        help='Input is a manifest TSV (input path and output name per line)')
+    parser.add_argument('--jobs', '-j', type=int, required=False, default=1,
+                        help='Number of worker processes for batch inputs')
+    parser.add_argument('--share_ontology', action='store_true', required=False, default=False,
+                        help='Workers attach a shared read-only ontology file instead of copies')
     parser.add_argument('--ref', '-r', type=str, required=False, help='Reference set input')
+    parser.add_argument('--merge', type=str, required=False, default=MERGE_LAST,
+                        choices=MERGE_RULES, help='Merge rule of duplicated IDs abundances')
     parser.add_argument('--ontology', '--onto', type=str, required=False, help='Ontology used')
     parser.add_argument('--input_root', '-ir', type=str, required=False, help='Ontology root')
     parser.add_argument('--analysis', '-a', type=str, required=False, default=TOPOLOGY_A,
                         help='Type of analysis')
     parser.add_argument('--output', '-o', type=str, required=False, default='sunburst',
-                        help='Output path+name')
+                        help='Output path+name (outputs directory for batch inputs)')
     parser.add_argument('--ontology_dag', '-od', type=str, required=False,
                         help='Class ontology json file')
     parser.add_argument('--id_to_labels', '-itl', type=str, required=False,
@@ -28,13 +43,75 @@ def get_command_line_args():
                         help='Reference base')
     parser.add_argument('--show_leaves', '-sl',  action='store_true', default=False, required=False,
                         help='Show leaves')
+    parser.add_argument('--profile', action='store_true', required=False, default=False,
+                        help='Report time, memory and sizes of each pipeline stage')
+    parser.add_argument('--format', '-f', type=str, required=False, default=HTML_F,
+                        choices=FIGURE_FORMATS,
+                        help='Figure format : interactive html or static svg (without plotly)')
+    parser.add_argument('--table', type=str, required=False, default=None,
+                        choices=TABLE_FORMATS, help='Also write the sectors table in this format')
+    parser.add_argument('--cache_dir', type=str, required=False, default=None,
+                        help='Directory of pipeline stages checkpoints reused between runs')
     parser.add_argument('--kwargs', nargs=argparse.REMAINDER, help="Additional keyword arguments")
-    args = parser.parse_args()
+    subparsers = parser.add_subparsers(dest='command', metavar='{bench,serve}')
+    add_bench_arguments(subparsers.add_parser(
+        BENCH_COMMAND, help='Benchmark the pipeline on shipped ontologies'))
+    add_serve_arguments(subparsers.add_parser(
+        SERVE_COMMAND, help='Local sunburst server keeping ontologies loaded'))
+    args = parser.parse_args(argv)
+    if args.command is None and args.input is None:
+        parser.error('the following arguments are required: --input/-i (or a command)')
     return args
 
 
+def add_bench_arguments(parser):
+    from ontosunburst.benchmark import BENCH_ONTOLOGIES, BENCH_INTEREST_SIZES
+    parser.add_argument('--ontologies', '--onto', type=str, nargs='+', default=BENCH_ONTOLOGIES,
+                        help='Ontologies to benchmark')
+    parser.add_argument('--sizes', '-s', type=int, nargs='+', default=BENCH_INTEREST_SIZES,
+                        help='Interest sets sizes')
+    parser.add_argument('--analyses', '-a', type=str, nargs='+',
+                        default=[TOPOLOGY_A, ENRICHMENT_A], help='Types of analysis')
+    parser.add_argument('--no_isolate', action='store_false', required=False, default=True,
+                        help='Run all cases in the current process')
+    parser.add_argument('--seed', type=int, required=False, default=0, help='Random seed')
+    parser.add_argument('--output', '-o', type=str, required=False, default=None,
+                        help='Json results file')
+
+
+def bench_main(args):
+    from ontosunburst.benchmark import run_ontologies_benchmark, format_results, BENCH_COLUMNS
+    results = run_ontologies_benchmark(ontologies=args.ontologies, interest_sizes=args.sizes,
+                                       analyses=args.analyses, isolate=args.no_isolate,
+                                       seed=args.seed, output=args.output)
+    print(format_results(results, BENCH_COLUMNS))
+
+
+def add_serve_arguments(parser):
+    from ontosunburst.server import DEF_HOST, DEF_PORT, DEF_WORKERS
+    parser.add_argument('--ontologies', '--onto', type=str, nargs='+', default=[],
+                        help='Ontologies to load at start (others are loaded at first request)')
+    parser.add_argument('--host', type=str, required=False, default=DEF_HOST, help='Server host')
+    parser.add_argument('--port', '-p', type=int, required=False, default=DEF_PORT,
+                        help='Server port')
+    parser.add_argument('--workers', '-w', type=int, required=False, default=DEF_WORKERS,
+                        help='Maximal number of requests computed at the same time')
+    parser.add_argument('--no_precompute', action='store_false', required=False, default=True,
+                        help='Extract classes ancestors at first use instead of at loading')
+
+
+def serve_main(args):
+    from ontosunburst.server import serve
+    serve(ontologies=args.ontologies, host=args.host, port=args.port, workers=args.workers,
+          precompute=args.no_precompute)
+
+
 def main():
     args = get_command_line_args()
+    if args.command == BENCH_COMMAND:
+        return bench_main(args)
+    if args.command == SERVE_COMMAND:
+        return serve_main(args)
     kwargs = {}
     if args.kwargs:
         for arg in args.kwargs:
@@ -43,45 +120,57 @@ def main():
                 kwargs[key] = value
             else:
                 raise ValueError(f"Argument {arg} is not in the form key=value")
-    reference_set, ref_abundances, scores = extract_input(args.ref)
-    metabolic_objects, abundances, scores = extract_input(args.input)
-    ontosunburst(interest_set=metabolic_objects,
-                 ontology=args.ontology,
-                 input_root=args.input_root,
-                 abundances=abundances,
-                 scores=scores,
-                 reference_set=reference_set,
-                 ref_abundances=ref_abundances,
-                 analysis=args.analysis,
-                 output=args.output,
-                 write_output=True,
-                 ontology_dag_input=args.ontology_dag,
-                 id_to_label_input=args.id_to_labels,
-                 labels=args.no_labels,
-                 test=args.test,
-                 root_cut=args.rcut,
-                 path_cut=args.pcut,
-                 ref_base=args.r_base,
-                 show_leaves=args.show_leaves,
-                 **kwargs)
+    from ontosunburst.batch import is_batch_input
+    if is_batch_input(args.input, args.manifest):
+        return batch_main(args, kwargs)
+    reference_set, ref_abundances, scores = extract_input(args.ref, args.merge)
+    metabolic_objects, abundances, scores = extract_input(args.input, args.merge)
+    res = ontosunburst(interest_set=metabolic_objects,
+                       ontology=args.ontology,
+                       input_root=args.input_root,
+                       abundances=abundances,
+                       scores=scores,
+                       reference_set=reference_set,
+                       ref_abundances=ref_abundances,
+                       analysis=args.analysis,
+                       output=args.output,
+                       write_output=True,
+                       ontology_dag_input=args.ontology_dag,
+                       id_to_label_input=args.id_to_labels,
+                       labels=args.no_labels,
+                       test=args.test,
+                       root_cut=args.rcut,
+                       path_cut=args.pcut,
+                       ref_base=args.r_base,
+                       show_leaves=args.show_leaves,
+                       profile=args.profile,
+                       table_format=args.table,
+                       cache_dir=args.cache_dir,
+                       output_format=args.format,
+                       **kwargs)
+    if args.profile:
+        print(res[1])
 
 
-def extract_input(input_file):
-    if input_file is not None:
-        id_lst = []
-        ab_lst = []
-        sc_d = {}
-        with open(input_file, 'r') as f:
-            for l in f:
-                l = l.strip().split('\t')
-                id_lst.append(l[0])
-                if len(l) == 3:
-                    sc_d[l[0]] = float(l[2])
-                if len(l) >= 2:
-                    ab_lst.append(float(l[1]))
-                else:
-                    ab_lst.append(1)
-        if not sc_d:
-            sc_d = None
-        return id_lst, ab_lst, sc_d
-    return None, None, None
+def batch_main(args, kwargs):
+    from ontosunburst.batch import BatchContext, get_batch_inputs, run_batch, FAILED_STATUS, \
+        STATUS
+    from ontosunburst.ontology_store import load_ontology
+    from ontosunburst.checkpoint import CheckpointCache
+    inputs = get_batch_inputs(args.input, args.output, args.manifest)
+    if not inputs:
+        raise ValueError(f'No input found for {args.input}')
+    reference_set, ref_abundances, scores = extract_input(args.ref, args.merge)
+    loaded = load_ontology(ontology=args.ontology, ontology_dag_input=args.ontology_dag,
+                           input_root=args.input_root, id_to_label_input=args.id_to_labels,
+                           labels=args.no_labels)
+    context = BatchContext(loaded, reference_set, ref_abundances, merge=args.merge,
+                           analysis=args.analysis, labels=args.no_labels, test=args.test,
+                           root_cut=args.rcut, path_cut=args.pcut, ref_base=args.r_base,
+                           show_leaves=args.show_leaves, table_format=args.table,
+                           output_format=args.format,
+                           checkpoint=CheckpointCache(args.cache_dir) if args.cache_dir else None,
+                           **kwargs)
+    results = run_batch(context, inputs, jobs=args.jobs, share_ontology=args.share_ontology)
+    if any(r[STATUS] == FAILED_STATUS for r in results):
+        sys.exit(1)
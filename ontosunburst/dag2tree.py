@@ -1,7 +1,12 @@
-from typing import List, Dict, Set
+import os
+from typing import List, Dict, Set, TYPE_CHECKING
 import numpy as np
 from numpy import nan
-import scipy.stats as stats
+
+from ontosunburst.ontology_index import OntologyIndex
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ==================================================================================================
 # CONSTANTS
@@ -34,12 +39,20 @@ PVAL = 'Pvalue'
 ROOT_CUT = 'cut'
 ROOT_TOTAL_CUT = 'total'
 ROOT_UNCUT = 'uncut'
+ROOT_CUTS = [ROOT_UNCUT, ROOT_CUT, ROOT_TOTAL_CUT]
 
 # Path cut
 PATH_UNCUT = 'uncut'
 PATH_DEEPER = 'deeper'
 PATH_HIGHER = 'higher'
 PATH_BOUND = 'bound'
+PATH_CUTS = [PATH_UNCUT, PATH_DEEPER, PATH_HIGHER, PATH_BOUND]
+
+# Sectors table formats (parquet and feather need pyarrow)
+TSV_F = 'tsv'
+PARQUET_F = 'parquet'
+FEATHER_F = 'feather'
+TABLE_FORMATS = [TSV_F, PARQUET_F, FEATHER_F]
 
 
 # ==================================================================================================
@@ -88,6 +101,7 @@ class TreeData:
         self.relative_prop = list()
         self.p_val = list()
         self.len = 0
+        self.__ids_set = set()
 
     def __str__(self):
         string = ''
@@ -101,9 +115,61 @@ class TreeData:
                 WEIGHT: self.count, REF_WEIGHT: self.ref_count, PROP: self.prop,
                 REF_PROP: self.ref_prop, RELAT_PROP: self.relative_prop, PVAL: self.p_val}
 
+    def copy(self) -> 'TreeData':
+        """ Get a copy of the TreeData to cut without modifying this one (columns lists are
+        copied, their values are immutable and shared).
+
+        Returns
+        -------
+        TreeData
+            Copy of the TreeData
+        """
+        data = TreeData()
+        columns = self.get_data_dict()
+        for k, v in data.get_data_dict().items():
+            v.extend(columns[k])
+        data.len = self.len
+        data.update_ids_set()
+        if 'C_ID' in self.__dict__:
+            data.C_ID = self.C_ID
+        return data
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """ Get the sectors table as a pandas DataFrame (one row per sector, get_data_dict keys
+        as columns).
+
+        Returns
+        -------
+        pd.DataFrame
+            Sectors table
+        """
+        import pandas as pd  # Loaded only when a table is exported
+        return pd.DataFrame(self.get_data_dict())
+
+    def write_table(self, output: str, table_format: str = None):
+        """ Write the sectors table in a TSV, Parquet or Feather file (see read_table).
+
+        Parameters
+        ----------
+        output: str
+            Path of the table file
+        table_format: str (optional, default=None, values in ['tsv', 'parquet', 'feather'])
+            Format of the table, None to deduce it from output extension. Parquet and Feather
+            formats need pyarrow to be installed.
+        """
+        table_format = get_table_format(output, table_format)
+        df = self.to_dataframe()
+        if table_format == TSV_F:
+            df.to_csv(output, sep='\t', index=False)
+        elif table_format == PARQUET_F:
+            df.to_parquet(output, index=False)
+        else:
+            df.to_feather(output)
+
     def dag_to_tree(self, set_abundance: Dict[str, float], ref_abundance: Dict[str, float],
                     parent_dict: Dict[str, List[str]], root_item: str,
-                    names: Dict[str, str] = None, ref_base: bool = True):
+                    names: Dict[str, str] = None, ref_base: bool = True,
+                    index: OntologyIndex = None):
         """ Fill TreeData list attributes (self.ids, self.onto_ids, self.labels, self.parents,
         self.count, self.ref_count)
 
@@ -123,8 +189,15 @@ class TreeData:
             Dictionary associating for some or each ontology IDs, its label
         ref_base: bool
             True to have the reference as base, False otherwise
+        index: OntologyIndex (optional, default=None)
+            Index of the ontology parent_dict is a sub-graph of (in ontology order) : the complete
+            ontology children dictionary cached in the index is used instead of rebuilding the
+            children of parent_dict, children without abundance are skipped by the traversal
         """
-        children_dict = get_children_dict(parent_dict)
+        if index is not None:
+            children_dict = index.get_children_dict()
+        else:
+            children_dict = get_children_dict(parent_dict)
         self.dag_traversal_rec(root_item, children_dict, names, ref_abundance, set_abundance,
                                ref_base, '')
 
@@ -186,7 +259,7 @@ class TreeData:
         parent: str
             Parent object class of the object class to add
         """
-        if m_id in self.ids:
+        if m_id in self.__ids_set:
             raise ValueError(f'{m_id} already in data IDs, all IDs must be unique.')
         self.ids.append(m_id)
         self.onto_ids.append(onto_id)
@@ -198,6 +271,7 @@ class TreeData:
         self.ref_prop.append(nan)
         self.relative_prop.append(nan)
         self.p_val.append(nan)
+        self.__ids_set.add(m_id)
         self.len += 1
 
     def calculate_proportions(self, ref_base: bool):
@@ -218,15 +292,18 @@ class TreeData:
         # Get proportion relative to +1 parent proportion for total branch value
         self.relative_prop = [x for x in self.prop]
         p = ''
-        self.__get_relative_prop(p, ref_base)
+        index = self.get_index_dict()
+        children = self.get_children_index_dict()
+        self.__get_relative_prop(p, ref_base, index, children)
         # IDK WHY IT WORKS ???
         missed = [self.ids[i] for i in range(self.len) if self.relative_prop[i] < 1]
         if missed:
-            parents = {self.parents[self.ids.index(m)] for m in missed}
+            parents = {self.parents[index[m]] for m in missed}
             for p in parents:
-                self.__get_relative_prop(p, ref_base)
+                self.__get_relative_prop(p, ref_base, index, children)
 
-    def __get_relative_prop(self, p_id: str, ref_base: bool):
+    def __get_relative_prop(self, p_id: str, ref_base: bool, index: Dict[str, int],
+                            children: Dict[str, List[int]]):
         """ Get recursively relative proportion of a parent children to itself. Set it to class
         self.relative_prop attribute.
 
@@ -236,6 +313,11 @@ class TreeData:
             ID of the parent
         ref_base: bool
             True if reference base representation
+        index: Dict[str, int]
+            Dictionary associating for each sector ID, its index (see get_index_dict)
+        children: Dict[str, List[int]]
+            Dictionary associating for each parent, its children indexes
+            (see get_children_index_dict)
         """
         if ref_base:
             base_count = self.ref_count
@@ -245,24 +327,23 @@ class TreeData:
             prop_p = MAX_RELATIVE_NB
             count_p = max(base_count)
         else:
-            prop_p = self.relative_prop[self.ids.index(p_id)]
-            count_p = base_count[self.ids.index(p_id)]
-        index_p = [i for i, v in enumerate(self.parents) if v == p_id]
-        p_children = [self.ids[i] for i in index_p]
+            prop_p = self.relative_prop[index[p_id]]
+            count_p = base_count[index[p_id]]
+        index_p = children.get(p_id, [])
         count_p_children = [base_count[i] for i in index_p]
         if np.nansum(count_p_children) > count_p:
             total = np.nansum(count_p_children)
         else:
             total = count_p
-        for i, c in enumerate(p_children):
-            if not ref_base and np.isnan(self.prop[self.ids.index(c)]):
+        for i, c_i in enumerate(index_p):
+            if not ref_base and np.isnan(self.prop[c_i]):
                 prop_c = 0
             else:
                 prop_c = int((count_p_children[i] / total) * prop_p)
-            self.relative_prop[self.ids.index(c)] = prop_c
-        for c in p_children:
-            if c in self.parents:
-                self.__get_relative_prop(c, ref_base)
+            self.relative_prop[c_i] = prop_c
+        for c_i in index_p:
+            if self.ids[c_i] in children:
+                self.__get_relative_prop(self.ids[c_i], ref_base, index, children)
 
     def make_enrichment_analysis(self, test: str, scores: Dict[str, float] = None) \
             -> Dict[str, float]:
@@ -291,6 +372,7 @@ class TreeData:
                 if p_val < 0.05 / nb_classes:  # Keep significant p-values : Bonferroni
                     significant_representation[self.onto_ids[i]] = p_val
         else:
+            import scipy.stats as stats  # Loaded only when enrichment is calculated
             m = np.max(self.ref_count)  # M = ref set total item number
             n = int(np.nanmax(self.count))  # N = interest set total item number
             for i in range(self.len):
@@ -334,14 +416,15 @@ class TreeData:
         if mode == ROOT_CUT or mode == ROOT_TOTAL_CUT:
             roots_ind = [i for i in range(self.len) if self.relative_prop[i] == MAX_RELATIVE_NB]
             roots = [self.ids[i] for i in roots_ind]
-            roots_lab = [self.labels[i] if self.labels[i] not in self.ids
+            ids = set(self.ids)
+            roots_lab = [self.labels[i] if self.labels[i] not in ids
                          else self.labels[i] + '_' for i in roots_ind]
             lab = {roots[i]: roots_lab[i] for i in range(len(roots))}
             self.delete_value(roots_ind)
             if mode == ROOT_CUT:
-                self.parents = [lab[x] if x in roots else x for x in self.parents]
+                self.parents = [lab[x] if x in lab else x for x in self.parents]
             if mode == ROOT_TOTAL_CUT:
-                self.parents = ['' if x in roots else x for x in self.parents]
+                self.parents = ['' if x in lab else x for x in self.parents]
 
     def cut_nested_path(self, mode: str, ref_base: bool):
         """ Cut nested path in the tree graph (path of nested sectors sharing the same value)
@@ -364,21 +447,24 @@ class TreeData:
             count = self.count
         if mode != PATH_UNCUT:
             nested_paths = []
+            children = self.get_children_index_dict()
             for p_i in range(self.len):
                 p = self.ids[p_i]
-                p_children = [self.ids[i] for i in range(self.len) if self.parents[i] == p]
+                p_children = children.get(p, [])
                 if len(p_children) == 1:
                     p_p = self.parents[p_i]
-                    p_p_children = [self.ids[i] for i in range(self.len) if self.parents[i] == p_p]
+                    p_p_children = children.get(p_p, [])
                     if len(p_p_children) != 1:
                         p_count = count[p_i]
-                        c_i = self.ids.index(p_children[0])
+                        c_i = p_children[0]
                         c_count = count[c_i]
                         if p_count == c_count:
-                            nested_paths.append(self.get_full_nested_path(c_i, [p_i], count))
+                            nested_paths.append(
+                                self.get_full_nested_path(c_i, [p_i], count, children))
             self.delete_nested_path(mode, nested_paths)
 
-    def get_full_nested_path(self, p_i: int, n_path: List[int], count: List[float]):
+    def get_full_nested_path(self, p_i: int, n_path: List[int], count: List[float],
+                             children: Dict[str, List[int]] = None):
         """ Get all index of a nested path sector from its parent sector index.
 
         Parameters
@@ -389,21 +475,26 @@ class TreeData:
             List of sector indexes of the nested path
         count: List[float]
             List of all sectors count value.
+        children: Dict[str, List[int]] (optional, default=None)
+            Dictionary associating for each parent, its children indexes
+            (see get_children_index_dict), None to build it
 
         Returns
         -------
         List[int]
             List of sector indexes of the nested path
         """
+        if children is None:
+            children = self.get_children_index_dict()
         n_path.append(p_i)
         p = self.ids[p_i]
-        p_children = [self.ids[i] for i in range(self.len) if self.parents[i] == p]
+        p_children = children.get(p, [])
         if len(p_children) == 1:
             p_count = count[p_i]
-            c_i = self.ids.index(p_children[0])
+            c_i = p_children[0]
             c_count = count[c_i]
             if p_count == c_count:
-                n_path = self.get_full_nested_path(c_i, n_path, count)
+                n_path = self.get_full_nested_path(c_i, n_path, count, children)
         return n_path
 
     def delete_nested_path(self, mode: str, nested_paths: List[List[int]]):
@@ -431,10 +522,11 @@ class TreeData:
                 self.parents[to_keep] = root_p
                 self.labels[to_keep] = '... ' + self.labels[to_keep]
         elif mode == PATH_HIGHER:
+            children = self.get_children_index_dict()
             for path in nested_paths:
                 to_del += path[1:]
                 to_keep = path[0]
-                to_keep_c = [i for i in range(self.len) if self.parents[i] == self.ids[path[-1]]]
+                to_keep_c = children.get(self.ids[path[-1]], [])
                 for c_i in to_keep_c:
                     self.parents[c_i] = self.ids[to_keep]
                 self.labels[to_keep] += ' ...'
@@ -460,10 +552,42 @@ class TreeData:
         data = self.get_data_dict()
         if type(v_index) == int:
             v_index = [v_index]
-        for i in sorted(v_index, reverse=True):
-            for k, v in data.items():
-                del v[i]
-            self.len -= 1
+        v_index = set(v_index)
+        if not v_index:
+            return
+        for k, v in data.items():
+            v[:] = [x for i, x in enumerate(v) if i not in v_index]
+        self.len -= len(v_index)
+        self.update_ids_set()
+
+    def update_ids_set(self):
+        """ Rebuild the set of sectors IDs add_value checks unicity against, once after the IDs
+        column is rewritten in bulk (add_value keeps it up to date for each added sector).
+        """
+        self.__ids_set = set(self.ids)
+
+    def get_index_dict(self) -> Dict[str, int]:
+        """ Get the index of each sector from its ID.
+
+        Returns
+        -------
+        Dict[str, int]
+            Dictionary associating for each sector ID, its index
+        """
+        return {m_id: i for i, m_id in enumerate(self.ids)}
+
+    def get_children_index_dict(self) -> Dict[str, List[int]]:
+        """ Get the children indexes of each parent, in sectors order.
+
+        Returns
+        -------
+        Dict[str, List[int]]
+            Dictionary associating for each parent (ID or label of cut root), its children indexes
+        """
+        children = dict()
+        for i, p in enumerate(self.parents):
+            children.setdefault(p, []).append(i)
+        return children
 
     def get_col(self, index: int or List[int] = None) -> List or List[List]:
         """ Get a TreeData column from its index or a list of columns from a list of indexes.
@@ -495,6 +619,73 @@ class TreeData:
 # FUNCTIONS
 # ==================================================================================================
 
+def tree_from_dataframe(df: 'pd.DataFrame') -> TreeData:
+    """ Get a TreeData from its sectors table (see TreeData.to_dataframe). Integer weights
+    columns are converted back to integers.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Sectors table
+
+    Returns
+    -------
+    TreeData
+        Sectors of the table
+    """
+    data = TreeData()
+    for k, v in data.get_data_dict().items():
+        col = df[k].to_numpy()
+        if k in (IDS, ONTO_ID, LABEL, PARENT):
+            v.extend(col.astype(str).tolist())
+        elif k in (WEIGHT, REF_WEIGHT, RELAT_PROP) and col.dtype.kind == 'f' and \
+                np.all(np.isnan(col) | (col == np.round(col))):
+            v.extend(int(x) if x == x else nan for x in col.tolist())
+        else:
+            v.extend(col.astype(float).tolist())
+    data.len = len(df)
+    data.update_ids_set()
+    return data
+
+
+def read_table(input_file: str, table_format: str = None) -> TreeData:
+    """ Read a sectors table file written by TreeData.write_table.
+
+    Parameters
+    ----------
+    input_file: str
+        Path of the table file
+    table_format: str (optional, default=None, values in ['tsv', 'parquet', 'feather'])
+        Format of the table, None to deduce it from input_file extension
+
+    Returns
+    -------
+    TreeData
+        Sectors of the table
+    """
+    import pandas as pd
+    table_format = get_table_format(input_file, table_format)
+    if table_format == TSV_F:
+        df = pd.read_csv(input_file, sep='\t', keep_default_na=False,
+                         na_values={k: ['', 'nan', 'NaN'] for k in (WEIGHT, REF_WEIGHT, PROP,
+                                                                    REF_PROP, RELAT_PROP, PVAL)},
+                         dtype={IDS: str, ONTO_ID: str, LABEL: str, PARENT: str})
+    elif table_format == PARQUET_F:
+        df = pd.read_parquet(input_file)
+    else:
+        df = pd.read_feather(input_file)
+    return tree_from_dataframe(df)
+
+
+def get_table_format(path: str, table_format: str = None) -> str:
+    """ Get the sectors table format, from the path extension if not given. """
+    if table_format is None:
+        table_format = os.path.splitext(path)[1].lstrip('.')
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f'Table format must be in {TABLE_FORMATS}, got {table_format}')
+    return table_format
+
+
 def get_set2_abundance(set2_abundances: Dict[str, float] or None, c_label: str) -> float:
     """ Get the set2 abundance of a set1 concept.
 
@@ -538,12 +729,11 @@ def get_children_dict(parent_dict: Dict[str, List[str]]) -> Dict[str, List[str]]
     Dict[str, List[str]]
         Dictionary associating for each class, its children classes
     """
-    children_dict = dict()
+    children_dict = {c: list() for c, ps in parent_dict.items() if ps}
     for c, ps in parent_dict.items():
         for p in ps:
-            if p not in children_dict.keys():
-                children_dict[p] = list()
-            if c not in children_dict.keys():
-                children_dict[c] = list()
-            children_dict[p].append(c)
+            try:
+                children_dict[p].append(c)
+            except KeyError:  # Parent not in parent_dict keys (root)
+                children_dict[p] = [c]
     return children_dict
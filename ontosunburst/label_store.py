@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+from collections.abc import Mapping
+from typing import List, Dict, Iterable
+
+import numpy as np
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+LABELS_BLOB_EXT = '.lbl'
+BLOB_MAGIC = b'OSLABEL1'
+# Header : magic, number of labels, keys width, values size, sources signature
+BLOB_HEADER = struct.Struct('<8sQQQ32s')
+
+
+# ==================================================================================================
+# CLASS
+# ==================================================================================================
+class LabelStore(Mapping):
+    """
+    LabelStore class: read-only ID-LABEL mapping served from a compiled labels blob (sorted
+    fixed-width IDs, labels offsets and UTF-8 labels), memory-mapped. Opening the store reads only
+    its header, labels are decoded only for the IDs looked up.
+
+    Attributes
+    ----------
+    self.path: str or None
+        Compiled blob file (None for an in-memory blob)
+    self.signature: bytes
+        Signature of the labels json files the blob was compiled from
+    self.ids: np.ndarray (size N)
+        Sorted IDs (UTF-8 encoded, fixed width)
+    self.offsets: np.ndarray (size N + 1)
+        Start of each ID label in the labels bytes
+    """
+
+    def __init__(self, path: str = None, buffer: bytes = None, signature: bytes = None):
+        self.path = path
+        if path is not None:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__buffer = buffer
+        if len(buffer) < BLOB_HEADER.size:
+            raise ValueError(f'{path} is not a compiled labels file')
+        magic, n, width, values_size, self.signature = BLOB_HEADER.unpack_from(buffer)
+        if magic != BLOB_MAGIC:
+            raise ValueError(f'{path} is not a compiled labels file')
+        if signature is not None and signature != self.signature:
+            raise ValueError(f'{path} compiled from other labels files')
+        keys_start = BLOB_HEADER.size
+        offsets_start = keys_start + get_padded_size(n * width)
+        values_start = offsets_start + 8 * (n + 1)
+        self.ids = np.frombuffer(buffer, dtype=f'S{max(width, 1)}', count=n, offset=keys_start)
+        self.offsets = np.frombuffer(buffer, dtype='<u8', count=n + 1, offset=offsets_start)
+        self.__values = memoryview(buffer)[values_start:values_start + values_size]
+
+    def __reduce__(self):
+        # Pickled as its file (and signature) or as its in-memory blob, never decoded
+        if self.path is not None:
+            return LabelStore, (self.path, None, self.signature)
+        return LabelStore, (None, self.to_bytes())
+
+    def to_bytes(self) -> bytes:
+        """ Get the compiled labels blob of the store. """
+        return bytes(self.__buffer)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for k in self.ids.tolist():
+            yield k.decode()
+
+    def __getitem__(self, key: str) -> str:
+        labels = self.get_labels([key])
+        try:
+            return labels[key]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get_labels(self, ids: Iterable[str]) -> Dict[str, str]:
+        """ Get the labels of several IDs at once (one vectorized search).
+
+        Parameters
+        ----------
+        ids: Iterable[str]
+            IDs to look up, IDs without label are ignored
+
+        Returns
+        -------
+        Dict[str, str]
+            Dictionary associating for each ID with a label, its label
+        """
+        if not len(self.ids):
+            return dict()
+        width = self.ids.dtype.itemsize
+        ids = [i for i in ids if isinstance(i, str)]
+        encoded = [i.encode() for i in ids]
+        kept = [n for n, e in enumerate(encoded) if len(e) <= width]  # Longer IDs have no label
+        queries = np.array([encoded[n] for n in kept], dtype=self.ids.dtype)
+        positions = np.minimum(np.searchsorted(self.ids, queries), len(self.ids) - 1)
+        found = np.flatnonzero(self.ids[positions] == queries)
+        starts = self.offsets[positions[found]].tolist()
+        ends = self.offsets[positions[found] + 1].tolist()
+        return {ids[kept[n]]: self.__values[s:e].tobytes().decode()
+                for n, s, e in zip(found.tolist(), starts, ends)}
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def get_label_store(labels_files: List[str], blob_file: str) -> LabelStore:
+    """ Get the LabelStore of labels json files. The files are compiled in blob_file at first use
+    (and again when they change or cannot be read, its directory is created), if blob_file cannot be
+    written the store is kept in memory.
+
+    Parameters
+    ----------
+    labels_files: List[str]
+        ID-LABELS association json files (labels of the last files kept for duplicated IDs)
+    blob_file: str
+        Compiled labels file
+
+    Returns
+    -------
+    LabelStore
+        Labels store
+    """
+    signature = get_files_signature(labels_files)
+    try:
+        return LabelStore(blob_file, signature=signature)
+    except (OSError, ValueError):  # Missing, outdated or unreadable : compiled again
+        pass
+    id_to_label = dict()
+    for labels_file in labels_files:
+        with open(labels_file, 'r') as f:
+            id_to_label.update(json.load(f))
+    blob = compile_labels(id_to_label, signature)
+    try:
+        os.makedirs(os.path.dirname(blob_file), exist_ok=True)
+        write_shared_file(blob_file, blob)
+    except OSError:  # Directory not writable : store kept in memory
+        return LabelStore(buffer=blob)
+    return LabelStore(blob_file)
+
+
+def compile_labels(id_to_label: Dict[str, str], signature: bytes = bytes(32)) -> bytes:
+    """ Compile an ID-LABEL dictionary in a labels blob (see LabelStore).
+
+    Parameters
+    ----------
+    id_to_label: Dict[str, str]
+        Dictionary associating for each ID its label
+    signature: bytes (optional, default=bytes(32))
+        Signature of the labels source (32 bytes)
+
+    Returns
+    -------
+    bytes
+        Labels blob
+    """
+    keys = np.array([k.encode() for k in id_to_label], dtype=bytes)
+    width = keys.dtype.itemsize if len(keys) else 0
+    order = np.argsort(keys, kind='stable')
+    labels = list(id_to_label.values())
+    values = [labels[i].encode() for i in order.tolist()]
+    offsets = np.zeros(len(values) + 1, dtype='<u8')
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    values = b''.join(values)
+    keys = keys[order].tobytes()
+    return b''.join([BLOB_HEADER.pack(BLOB_MAGIC, len(order), width, len(values), signature),
+                     keys, bytes(get_padded_size(len(keys)) - len(keys)), offsets.tobytes(),
+                     values])
+
+
+def write_shared_file(path: str, data: bytes):
+    """ Write a file shared between users (readable by all as allowed by the umask), written in a
+    temporary file then renamed : concurrent readers never read a partial file.
+
+    Parameters
+    ----------
+    path: str
+        File to write
+    data: bytes
+        Content of the file
+    """
+    tmp_path = f'{path}.{os.urandom(8).hex()}.tmp'
+    # Created with the shared mode (umask applied by open, mkstemp files are only readable by
+    # their owner) : the process umask is never changed, other threads are not affected
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def get_files_signature(files: List[str]) -> bytes:
+    """ Get the signature of files : sha256 of their names, sizes and modification times. """
+    stats = list()
+    for file in files:
+        stat = os.stat(file)
+        stats.append((os.path.basename(file), stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(repr(stats).encode()).digest()
+
+
+def get_padded_size(size: int) -> int:
+    return -(-size // 8) * 8
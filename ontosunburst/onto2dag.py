@@ -1,19 +1,27 @@
 from typing import List, Set, Dict, Any
 import numpy
 
+from ontosunburst.label_store import LabelStore
+from ontosunburst.ontology_index import OntologyIndex, SubDag
+
 
 # Main ontology to reduced dag functions
 # --------------------------------------------------------------------------------------------------
-def ontology_to_weighted_dag(concepts, abundances, root, ontology_dag, show_lvs):
+def ontology_to_weighted_dag(concepts, abundances, root, ontology_dag, show_lvs, ancestors=None,
+                             index=None):
     classified_concepts = classify_concepts(concepts, ontology_dag)
-    concepts_all_classes = get_all_classes(classified_concepts, ontology_dag, root)
+    if index is not None and index.root == root:  # Summed on interned classes integers
+        abundances_dict = get_abundance_dict(abundances, concepts)
+        return index.get_weights(list(classified_concepts),
+                                 [abundances_dict[c] for c in classified_concepts], show_lvs)
+    concepts_all_classes = get_all_classes(classified_concepts, ontology_dag, root, ancestors)
     abundances_dict = get_abundance_dict(abundances, concepts)
     calculated_weights = calculate_weights(concepts_all_classes, abundances_dict, show_lvs)
     return calculated_weights
 
 
-def reduce_d_ontology(complete_dictionary: Dict[str, Any],
-                      classes_abundance: Dict[str, float]) -> Dict[str, Any]:
+def reduce_d_ontology(complete_dictionary: Dict[str, Any], classes_abundance: Dict[str, float],
+                      index: OntologyIndex = None) -> Dict[str, Any]:
     """ Extract the sub-graph of the d_classes_ontology dictionary conserving only nodes implicated
     with the concepts studied.
 
@@ -23,19 +31,46 @@ def reduce_d_ontology(complete_dictionary: Dict[str, Any],
         Dictionary of the ontology complete graph
     classes_abundance: Dict[str, float]
         Dictionary of abundances (keys are all nodes implicated to be conserved)
+    index: OntologyIndex (optional, default=None)
+        Index of complete_dictionary : implicated nodes are then looked up directly instead of
+        scanning all complete_dictionary
 
     Returns
     -------
     Dict[str, Any]
-        Dictionary of the ontology sub-graph conserving only nodes implicated with the concepts
-        studied.
+        View of the ontology sub-graph conserving only nodes implicated with the concepts
+        studied, in complete_dictionary order.
     """
     if complete_dictionary is not None:
-        reduced_dictionary = dict()
-        for k, v in complete_dictionary.items():
-            if k in classes_abundance:
-                reduced_dictionary[k] = v
-        return reduced_dictionary
+        if index is not None:
+            classes = index.sort(c for c in classes_abundance if c in complete_dictionary)
+        else:
+            classes = [c for c in complete_dictionary if c in classes_abundance]
+        return SubDag(complete_dictionary, classes)
+
+
+def reduce_labels(id_to_label: Dict[str, str] or LabelStore,
+                  classes_abundance: Dict[str, float]) -> Dict[str, str]:
+    """ Extract the labels of the nodes implicated with the concepts studied, looked up directly
+    (only the implicated labels are decoded from a LabelStore).
+
+    Parameters
+    ----------
+    id_to_label: Dict[str, str] or LabelStore
+        Dictionary associating for each ontology ID, its label
+    classes_abundance: Dict[str, float]
+        Dictionary of abundances (keys are all nodes implicated to be conserved)
+
+    Returns
+    -------
+    Dict[str, str]
+        Dictionary associating for each implicated node with a label, its label
+    """
+    if id_to_label is not None:
+        if isinstance(id_to_label, LabelStore):
+            return id_to_label.get_labels(classes_abundance)
+        return {c: id_to_label[c] for c in classes_abundance if c in id_to_label}
+
 
 # ==================================================================================================
 # REDUCE DAG FUNCTIONS
@@ -74,7 +109,7 @@ def classify_concepts(concepts: List[str], ontology_dag: Dict[str, List[str]]) \
 # Recursive class extraction function
 # --------------------------------------------------------------------------------------------------
 def get_all_classes(obj_classes: Dict[str, List[str]], d_classes_ontology: Dict[str, List[str]],
-                    root_item: str) -> Dict[str, Set[str]]:
+                    root_item: str, ancestors: Dict[str, Set[str]] = None) -> Dict[str, Set[str]]:
     """ Extract all parent classes for each metabolite.
 
     Parameters
@@ -85,6 +120,9 @@ def get_all_classes(obj_classes: Dict[str, List[str]], d_classes_ontology: Dict[
         Dictionary of the classes ontology associating for each class its +1 parent classes.
     root_item: str
         Name of the root item of the ontology.
+    ancestors: Dict[str, Set[str]] (optional, default=None)
+        Memo of classes ancestors kept between calls on the same ontology (see get_ancestors).
+        If None, ancestors are extracted again for each metabolite.
 
     Returns
     -------
@@ -96,7 +134,11 @@ def get_all_classes(obj_classes: Dict[str, List[str]], d_classes_ontology: Dict[
         all_classes = set(classes)
         for c in classes:
             if c != root_item:
-                m_classes = get_parents(c, set(d_classes_ontology[c]), d_classes_ontology, root_item)
+                if ancestors is None:
+                    m_classes = get_parents(c, set(d_classes_ontology[c]), d_classes_ontology,
+                                            root_item)
+                else:
+                    m_classes = get_ancestors(c, d_classes_ontology, root_item, ancestors)
                 all_classes = all_classes.union(m_classes)
         all_classes_met[met] = all_classes
     return all_classes_met
@@ -131,6 +173,41 @@ def get_parents(child: str, parent_set: Set[str], d_classes_ontology: Dict[str,
     return parent_set
 
 
+def get_ancestors(child: str, d_classes_ontology: Dict[str, List[str]], root_item: str,
+                  ancestors: Dict[str, Set[str]]) -> Set[str]:
+    """ Get all parents classes of a class found in ontology (same classes as get_parents), memoized
+    in the ancestors dictionary for each visited class.
+
+    Parameters
+    ----------
+    child: str
+        Child class
+    d_classes_ontology: Dict[str, List[str]]
+        Dictionary of the classes ontology associating for each class its parent classes.
+    root_item: str
+        Name of the root item of the ontology
+    ancestors: Dict[str, Set[str]]
+        Memo associating for already visited classes all their parents classes (filled)
+
+    Returns
+    -------
+    Set[str]
+        Set of all child parent classes (must not be modified)
+    """
+    try:
+        return ancestors[child]
+    except KeyError:
+        pass
+    parents = d_classes_ontology[child]
+    parent_set = set(parents)
+    for p in parents:
+        if p != root_item:
+            parent_set.update(get_ancestors(p, d_classes_ontology, root_item, ancestors))
+    parent_set = frozenset(parent_set)
+    ancestors[child] = parent_set
+    return parent_set
+
+
 # ==================================================================================================
 # WEIGHTS CALCULATION
 # ==================================================================================================
@@ -155,9 +232,7 @@ def get_abundance_dict(abundances: List[float] or None, concepts: List[str])\
     if abundances is None:
         abundances = len(concepts) * [1]
     if len(concepts) == len(abundances):
-        abundances_dict = {}
-        for i in range(len(concepts)):
-            abundances_dict[concepts[i]] = abundances[i]
+        abundances_dict = dict(zip(concepts, abundances))
     else:
         raise AttributeError(f'Length of concepts IDs list must be equal to '
                              f'its abundances list length : {len(concepts)} '
@@ -0,0 +1,273 @@
+from collections.abc import Mapping, Sequence
+from typing import List, Dict, Set, Iterable
+
+import numpy as np
+
+
+# ==================================================================================================
+# CLASSES
+# ==================================================================================================
+class OntologyIndex:
+    """
+    OntologyIndex class: index of an ontology DAG built once and shared by the pipeline runs on
+    this ontology (the DAG must not be modified after). Classes IDs are interned as dense integers
+    (DAG classes first, in ontology order, then classes only found as parents), the parents and
+    the ancestors of classes are stored as integers arrays.
+
+    Attributes
+    ----------
+    self.ids: List[str]
+        Interned IDs : classes of the ontology DAG in ontology order, then parents classes missing
+        from the DAG
+    self.positions: Dict[str, int]
+        Dictionary associating for each interned ID its integer (position in self.ids)
+    self.n_classes: int
+        Number of classes of the ontology DAG (integers of DAG classes are < n_classes)
+    self.root: str or None
+        Root item of the ontology (needed for ancestors)
+    self.parents_indptr: np.ndarray (size len(ids) + 1)
+        Parents of integer i are parents_indices[parents_indptr[i]:parents_indptr[i + 1]]
+    self.parents_indices: np.ndarray
+        Parents integers of all interned IDs
+    self.children_indptr, self.children_indices: np.ndarray
+        Children of integer i (in ontology order), same layout as parents (None until
+        self.build_children() is called)
+    """
+
+    def __init__(self, ontology_dag: Dict[str, List[str]], root: str = None):
+        ids = list(ontology_dag)
+        positions = {c: i for i, c in enumerate(ids)}
+        n_classes = len(ids)
+        indptr = [0]
+        indices = list()
+        for parents in ontology_dag.values():
+            for p in parents:
+                try:
+                    indices.append(positions[p])
+                except KeyError:
+                    positions[p] = len(ids)
+                    indices.append(len(ids))
+                    ids.append(p)
+            indptr.append(len(indices))
+        indptr.extend([len(indices)] * (len(ids) - n_classes))
+        self._set_index(ids, positions, n_classes, root, np.array(indptr, dtype=np.int64),
+                        np.array(indices, dtype=np.int32))
+
+    def _set_index(self, ids: Sequence[str], positions: Mapping, n_classes: int, root: str,
+                   parents_indptr: np.ndarray, parents_indices: np.ndarray):
+        """ Set the interned IDs and the parents arrays (see attributes), ancestors and children
+        are extracted from them. """
+        self.ids = ids
+        self.positions = positions
+        self.n_classes = n_classes
+        self.root = root
+        self.parents_indptr = parents_indptr
+        self.parents_indices = parents_indices
+        self.children_indptr = None
+        self.children_indices = None
+        self.__root_int = positions.get(root, -1)
+        self.__closures = dict()
+        self.__children_dict = None
+
+    def __len__(self):
+        return self.n_classes
+
+    def sort(self, classes: Iterable[str]) -> List[str]:
+        """ Sort classes of the ontology in ontology order. """
+        return sorted(classes, key=self.positions.__getitem__)
+
+    def get_parents(self, i: int) -> np.ndarray:
+        return self.parents_indices[self.parents_indptr[i]:self.parents_indptr[i + 1]]
+
+    def build_children(self):
+        """ Build the children arrays (inverse of the parents arrays), once. """
+        if self.children_indptr is not None:
+            return
+        rows = np.repeat(np.arange(len(self.ids), dtype=np.int32), np.diff(self.parents_indptr))
+        order = np.argsort(self.parents_indices, kind='stable')  # Children kept in ontology order
+        indptr = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parents_indices, minlength=len(self.ids)), out=indptr[1:])
+        self.children_indices = rows[order]
+        self.children_indptr = indptr  # Set last : arrays complete for concurrent runs
+
+    def get_children_dict(self) -> Dict[str, List[str]]:
+        """ Get the children dictionary of the complete ontology (same children lists as
+        dag2tree.get_children_dict on the ontology DAG), built once from the children arrays.
+
+        Returns
+        -------
+        Dict[str, List[str]]
+            Dictionary associating for each interned ID, its children classes (must not be
+            modified)
+        """
+        if self.__children_dict is None:
+            self.build_children()
+            ids = self.ids
+            children = [ids[ch] for ch in self.children_indices.tolist()]
+            indptr = self.children_indptr.tolist()
+            self.__children_dict = {c: children[indptr[i]:indptr[i + 1]]
+                                    for i, c in enumerate(ids)}
+        return self.__children_dict
+
+    def get_closure(self, i: int) -> np.ndarray:
+        """ Get all parents classes integers of a class integer (same classes as
+        onto2dag.get_ancestors), memoized for each visited class.
+
+        Parameters
+        ----------
+        i: int
+            Class integer
+
+        Returns
+        -------
+        np.ndarray
+            Sorted integers of all the class parents classes (must not be modified)
+        """
+        try:
+            return self.__closures[i]
+        except KeyError:
+            pass
+        if i >= self.n_classes:  # Parent missing from the ontology : fails as onto2dag
+            raise KeyError(self.ids[i])
+        parents = self.get_parents(i)
+        closures = [parents]
+        for p in parents.tolist():
+            if p != self.__root_int:
+                closures.append(self.get_closure(p))
+        closure = np.unique(np.concatenate(closures))
+        self.__closures[i] = closure
+        return closure
+
+    def has_closure(self, i: int) -> bool:
+        return i in self.__closures
+
+    def get_closures_number(self) -> int:
+        return len(self.__closures)
+
+    def precompute_closures(self) -> int:
+        """ Extract the ancestors of all classes of the ontology.
+
+        Returns
+        -------
+        int
+            Number of classes with ancestors extracted
+        """
+        for i in range(self.n_classes):
+            if i != self.__root_int:
+                try:
+                    self.get_closure(i)
+                except KeyError:  # Parent missing from the ontology, fails at use as without memo
+                    pass
+        return len(self.__closures)
+
+    def get_weights(self, concepts: List[str], abundances: List[float],
+                    show_leaves: bool) -> Dict[str, float]:
+        """ Indicate for each class the weight of concepts found belonging to the class (same
+        weights as onto2dag.calculate_weights), summed on interned integers arrays.
+
+        Parameters
+        ----------
+        concepts: List[str] (size N)
+            Classified concepts, without duplicates
+        abundances: List[float] (size N)
+            Concepts abundances
+        show_leaves: bool
+            True to count concepts as classes
+
+        Returns
+        -------
+        Dict[str, float]
+            Dictionary associating for each class the weight of concepts found belonging to the
+            class, sorted by decreasing weights
+        """
+        concepts_int = [self.positions[c] for c in concepts]
+        closures = [self.get_closure(i) for i in concepts_int]
+        abundances = np.asarray(abundances)
+        dtype = np.int64 if abundances.dtype.kind in 'iub' else np.float64
+        weights = np.zeros(len(self.ids), dtype=dtype)
+        found = np.zeros(len(self.ids), dtype=bool)
+        if closures:
+            sizes = np.array([len(c) for c in closures])
+            classes_int = np.concatenate(closures)
+            if show_leaves:  # Each concept counted before its classes, as calculate_weights
+                starts = np.cumsum(sizes) - sizes
+                classes_int = np.insert(classes_int, starts, concepts_int)
+                sizes += 1
+            np.add.at(weights, classes_int,
+                      np.repeat(abundances.astype(dtype, copy=False), sizes))
+            found[classes_int] = True
+        found = np.flatnonzero(found)
+        classes_weights = zip([self.ids[i] for i in found.tolist()], weights[found].tolist())
+        return dict(reversed(sorted(classes_weights, key=lambda item: item[1])))
+
+
+class AncestorsView(Mapping):
+    """
+    AncestorsView class: read-only view of the ancestors extracted in an OntologyIndex, as classes
+    IDs sets (same as the onto2dag.get_ancestors memo).
+
+    Attributes
+    ----------
+    self.index: OntologyIndex
+        Ontology index
+    """
+
+    def __init__(self, index: OntologyIndex):
+        self.index = index
+
+    def __len__(self):
+        return self.index.get_closures_number()
+
+    def __iter__(self):
+        for i in range(self.index.n_classes):
+            if self.index.has_closure(i):
+                yield self.index.ids[i]
+
+    def __contains__(self, c):
+        try:
+            i = self.index.positions[c]
+        except KeyError:
+            return False
+        return i < self.index.n_classes and self.index.has_closure(i)
+
+    def __getitem__(self, c: str) -> Set[str]:
+        if c not in self:
+            raise KeyError(c)
+        ids = self.index.ids
+        return frozenset(ids[i] for i in self.index.get_closure(self.index.positions[c]).tolist())
+
+
+class SubDag(Mapping):
+    """
+    SubDag class: read-only view of some classes of an ontology DAG dictionary, the DAG is not
+    copied. Pickled as a plain dictionary.
+
+    Attributes
+    ----------
+    self.dag: Dict[str, List[str]]
+        Complete ontology DAG dictionary
+    self.classes: List[str]
+        Classes of the view, in iteration order
+    """
+
+    def __init__(self, dag: Dict[str, List[str]], classes: List[str]):
+        self.dag = dag
+        self.classes = classes
+        self.__classes_set = set(classes)
+
+    def __reduce__(self):
+        return dict, (list(self.items()),)
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __iter__(self):
+        return iter(self.classes)
+
+    def __contains__(self, c):
+        return c in self.__classes_set
+
+    def __getitem__(self, c: str) -> List[str]:
+        if c not in self.__classes_set:
+            raise KeyError(c)
+        return self.dag[c]
@@ -0,0 +1,183 @@
+import threading
+from typing import List, Dict, Set
+
+from ontosunburst.ontosunburst import get_id_to_label_dict, get_ontology_dag_dict, \
+    get_ontology_root, get_ontology_files
+from ontosunburst.checkpoint import get_hash, get_files_fingerprint
+from ontosunburst.ontology_index import OntologyIndex, AncestorsView
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+# Ontologies kept loaded in the process {(ontology, labels): LoadedOntology}
+LOADED_ONTOLOGIES = dict()
+LOADED_ONTOLOGIES_LOCK = threading.Lock()
+
+
+# ==================================================================================================
+# CLASS
+# ==================================================================================================
+class LoadedOntology:
+    """
+    LoadedOntology class: ontology structures parsed once and kept in memory to be reused by
+    several pipeline runs (no file parsing per run, ancestors extracted once per class).
+
+    Attributes
+    ----------
+    self.name: str or None
+        Default ontology name (None for tailored ontology)
+    self.dag: Dict[str, List[str]]
+        Ontology DAG dictionary associating for each class, its parents classes
+    self.root: str
+        Root item of the ontology
+    self.labels: Dict[str, str] or None
+        Dictionary associating for each ontology ID, its label (None if labels not used)
+    self.index: OntologyIndex
+        Index of the ontology DAG (interned classes IDs, parents and ancestors arrays)
+    self.ancestors: Dict[str, Set[str]]
+        View of the classes ancestors extracted in self.index, filled by the pipeline runs or by
+        self.precompute_ancestors()
+    self.sources: List[str] or None
+        Classes files the ontology DAG was loaded from (None if loaded from a dictionary)
+    """
+
+    def __init__(self, ontology_dag: Dict[str, List[str]], root: str,
+                 id_to_label: Dict[str, str] = None, name: str = None, sources: List[str] = None):
+        self.name = name
+        self.dag = ontology_dag
+        self.root = root
+        self.labels = id_to_label
+        self.index = OntologyIndex(ontology_dag, root)
+        self.ancestors = AncestorsView(self.index)
+        self.sources = sources
+        self.__fingerprint = None
+
+    def __str__(self):
+        return f'{self.name} ({len(self.dag)} classes, root {self.root}, ' \
+               f'{len(self.ancestors)} ancestors closures)'
+
+    def precompute_ancestors(self) -> int:
+        """ Extract the ancestors of all classes of the ontology in self.index.
+
+        Returns
+        -------
+        int
+            Number of classes with ancestors extracted
+        """
+        return self.index.precompute_closures()
+
+    def get_fingerprint(self) -> str:
+        """ Get the fingerprint of the ontology DAG for checkpoints, computed once : from its
+        source files if loaded from files (see checkpoint.get_files_fingerprint), else from its
+        content. """
+        if self.__fingerprint is None:
+            self.__fingerprint = get_files_fingerprint(self.sources) \
+                if self.sources is not None else get_hash(self.dag)
+        return self.__fingerprint
+
+    def get_stats(self) -> Dict:
+        """ Get the sizes of the loaded structures.
+
+        Returns
+        -------
+        Dict
+            {name, root, classes, labels, ancestors}
+        """
+        return {'name': self.name, 'root': self.root, 'classes': len(self.dag),
+                'labels': len(self.labels) if self.labels is not None else 0,
+                'ancestors': len(self.ancestors)}
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def load_ontology(ontology: str = None, ontology_dag_input: str or Dict[str, List[str]] = None,
+                  input_root: str = None, id_to_label_input: str or Dict[str, str] = None,
+                  labels: bool = True, precompute: bool = False,
+                  cache_dir: str = None) -> LoadedOntology:
+    """ Load an ontology (default or tailored) in a LoadedOntology. Parameters are the same as
+    ontosunburst() ones.
+
+    Parameters
+    ----------
+    ontology: str (optional, default=None)
+        Default ontology name to use
+    ontology_dag_input: str or Dict[str, List[str]] (optional, default=None)
+        Ontology DAG dictionary or json file
+    input_root: str (optional, default=None)
+        Root item of the ontology (to precise if tailored ontology)
+    id_to_label_input: str or Dict[str, str] (optional, default=None)
+        ID-LABELS association json file or dictionary
+    labels: bool (optional, default=True)
+        True to load labels, False otherwise
+    precompute: bool (optional, default=False)
+        True to extract all classes ancestors at loading, False to extract them at first use
+    cache_dir: str (optional, default=None)
+        Directory of the aggregated GO classes file and compiled labels files (see
+        ontosunburst())
+
+    Returns
+    -------
+    LoadedOntology
+        Loaded ontology
+    """
+    loaded = LoadedOntology(ontology_dag=get_ontology_dag_dict(ontology, ontology_dag_input,
+                                                               cache_dir),
+                            root=get_ontology_root(ontology, input_root),
+                            id_to_label=get_id_to_label_dict(id_to_label_input, labels, ontology,
+                                                             cache_dir),
+                            name=ontology,
+                            sources=get_ontology_files(ontology, ontology_dag_input))
+    if precompute:
+        loaded.precompute_ancestors()
+    return loaded
+
+
+def get_loaded_ontology(ontology: str, labels: bool = True, precompute: bool = False,
+                        cache_dir: str = None) -> LoadedOntology:
+    """ Get a default ontology loaded once per process (loaded at first call, and again when its
+    classes files change).
+
+    Parameters
+    ----------
+    ontology: str
+        Default ontology name
+    labels: bool (optional, default=True)
+        True to load labels, False otherwise
+    precompute: bool (optional, default=False)
+        True to extract all classes ancestors at loading
+    cache_dir: str (optional, default=None)
+        Directory of the aggregated GO classes file and compiled labels files, used when the
+        ontology is loaded
+
+    Returns
+    -------
+    LoadedOntology
+        Loaded ontology shared by all callers
+    """
+    key = (ontology, labels)
+    with LOADED_ONTOLOGIES_LOCK:
+        loaded = LOADED_ONTOLOGIES.get(key)
+        if loaded is None or is_outdated(loaded):
+            loaded = load_ontology(ontology, labels=labels, precompute=precompute,
+                                   cache_dir=cache_dir)
+            loaded.get_fingerprint()  # Files state at loading
+            LOADED_ONTOLOGIES[key] = loaded
+        return loaded
+
+
+def is_outdated(loaded: LoadedOntology) -> bool:
+    """ True if the classes files of a loaded default ontology changed since it was loaded (other
+    version pinned, files modified), False if unchanged or not loaded from files. """
+    if loaded.sources is None:
+        return False
+    sources = get_ontology_files(loaded.name, None)
+    return sources != loaded.sources or get_files_fingerprint(sources) != loaded.get_fingerprint()
+
+
+def clear_loaded_ontologies():
+    """ Remove all ontologies loaded by get_loaded_ontology. """
+    with LOADED_ONTOLOGIES_LOCK:
+        LOADED_ONTOLOGIES.clear()
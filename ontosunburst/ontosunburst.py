@@ -1,15 +1,26 @@
 import os
 import json
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Tuple, TYPE_CHECKING
 from time import time
-import plotly.graph_objects as go
-
-from ontosunburst.onto2dag import ontology_to_weighted_dag, get_classes_scores, reduce_d_ontology
 
+from ontosunburst.onto2dag import ontology_to_weighted_dag, get_classes_scores, reduce_d_ontology, \
+    reduce_labels
+from ontosunburst.reader import get_input_set, is_array_input, is_series
+from ontosunburst.checkpoint import CheckpointCache, CHECKPOINT_STAGES, get_files_fingerprint
+from ontosunburst.label_store import get_label_store, write_shared_file, LABELS_BLOB_EXT
+from ontosunburst.registry import OntologyRegistry
 
 from ontosunburst.dag2tree import TreeData, get_name, BINOMIAL_TEST, HYPERGEO_TEST, ROOT_CUT, \
-    ROOT_TOTAL_CUT, ROOT_UNCUT, PATH_UNCUT, PATH_BOUND, PATH_DEEPER, PATH_HIGHER
-from ontosunburst.tree2sunburst import generate_sunburst_fig, TOPOLOGY_A, ENRICHMENT_A
+    ROOT_TOTAL_CUT, ROOT_UNCUT, PATH_UNCUT, PATH_BOUND, PATH_DEEPER, PATH_HIGHER, TABLE_FORMATS, \
+    ROOT_CUTS, PATH_CUTS
+from ontosunburst.tree2sunburst import generate_sunburst_fig, generate_sunburst_svg, TOPOLOGY_A, \
+    ENRICHMENT_A, HTML_F, SVG_F, FIGURE_FORMATS
+from ontosunburst.profiling import PipelineProfile, StageObserver, merge_observers, LOAD_S, \
+    WEIGHT_S, REDUCE_S, TREE_S, PROPORTIONS_S, ENRICHMENT_S, ROOT_CUT_S, PATH_CUT_S, RENDER_S, \
+    WRITE_S
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 # ==================================================================================================
 #                                           CONSTANTS
@@ -29,6 +40,7 @@ GO_MF = 'go_mf'
 GO_BP = 'go_bp'
 GO = 'go'
 KEGG = 'kegg'
+GO_SUB_ONTOLOGIES = [GO_BP, GO_CC, GO_MF]
 
 ROOTS = {METACYC: 'FRAMES',
          CHEBI: 'chebi',
@@ -40,6 +52,14 @@ ROOTS = {METACYC: 'FRAMES',
          GO: 'GO',
          KEGG: 'kegg'}
 
+# Default ontologies files, other directories can be registered (REGISTRY.add_directory)
+REGISTRY = OntologyRegistry([DEFAULT_PATH], ROOTS)
+
+# Compiled files (labels blobs) written by default in $XDG_CACHE_HOME/ontosunburst, never in the
+# package directory
+CACHE_HOME_ENV = 'XDG_CACHE_HOME'
+CACHE_DIR_NAME = 'ontosunburst'
+
 
 # ==================================================================================================
 #                                            WORKFLOW
@@ -63,28 +83,36 @@ def ontosunburst(interest_set: List[str],
                  path_cut: str = PATH_UNCUT,
                  ref_base: bool = False,
                  show_leaves: bool = False,
-                 **kwargs) -> go.Figure:
+                 profile: bool = False,
+                 observer: StageObserver = None,
+                 table_format: str = None,
+                 cache_dir: str = None,
+                 output_format: str = HTML_F,
+                 **kwargs) -> 'go.Figure' or str or Tuple['go.Figure' or str, PipelineProfile]:
     """ Main function to be called generating the sunburst figure
 
     Parameters
     ----------
-    interest_set: List[str]
-        Interest list of concepts IDs to classify.
+    interest_set: List[str] or np.ndarray or pd.Series or pd.DataFrame
+        Interest list of concepts IDs to classify. Can also be a DataFrame with 'id' column (or IDs
+        index) and optional 'abundance' and 'score' columns, or a Series of abundances indexed
+        by IDs.
     ontology: str (optional, default=None, values in ['metacyc', 'ec', 'chebi', 'chebi_r', 'kegg',
                                                       'go_cc', 'go_bp', 'go_mf', 'go', None])
-        Ontology name to use.
-    abundances: List[str] (optional, default=None)
+        Ontology name to use. A default ontology is loaded once per process with its classes
+        index, reused by the next runs (see ontology_store.clear_loaded_ontologies).
+    abundances: List[str] or np.ndarray or pd.Series (optional, default=None)
         Abundance values associated to interest_set list parameter
-    reference_set: List[str] (optional, default=None)
-        Reference list of concepts IDs.
-    ref_abundances: List[str] (optional, default=None)
+    reference_set: List[str] or np.ndarray or pd.Series or pd.DataFrame (optional, default=None)
+        Reference list of concepts IDs (same formats as interest_set, scores ignored).
+    ref_abundances: List[str] or np.ndarray or pd.Series (optional, default=None)
         Abundance values associated to reference_set list parameter
     analysis: str (optional, default='topology', values in ['topology', 'enrichment'])
         Analysis mode : topology or enrichment.
     output: str (optional, default='sunburst')
         Path of the output to save figure, if None, outputs will be sunburst.html and sunburst.tsv
         files
-    scores: Dict[str, float] (optional, default=None)
+    scores: Dict[str, float] or pd.Series (optional, default=None)
         Dictionary associating for each ontology ID, its precalculated enrichment score. If None
         enrichment will be calculated.
     write_output: bool (optional, default=True)
@@ -111,37 +139,155 @@ def ontosunburst(interest_set: List[str],
         True to have the base classes representation of the reference set in the figure.
     show_leaves: bool (optional, default=False)
         True to show input metabolic objets at sunburst leaves
+    profile: bool (optional, default=False)
+        True to measure each pipeline stage (wall time, peak memory, element counts). The profile is
+        then returned with the figure and written in output_profile.json file if write_output.
+        Peak memory is not measured (None) for stages overlapping another profiled run.
+    observer: StageObserver (optional, default=None)
+        Object with on_stage_start(stage, **counts) and on_stage_end(stage, **counts) methods called
+        at the start and the end of each pipeline stage.
+    table_format: str (optional, default=None, values in ['tsv', 'parquet', 'feather', None])
+        Format of the sectors table written in output_tree.<format> file if write_output, None
+        to not write it. Parquet and Feather formats need pyarrow to be installed.
+    cache_dir: str (optional, default=None)
+        Directory of the stages checkpoints (weights, reduced DAG, tree, enriched tree), a run with
+        the same inputs resumes from the last checkpoint. The aggregated GO classes file and the
+        compiled labels files are also written there. None to not use checkpoints (compiled
+        labels files are then written in the user cache directory).
+    output_format: str (optional, default='html', values in ['html', 'svg'])
+        Format of the figure : interactive plotly figure written in output.html file, or static
+        SVG figure (without plotly) written in output.svg file
     **kwargs
 
     Returns
     -------
-    go.Figure
-        Plotly graph_objects figure of the sunburst
+    go.Figure or str
+        Plotly graph_objects figure of the sunburst, or SVG document if output_format='svg'
+    PipelineProfile
+        Per-stage report of the pipeline run, only returned if profile
     """
     start_time = time()
-    # LOAD ID TO LABELS DICTIONARY -----------------------------------------------------------------
-    id_to_label = get_id_to_label_dict(id_to_label_input, labels, ontology)
-    # LOAD ONTOLOGY DAG DICTIONARY -----------------------------------------------------------------
-    ontology_dag = get_ontology_dag_dict(ontology, ontology_dag_input)
-    # GET ROOT -------------------------------------------------------------------------------------
-    root = get_ontology_root(ontology, input_root)
-    # WORKFLOW -------------------------------------------------------------------------------------
-    fig = _global_analysis(analysis=analysis,
-                           interest_concepts=interest_set, abundances=abundances,
-                           scores=scores,
-                           reference_concepts=reference_set, ref_abundances=ref_abundances,
-                           ontology_dag=ontology_dag,
-                           output=output, write_output=write_output, id_to_label=id_to_label,
-                           test=test, root=root, root_cut=root_cut, path_cut=path_cut,
-                           ref_base=ref_base, show_leaves=show_leaves, **kwargs)
+    pipeline_profile = PipelineProfile() if profile else None
+    observer = merge_observers(pipeline_profile, observer)
+    try:
+        if observer is not None:
+            observer.on_stage_start(LOAD_S)
+        # LOAD ID TO LABELS DICTIONARY -------------------------------------------------------------
+        id_to_label = get_id_to_label_dict(id_to_label_input, labels, ontology, cache_dir)
+        # LOAD ONTOLOGY DAG DICTIONARY -------------------------------------------------------------
+        ontology_dag, ontology_index = get_ontology_dag_index(ontology, ontology_dag_input,
+                                                              cache_dir)
+        # GET ROOT ---------------------------------------------------------------------------------
+        root = get_ontology_root(ontology, input_root)
+        if observer is not None:
+            observer.on_stage_end(LOAD_S, classes=len(ontology_dag),
+                                  labels=len(id_to_label) if id_to_label is not None else 0)
+        # WORKFLOW ---------------------------------------------------------------------------------
+        checkpoint = get_checkpoint(cache_dir, ontology, ontology_dag_input, ontology_dag)
+        fig = _global_analysis(analysis=analysis,
+                               interest_concepts=interest_set, abundances=abundances,
+                               scores=scores,
+                               reference_concepts=reference_set, ref_abundances=ref_abundances,
+                               ontology_dag=ontology_dag,
+                               output=output, write_output=write_output, id_to_label=id_to_label,
+                               test=test, root=root, root_cut=root_cut, path_cut=path_cut,
+                               ref_base=ref_base, show_leaves=show_leaves, observer=observer,
+                               table_format=table_format, checkpoint=checkpoint,
+                               ontology_index=ontology_index, output_format=output_format,
+                               **kwargs)
+    finally:
+        if pipeline_profile is not None:
+            pipeline_profile.stop()  # Memory tracing stopped even if a stage fails
     end_time = time()
     print(f'Execution time : {end_time - start_time} seconds')
+    if pipeline_profile is not None:
+        if write_output:
+            pipeline_profile.write_json(f'{output}_profile.json')
+        return fig, pipeline_profile
     return fig
 
 
+def ontosunburst_sweep(interest_set: List[str],
+                       ontology: str = None,
+                       abundances: List[float] = None,
+                       reference_set: List[str] = None,
+                       ref_abundances: List[float] = None,
+                       analysis: str = TOPOLOGY_A,
+                       output: str = 'sunburst',
+                       scores: Dict[str, float] = None,
+                       write_output: bool = True,
+                       ontology_dag_input: str or Dict[str, str] = None,
+                       input_root: str = None,
+                       id_to_label_input: str or Dict[str, str] = None,
+                       labels: bool = True,
+                       test: str = BINOMIAL_TEST,
+                       root_cuts: List[str] = None,
+                       path_cuts: List[str] = None,
+                       ref_base: bool = False,
+                       show_leaves: bool = False,
+                       observer: StageObserver = None,
+                       table_format: str = None,
+                       cache_dir: str = None,
+                       output_format: str = HTML_F,
+                       **kwargs) -> Dict[Tuple[str, str], 'go.Figure' or str]:
+    """ Generate the sunburst figures of all root cut and path cut combinations. The tree is
+    built (and enriched) once, each variant is cut from a copy of it.
+
+    Parameters
+    ----------
+    interest_set ... ref_base, show_leaves, observer, table_format, cache_dir, output_format,
+    **kwargs
+        Same as ontosunburst() parameters
+    root_cuts: List[str] (optional, default=None)
+        Root cut modes of the variants, None for all modes (uncut, cut, total)
+    path_cuts: List[str] (optional, default=None)
+        Path cut modes of the variants, None for all modes (uncut, deeper, higher, bound)
+
+    Returns
+    -------
+    Dict[Tuple[str, str], go.Figure or str]
+        Dictionary associating for each (root cut, path cut) variant its figure, written in
+        output_<root cut>_<path cut>.<output_format> file if write_output
+    """
+    start_time = time()
+    if root_cuts is None:
+        root_cuts = ROOT_CUTS
+    if path_cuts is None:
+        path_cuts = PATH_CUTS
+    if observer is not None:
+        observer.on_stage_start(LOAD_S)
+    id_to_label = get_id_to_label_dict(id_to_label_input, labels, ontology, cache_dir)
+    ontology_dag, ontology_index = get_ontology_dag_index(ontology, ontology_dag_input, cache_dir)
+    root = get_ontology_root(ontology, input_root)
+    if observer is not None:
+        observer.on_stage_end(LOAD_S, classes=len(ontology_dag),
+                              labels=len(id_to_label) if id_to_label is not None else 0)
+    tree_data, significant, ref_set = _build_tree(
+        analysis=analysis, interest_concepts=interest_set, abundances=abundances, scores=scores,
+        reference_concepts=reference_set, ref_abundances=ref_abundances,
+        ontology_dag=ontology_dag, id_to_label=id_to_label, test=test, root=root,
+        ref_base=ref_base, show_leaves=show_leaves, observer=observer,
+        checkpoint=get_checkpoint(cache_dir, ontology, ontology_dag_input, ontology_dag),
+        ontology_index=ontology_index)
+    figures = dict()
+    for root_cut in root_cuts:
+        for path_cut in path_cuts:
+            variant = tree_data.copy()
+            _cut_tree(variant, root_cut, path_cut, ref_base, observer)
+            figures[(root_cut, path_cut)] = _render_tree(
+                tree_data=variant, significant=significant, ref_set=ref_set, analysis=analysis,
+                test=test, output=f'{output}_{root_cut}_{path_cut}', write_output=write_output,
+                observer=observer, table_format=table_format, output_format=output_format,
+                **kwargs)
+    print(f'Execution time : {time() - start_time} seconds')
+    return figures
+
+
 def _global_analysis(analysis, interest_concepts, abundances, scores, reference_concepts,
                      ref_abundances, ontology_dag, output, write_output, id_to_label,
-                     test, root, root_cut, path_cut, ref_base, show_leaves, **kwargs):
+                     test, root, root_cut, path_cut, ref_base, show_leaves, observer=None,
+                     ancestors=None, table_format=None, checkpoint=None, ontology_index=None,
+                     output_format=HTML_F, **kwargs):
     """
 
     Parameters
@@ -161,39 +307,197 @@ def _global_analysis(analysis, interest_concepts, abundances, scores, reference_
     path_cut
     ref_base
     show_leaves
+    observer: StageObserver (optional, default=None)
+        Observer called at the start and the end of each stage (load excluded) with the stage sizes
+    ancestors: Dict[str, Set[str]] (optional, default=None)
+        Memo of the ontology classes ancestors kept between runs (see onto2dag.get_ancestors)
+    table_format: str (optional, default=None)
+        Format of the sectors table written in output_tree.<format> file if write_output
+    checkpoint: CheckpointCache (optional, default=None)
+        Cache of the stages outputs to resume from (see checkpoint module)
+    ontology_index: OntologyIndex (optional, default=None)
+        Index of the ontology DAG kept between runs (see ontology_index module) : weights are then
+        summed on interned classes integers and the ontology is reduced by direct lookups
+    output_format: str (optional, default='html')
+        Format of the figure written in output.<format> file if write_output (html or svg)
     kwargs
 
     Returns
     -------
 
     """
-    # ONTOLOGY TO WEIGHTED DAG
+    tree_data, significant, ref_set = _tree_analysis(
+        analysis=analysis, interest_concepts=interest_concepts, abundances=abundances,
+        scores=scores, reference_concepts=reference_concepts, ref_abundances=ref_abundances,
+        ontology_dag=ontology_dag, id_to_label=id_to_label, test=test, root=root,
+        root_cut=root_cut, path_cut=path_cut, ref_base=ref_base, show_leaves=show_leaves,
+        observer=observer, ancestors=ancestors, checkpoint=checkpoint,
+        ontology_index=ontology_index)
+
+    return _render_tree(tree_data=tree_data, significant=significant, ref_set=ref_set,
+                        analysis=analysis, test=test, output=output, write_output=write_output,
+                        observer=observer, table_format=table_format,
+                        output_format=output_format, **kwargs)
+
+
+def _render_tree(tree_data, significant, ref_set, analysis, test, output, write_output,
+                 observer=None, table_format=None, output_format=HTML_F,
+                 **kwargs) -> 'go.Figure' or str:
+    """ Generate the sunburst figure of a TreeData (plotly figure, or SVG document if
+    output_format is svg) and write it (with the sectors table if table_format) if write_output.
+    Parameters are the same as _global_analysis.
+    """
+    if output_format not in FIGURE_FORMATS:
+        raise ValueError(f'Output format must be in {FIGURE_FORMATS}, got {output_format}')
+    # TREE TO SUNBURST
     # =============================================================================================
-    # Calculate all concepts weights --------------------------------------------------------------
-    calculated_weights = ontology_to_weighted_dag(concepts=interest_concepts, abundances=abundances,
-                                                  root=root, ontology_dag=ontology_dag,
-                                                  show_lvs=show_leaves)
-
-    if reference_concepts is not None:
-        ref_set = True
-        ref_calculated_weights = ontology_to_weighted_dag(concepts=reference_concepts,
-                                                          abundances=ref_abundances, root=root,
-                                                          ontology_dag=ontology_dag,
-                                                          show_lvs=show_leaves)
+    if observer is not None:
+        observer.on_stage_start(RENDER_S, sectors=tree_data.len)
+    if output_format == SVG_F:
+        fig = generate_sunburst_svg(data=tree_data, output=output, analysis=analysis,
+                                    write_fig=False, **kwargs)
     else:
-        ref_set = False
-        ref_calculated_weights = calculated_weights
+        fig = generate_sunburst_fig(data=tree_data, output=output, analysis=analysis, test=test,
+                                    significant=significant, ref_set=ref_set,
+                                    write_fig=False, **kwargs)
+    if observer is not None:
+        observer.on_stage_end(RENDER_S)
+    if write_output:
+        if observer is not None:
+            observer.on_stage_start(WRITE_S)
+        figure_file = f'{output}.{output_format}'
+        if output_format == SVG_F:
+            with open(figure_file, 'w') as f:
+                f.write(fig)
+        else:
+            fig.write_html(figure_file)
+        if table_format is not None:
+            tree_data.write_table(f'{output}_tree.{table_format}', table_format)
+        if observer is not None:
+            observer.on_stage_end(WRITE_S,
+                                  **{f'{output_format}_bytes': os.path.getsize(figure_file)})
+    return fig
+
 
-    # Scores
-    classes_scores = get_classes_scores(calculated_weights, scores, root)
+def _tree_analysis(analysis, interest_concepts, abundances, scores, reference_concepts,
+                   ref_abundances, ontology_dag, id_to_label, test, root, root_cut, path_cut,
+                   ref_base, show_leaves, observer=None, ancestors=None, checkpoint=None,
+                   ontology_index=None) -> Tuple[TreeData, Dict[str, float] or None, bool]:
+    """ Compute the sunburst TreeData (weights, tree, proportions, enrichment and cuts), without
+    rendering. Parameters are the same as _global_analysis. With a checkpoint cache, the run
+    resumes after the last stage saved for the same inputs and upstream parameters, cuts are
+    always computed.
+
+    Returns
+    -------
+    TreeData
+        Sectors of the sunburst
+    Dict[str, float] or None
+        Significant ontology IDs with their p-value if enrichment analysis, None otherwise
+    bool
+        True if a reference set was given
+    """
+    tree_data, significant, ref_set = _build_tree(
+        analysis=analysis, interest_concepts=interest_concepts, abundances=abundances,
+        scores=scores, reference_concepts=reference_concepts, ref_abundances=ref_abundances,
+        ontology_dag=ontology_dag, id_to_label=id_to_label, test=test, root=root,
+        ref_base=ref_base, show_leaves=show_leaves, observer=observer, ancestors=ancestors,
+        checkpoint=checkpoint, ontology_index=ontology_index)
+    _cut_tree(tree_data, root_cut, path_cut, ref_base, observer)
+    return tree_data, significant, ref_set
+
+
+def _build_tree(analysis, interest_concepts, abundances, scores, reference_concepts,
+                ref_abundances, ontology_dag, id_to_label, test, root, ref_base, show_leaves,
+                observer=None, ancestors=None, checkpoint=None, ontology_index=None) \
+        -> Tuple[TreeData, Dict[str, float] or None, bool]:
+    """ Compute the uncut sunburst TreeData (weights, tree, proportions and enrichment).
+    Parameters and returns are the same as _tree_analysis.
+    """
+    # IN-MEMORY ARRAYS INPUTS
+    # =============================================================================================
+    if is_array_input(interest_concepts) or is_array_input(abundances):
+        input_set = get_input_set(interest_concepts, abundances)
+        interest_concepts = input_set.ids.tolist()
+        abundances = input_set.abundances.tolist()
+        if scores is None:
+            scores = input_set.get_scores_dict()
+    if is_series(scores):
+        scores = scores.to_dict()
+    if is_array_input(reference_concepts) or is_array_input(ref_abundances):
+        ref_input_set = get_input_set(reference_concepts, ref_abundances)
+        reference_concepts = ref_input_set.ids.tolist()
+        ref_abundances = ref_input_set.abundances.tolist()
+
+    # CHECKPOINTS
+    # =============================================================================================
+    ref_set = reference_concepts is not None
+    done, state, keys = 0, None, None
+    if checkpoint is not None:
+        keys = checkpoint.get_stages_keys(
+            analysis=analysis, interest_concepts=interest_concepts, abundances=abundances,
+            scores=scores, reference_concepts=reference_concepts, ref_abundances=ref_abundances,
+            ontology_dag=ontology_dag, id_to_label=id_to_label, test=test, root=root,
+            ref_base=ref_base, show_leaves=show_leaves)
+        stages = CHECKPOINT_STAGES if analysis == ENRICHMENT_A else CHECKPOINT_STAGES[:-1]
+        last_stage, state = checkpoint.load_last(keys, stages)
+        if last_stage is not None:
+            done = CHECKPOINT_STAGES.index(last_stage) + 1
+
+    # ONTOLOGY TO WEIGHTED DAG
+    # =============================================================================================
+    # Calculate all concepts weights --------------------------------------------------------------
+    if done < 1:
+        if observer is not None:
+            observer.on_stage_start(WEIGHT_S, concepts=len(interest_concepts),
+                                    ref_concepts=len(reference_concepts) if ref_set else 0)
+        calculated_weights = ontology_to_weighted_dag(concepts=interest_concepts,
+                                                      abundances=abundances, root=root,
+                                                      ontology_dag=ontology_dag,
+                                                      show_lvs=show_leaves, ancestors=ancestors,
+                                                      index=ontology_index)
+        if ref_set:
+            ref_calculated_weights = ontology_to_weighted_dag(concepts=reference_concepts,
+                                                              abundances=ref_abundances, root=root,
+                                                              ontology_dag=ontology_dag,
+                                                              show_lvs=show_leaves,
+                                                              ancestors=ancestors,
+                                                              index=ontology_index)
+        else:
+            ref_calculated_weights = calculated_weights
+
+        # Scores
+        classes_scores = get_classes_scores(calculated_weights, scores, root)
+        if observer is not None:
+            observer.on_stage_end(WEIGHT_S,
+                                  classified=sum(c in ontology_dag for c in set(interest_concepts)),
+                                  classes=len(calculated_weights),
+                                  ref_classes=len(ref_calculated_weights))
+        if checkpoint is not None:
+            checkpoint.save(WEIGHT_S, keys[WEIGHT_S],
+                            (calculated_weights, ref_calculated_weights, classes_scores))
+    elif done == 1:
+        calculated_weights, ref_calculated_weights, classes_scores = state
 
     # Reduce ontology (get DAG subgraph) ----------------------------------------------------------
-    if ref_base:
-        ontology_dag = reduce_d_ontology(ontology_dag, ref_calculated_weights)
-        id_to_label = reduce_d_ontology(id_to_label, ref_calculated_weights)
-    else:
-        ontology_dag = reduce_d_ontology(ontology_dag, calculated_weights)
-        id_to_label = reduce_d_ontology(id_to_label, calculated_weights)
+    if done < 2:
+        if observer is not None:
+            observer.on_stage_start(REDUCE_S, classes=len(ontology_dag))
+        if ref_base:
+            ontology_dag = reduce_d_ontology(ontology_dag, ref_calculated_weights, ontology_index)
+            id_to_label = reduce_labels(id_to_label, ref_calculated_weights)
+        else:
+            ontology_dag = reduce_d_ontology(ontology_dag, calculated_weights, ontology_index)
+            id_to_label = reduce_labels(id_to_label, calculated_weights)
+        if observer is not None:
+            observer.on_stage_end(REDUCE_S, reduced_classes=len(ontology_dag))
+        if checkpoint is not None:
+            checkpoint.save(REDUCE_S, keys[REDUCE_S],
+                            (ontology_dag, id_to_label, calculated_weights,
+                             ref_calculated_weights, classes_scores))
+    elif done == 2:
+        ontology_dag, id_to_label, calculated_weights, ref_calculated_weights, classes_scores = \
+            state
 
     # WRITE CONCEPTS CLASSES IN TSV OUTPUT FILE ---------------------------------------------------
     # if write_output:
@@ -201,56 +505,169 @@ def _global_analysis(analysis, interest_concepts, abundances, scores, reference_
 
     # DAG TO TREE
     # =============================================================================================
-    tree_data = TreeData()
-    tree_data.dag_to_tree(set_abundance=calculated_weights, ref_abundance=ref_calculated_weights,
-                          parent_dict=ontology_dag, root_item=root, names=id_to_label,
-                          ref_base=ref_base)
-
-    tree_data.calculate_proportions(ref_base)
+    if done < 3:
+        if observer is not None:
+            observer.on_stage_start(TREE_S)
+        tree_data = TreeData()
+        tree_data.dag_to_tree(set_abundance=calculated_weights,
+                              ref_abundance=ref_calculated_weights, parent_dict=ontology_dag,
+                              root_item=root, names=id_to_label, ref_base=ref_base,
+                              index=ontology_index)
+        if observer is not None:
+            observer.on_stage_end(TREE_S, sectors=tree_data.len)
+            observer.on_stage_start(PROPORTIONS_S, sectors=tree_data.len)
+
+        tree_data.calculate_proportions(ref_base)
+        if observer is not None:
+            observer.on_stage_end(PROPORTIONS_S)
+        if checkpoint is not None:
+            checkpoint.save(TREE_S, keys[TREE_S], (tree_data, classes_scores))
+    elif done == 3:
+        tree_data, classes_scores = state
     significant = None
     if analysis == ENRICHMENT_A:
-        significant = tree_data.make_enrichment_analysis(test, classes_scores)
+        if done < 4:
+            if observer is not None:
+                observer.on_stage_start(ENRICHMENT_S, sectors=tree_data.len)
+            significant = tree_data.make_enrichment_analysis(test, classes_scores)
+            if observer is not None:
+                observer.on_stage_end(ENRICHMENT_S, significant=len(significant))
+            if checkpoint is not None:
+                checkpoint.save(ENRICHMENT_S, keys[ENRICHMENT_S], (tree_data, significant))
+        else:
+            tree_data, significant = state
+    return tree_data, significant, ref_set
+
+
+def _cut_tree(tree_data: TreeData, root_cut: str, path_cut: str, ref_base: bool,
+              observer: StageObserver = None):
+    """ Apply root and nested paths cuts to a TreeData (modified). Parameters are the same as
+    _global_analysis.
+    """
+    if observer is not None:
+        observer.on_stage_start(ROOT_CUT_S, sectors=tree_data.len)
     tree_data.cut_root(root_cut)
+    if observer is not None:
+        observer.on_stage_end(ROOT_CUT_S, cut_sectors=tree_data.len)
+        observer.on_stage_start(PATH_CUT_S, sectors=tree_data.len)
     tree_data.cut_nested_path(path_cut, ref_base)
-
-    # TREE TO SUNBURST
-    # =============================================================================================
-    return generate_sunburst_fig(data=tree_data, output=output, analysis=analysis, test=test,
-                                 significant=significant, ref_set=ref_set,
-                                 write_fig=write_output, **kwargs)
+    if observer is not None:
+        observer.on_stage_end(PATH_CUT_S, cut_sectors=tree_data.len)
 
 
 # ==================================================================================================
 #                                             FUNCTIONS
 # ==================================================================================================
 
-def get_file(ontology, suffix):
-    for file in os.listdir(DEFAULT_PATH):
-        if file.startswith(ontology + '__') and file.endswith('__' + suffix):
-            return os.path.join(DEFAULT_PATH, file)
+def get_file(ontology, suffix, version=None):
+    # Pinned (or latest) version file if version not filled, None if the file is missing
+    return REGISTRY.get_file(ontology, suffix, version)
 
 
 def aggregate_go_ontologies(suffix):
     go_aggregated = dict()
-    for sub_go_ontology in [GO_BP, GO_CC, GO_MF]:
+    for sub_go_ontology in GO_SUB_ONTOLOGIES:
         dict_sub_onto_input = get_file(sub_go_ontology, suffix)
         with open(dict_sub_onto_input, 'r') as f:
             dict_sub_onto = json.load(f)
         go_aggregated.update(dict_sub_onto)
     if suffix == CLASSES_SUFFIX:
-        for sub_go_ontology in [GO_BP, GO_CC, GO_MF]:
+        for sub_go_ontology in GO_SUB_ONTOLOGIES:
             go_aggregated[ROOTS[sub_go_ontology]] = [ROOTS[GO]]
     return go_aggregated
 
 
-def get_id_to_label_dict(id_to_label_input, labels, ontology):
+def get_go_files(suffix: str) -> Tuple[List[str], str]:
+    """ Get the GO sub-ontologies files of a suffix and the path of their aggregated GO file,
+    named with the sub-ontologies versions (go__<versions>__<suffix>).
+
+    Parameters
+    ----------
+    suffix: str
+        Files suffix (CLASSES_SUFFIX or LABELS_SUFFIX)
+
+    Returns
+    -------
+    List[str]
+        GO sub-ontologies files
+    str
+        Aggregated GO file
+    """
+    sub_files = [get_file(sub_go_ontology, suffix) for sub_go_ontology in GO_SUB_ONTOLOGIES]
+    versions = list()
+    for sub_file in sub_files:
+        version = os.path.basename(sub_file).split('__')[1]
+        if version not in versions:
+            versions.append(version)
+    return sub_files, os.path.join(DEFAULT_PATH, f'{GO}__{"+".join(versions)}__{suffix}')
+
+
+def get_go_classes_file(cache_dir: str = None) -> str or None:
+    """ Get the aggregated GO classes file : GO is then loaded as any default ontology. An
+    aggregated file of the Inputs directory is used if up to date, else the file is written in
+    cache_dir at first use (and again when a GO sub-ontology classes file is more recent).
+
+    Parameters
+    ----------
+    cache_dir: str (optional, default=None)
+        Directory where the aggregated file is written, None to never write it
+
+    Returns
+    -------
+    str or None
+        Aggregated GO classes file (None if no readable up to date file and it cannot be written)
+    """
+    sub_files, go_file = get_go_files(CLASSES_SUFFIX)
+    go_files = [go_file]
+    if cache_dir is not None:
+        go_files.append(os.path.join(cache_dir, os.path.basename(go_file)))
+    sub_mtime = max(os.path.getmtime(f) for f in sub_files)
+    for file in go_files:
+        try:
+            if os.path.getmtime(file) >= sub_mtime and os.access(file, os.R_OK):
+                return file
+        except OSError:  # Missing aggregated file
+            pass
+    if cache_dir is None:
+        return None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_shared_file(go_files[-1],
+                          json.dumps(aggregate_go_ontologies(CLASSES_SUFFIX)).encode())
+    except OSError:  # Directory not writable
+        return None
+    return go_files[-1]
+
+
+def get_user_cache_dir() -> str:
+    """ Get the user cache directory of compiled files : $XDG_CACHE_HOME/ontosunburst
+    (~/.cache/ontosunburst if XDG_CACHE_HOME is not set). """
+    cache_home = os.environ.get(CACHE_HOME_ENV) or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, CACHE_DIR_NAME)
+
+
+def get_blob_file(labels_file: str, cache_dir: str = None) -> str:
+    """ Get the compiled labels file of a labels json file, in cache_dir (user cache directory
+    if None). """
+    name = os.path.splitext(os.path.basename(labels_file))[0] + LABELS_BLOB_EXT
+    return os.path.join(cache_dir if cache_dir is not None else get_user_cache_dir(), name)
+
+
+def get_id_to_label_dict(id_to_label_input, labels, ontology, cache_dir=None):
     # Returns ID_to_Labels only if labels is True
     if labels:
-        # Case default ontology AND use of default labels file
+        # Case default ontology AND use of default labels file : labels served from the compiled
+        # labels file (written in cache_dir or the user cache directory), decoded only for the IDs
+        # used
         if ontology is not None and id_to_label_input is None:
             if ontology == GO:
-                return aggregate_go_ontologies(LABELS_SUFFIX)
-            id_to_label_input = get_file(ontology, LABELS_SUFFIX)
+                labels_files, go_labels_file = get_go_files(LABELS_SUFFIX)
+                return get_label_store(labels_files, get_blob_file(go_labels_file, cache_dir))
+            labels_file = get_file(ontology, LABELS_SUFFIX)
+            # Case default ontology without labels file
+            if labels_file is None:
+                return None
+            return get_label_store([labels_file], get_blob_file(labels_file, cache_dir))
         # Case id_to_label_input parameter filled
         if id_to_label_input is not None:
             # Case id_to_label_input parameter is a file path (str)
@@ -268,7 +685,7 @@ def get_id_to_label_dict(id_to_label_input, labels, ontology):
                                  'dictionary')
 
 
-def get_ontology_dag_dict(ontology, ontology_dag_input):
+def get_ontology_dag_dict(ontology, ontology_dag_input, cache_dir=None):
     # Case ontology_dag_input parameter not filled (default : None)
     if ontology_dag_input is None:
         # Case no default ontology : raises an error
@@ -277,8 +694,14 @@ def get_ontology_dag_dict(ontology, ontology_dag_input):
         # Case default ontology : get default ontology file path
         else:
             if ontology == GO:
-                return aggregate_go_ontologies(CLASSES_SUFFIX)
-            ontology_dag_input = get_file(ontology, CLASSES_SUFFIX)
+                ontology_dag_input = get_go_classes_file(cache_dir)
+                # Case no aggregated GO file readable or writable : aggregated in memory
+                if ontology_dag_input is None:
+                    return aggregate_go_ontologies(CLASSES_SUFFIX)
+            else:
+                ontology_dag_input = get_file(ontology, CLASSES_SUFFIX)
+                if ontology_dag_input is None:
+                    raise ValueError(f'No classes file for {ontology} ontology')
     # Case ontology_dag_input parameter is a file path (str)
     if type(ontology_dag_input) == str:
         with open(ontology_dag_input, 'r') as f:
@@ -294,9 +717,53 @@ def get_ontology_dag_dict(ontology, ontology_dag_input):
                          'dictionary')
 
 
+def get_ontology_dag_index(ontology, ontology_dag_input, cache_dir=None) \
+        -> Tuple[Dict[str, List[str]], 'OntologyIndex' or None]:
+    """ Get the ontology DAG and its index. A default ontology is loaded once per process (see
+    ontology_store.get_loaded_ontology) and its interned index is reused by all runs, a tailored
+    ontology DAG is loaded at each run, without index. """
+    if ontology is not None and ontology_dag_input is None:
+        from ontosunburst.ontology_store import get_loaded_ontology  # Imports this module
+        loaded = get_loaded_ontology(ontology, labels=False, cache_dir=cache_dir)
+        return loaded.dag, loaded.index
+    return get_ontology_dag_dict(ontology, ontology_dag_input, cache_dir), None
+
+
+def get_ontology_files(ontology, ontology_dag_input) -> List[str] or None:
+    """ Get the classes files the ontology DAG is loaded from (None for a DAG dictionary). """
+    if type(ontology_dag_input) == str:
+        return [ontology_dag_input]
+    if ontology_dag_input is None and ontology is not None:
+        if ontology == GO:
+            return get_go_files(CLASSES_SUFFIX)[0]
+        classes_file = get_file(ontology, CLASSES_SUFFIX)
+        if classes_file is not None:
+            return [classes_file]
+    return None
+
+
+def get_checkpoint(cache_dir, ontology, ontology_dag_input, ontology_dag) -> CheckpointCache:
+    """ Get the checkpoints cache of a run (None if no cache_dir). The fingerprint of an ontology
+    DAG loaded from files is taken from the files, only DAG dictionaries are hashed. """
+    if cache_dir is None:
+        return None
+    checkpoint = CheckpointCache(cache_dir)
+    ontology_files = get_ontology_files(ontology, ontology_dag_input)
+    if ontology_files is not None:
+        checkpoint.set_fingerprint(ontology_dag, get_files_fingerprint(ontology_files))
+    return checkpoint
+
+
+def is_default_ontology(ontology: str) -> bool:
+    """ True if the ontology is a registered default ontology (GO if its sub-ontologies are). """
+    if ontology == GO:
+        return all(sub_go_ontology in REGISTRY for sub_go_ontology in GO_SUB_ONTOLOGIES)
+    return ontology in REGISTRY
+
+
 def get_ontology_root(ontology, input_root):
     if ontology is not None:
-        return ROOTS[ontology]
+        return REGISTRY.get_root(ontology)
     elif input_root is None:
         raise ValueError('If no default ontology, must fill input_root parameter')
     else:
@@ -329,7 +796,7 @@ def write_concepts_classes(ontology: str, all_classes: Dict[str, Set[str]], outp
     with open(f'{output}.tsv', 'w') as f:
         f.write('\t'.join(['ID', 'Label', 'Classes ID', 'Classes Label', 'Link']) + '\n')
         for met_id, classes_id, in all_classes.items():
-            link = links_dict[ontology] + met_id
+            link = links_dict.get(ontology, '') + met_id
             met_lab = get_name(met_id, id_to_label)
             classes_lab = [get_name(cl, id_to_label) for cl in classes_id]
             f.write('\t'.join([met_id, met_lab, ', '.join(classes_id), ', '.join(classes_lab),
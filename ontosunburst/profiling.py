@@ -0,0 +1,282 @@
+import json
+import sys
+import threading
+import tracemalloc
+from time import perf_counter
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+# Pipeline stages
+LOAD_S = 'load'
+WEIGHT_S = 'weight'
+REDUCE_S = 'reduce'
+TREE_S = 'tree'
+PROPORTIONS_S = 'proportions'
+ENRICHMENT_S = 'enrichment'
+ROOT_CUT_S = 'root cut'
+PATH_CUT_S = 'path cut'
+RENDER_S = 'render'
+WRITE_S = 'write'
+STAGES = [LOAD_S, WEIGHT_S, REDUCE_S, TREE_S, PROPORTIONS_S, ENRICHMENT_S, ROOT_CUT_S,
+          PATH_CUT_S, RENDER_S, WRITE_S]
+
+# Report keys
+STAGE = 'stage'
+TIME = 'time'
+PEAK_MEMORY = 'peak memory'
+COUNTS = 'counts'
+
+
+# ==================================================================================================
+# CLASSES
+# ==================================================================================================
+class PipelineCancelledError(Exception):
+    """ Raised at the start of a pipeline stage when the run was cancelled. """
+    pass
+
+
+class StageObserver:
+    """
+    StageObserver class: base class of pipeline stages observers. An observer can be given to
+    ontosunburst() or _global_analysis() to be called at the start and at the end of each pipeline
+    stage (see STAGES) with the stage sizes (numbers of concepts, classes, sectors, ...).
+    Any object implementing on_stage_start and on_stage_end methods can be used as observer.
+    """
+
+    def on_stage_start(self, stage: str, **counts):
+        """ Called when a stage starts.
+
+        Parameters
+        ----------
+        stage: str
+            Name of the stage
+        **counts
+            Sizes of the stage inputs
+        """
+        pass
+
+    def on_stage_end(self, stage: str, **counts):
+        """ Called when a stage ends.
+
+        Parameters
+        ----------
+        stage: str
+            Name of the stage
+        **counts
+            Sizes of the stage outputs
+        """
+        pass
+
+
+class ObserverGroup(StageObserver):
+    """
+    ObserverGroup class: forwards stages callbacks to several observers, in order.
+
+    Attributes
+    ----------
+    self.observers: List[StageObserver]
+        Observers called
+    """
+
+    def __init__(self, *observers: StageObserver):
+        self.observers = list(observers)
+
+    def on_stage_start(self, stage: str, **counts):
+        for observer in self.observers:
+            observer.on_stage_start(stage, **counts)
+
+    def on_stage_end(self, stage: str, **counts):
+        for observer in self.observers:
+            observer.on_stage_end(stage, **counts)
+
+
+class CancellationObserver(StageObserver):
+    """
+    CancellationObserver class: stops a pipeline run at the start of the next stage once the
+    cancellation event is set (from another thread).
+
+    Attributes
+    ----------
+    self.event: threading.Event
+        Cancellation event
+    """
+
+    def __init__(self, event: threading.Event = None):
+        self.event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def on_stage_start(self, stage: str, **counts):
+        if self.event.is_set():
+            raise PipelineCancelledError(f'Pipeline cancelled before {stage} stage')
+
+
+class PipelineProfile(StageObserver):
+    """
+    PipelineProfile class: stores per-stage wall time, peak memory and element counts of a
+    pipeline run.
+    Memory is traced with tracemalloc, which is process-wide : the profiles of concurrent runs
+    (threads, server, asyncio) share the tracing, started by the first profile and stopped by the
+    last one. The peak memory of a stage is only measured when no other profile traces memory
+    during the stage (None otherwise), as the other runs allocations cannot be told apart.
+
+    Attributes
+    ----------
+    self.trace_memory: bool
+        True to measure stages peak memory with tracemalloc (slows down allocations)
+    self.stages: List[Dict]
+        Report of each ended stage {stage: str, time: float (s), peak memory: int (bytes),
+        counts: Dict[str, int]}
+    """
+
+    # Memory tracing shared by all profiles
+    __lock = threading.Lock()
+    __tracing_profiles = 0  # Number of profiles tracing memory
+    __tracing_epoch = 0  # Incremented each time a profile starts tracing memory
+    __own_tracing = False  # True if tracemalloc was started by the profiles
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.stages = list()
+        self.__started = dict()
+        self.__tracing = False
+
+    def __str__(self):
+        lines = [f'{STAGE:<12}{TIME + " (s)":>12}{PEAK_MEMORY + " (MB)":>20}  {COUNTS}']
+        for s in self.stages:
+            counts = ', '.join(f'{k}={v}' for k, v in s[COUNTS].items())
+            memory = f'{s[PEAK_MEMORY] / 1e6:.2f}' if s[PEAK_MEMORY] is not None else '-'
+            lines.append(f'{s[STAGE]:<12}{s[TIME]:>12.4f}{memory:>20}  {counts}')
+        lines.append(f'{"total":<12}{self.total_time():>12.4f}')
+        return '\n'.join(lines)
+
+    def on_stage_start(self, stage: str, **counts):
+        """ Start measuring a stage.
+
+        Parameters
+        ----------
+        stage: str
+            Name of the stage
+        **counts
+            Sizes of the stage inputs
+        """
+        memory = None
+        if self.trace_memory:
+            cls = PipelineProfile
+            with cls.__lock:
+                if not self.__tracing:
+                    if cls.__tracing_profiles == 0 and not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        cls.__own_tracing = True
+                    cls.__tracing_profiles += 1
+                    cls.__tracing_epoch += 1
+                    self.__tracing = True
+                if cls.__tracing_profiles == 1:
+                    tracemalloc.reset_peak()
+                    memory = (cls.__tracing_epoch, tracemalloc.get_traced_memory()[0])
+        self.__started[stage] = (perf_counter(), memory, counts)
+
+    def on_stage_end(self, stage: str, **counts):
+        """ End measuring a stage and add its report to self.stages.
+
+        Parameters
+        ----------
+        stage: str
+            Name of the stage
+        **counts
+            Sizes of the stage outputs
+        """
+        end_time = perf_counter()
+        start_time, start_memory, start_counts = self.__started.pop(stage)
+        peak_memory = None
+        if start_memory is not None:
+            cls = PipelineProfile
+            with cls.__lock:
+                epoch, memory = start_memory
+                # No other profile started tracing (or reset the peak) during the stage
+                if cls.__tracing_epoch == epoch and cls.__tracing_profiles == 1:
+                    peak_memory = max(0, tracemalloc.get_traced_memory()[1] - memory)
+        self.stages.append({STAGE: stage, TIME: end_time - start_time, PEAK_MEMORY: peak_memory,
+                            COUNTS: {**start_counts, **counts}})
+
+    def stop(self):
+        """ Stop tracing memory for this profile, tracemalloc is stopped with the last profile if
+        it was started by the profiles.
+        """
+        cls = PipelineProfile
+        with cls.__lock:
+            if self.__tracing:
+                self.__tracing = False
+                cls.__tracing_profiles -= 1
+                if cls.__tracing_profiles == 0 and cls.__own_tracing:
+                    tracemalloc.stop()
+                    cls.__own_tracing = False
+
+    def total_time(self) -> float:
+        return sum(s[TIME] for s in self.stages)
+
+    def to_dict(self) -> Dict:
+        """ Get the profile report as a json serializable dictionary.
+
+        Returns
+        -------
+        Dict
+            {stages: List[Dict], total time: float (s), max rss: int (bytes) or None}
+        """
+        return {'stages': [dict(s) for s in self.stages],
+                'total time': self.total_time(),
+                'max rss': get_max_rss()}
+
+    def write_json(self, output: str):
+        """ Write the profile report in a json file.
+
+        Parameters
+        ----------
+        output: str
+            Path of the json file
+        """
+        with open(output, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def get_max_rss() -> int or None:
+    """ Get the peak resident set size of the process in bytes (None if not available). """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes on Linux
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def merge_observers(*observers: StageObserver or None) -> StageObserver or None:
+    """ Merge observers in a single one, ignoring None observers.
+
+    Parameters
+    ----------
+    *observers: StageObserver or None
+        Observers to merge
+
+    Returns
+    -------
+    StageObserver or None
+        None if no observer, the observer if only one, an ObserverGroup otherwise
+    """
+    observers = [o for o in observers if o is not None]
+    if not observers:
+        return None
+    if len(observers) == 1:
+        return observers[0]
+    return ObserverGroup(*observers)
@@ -0,0 +1,330 @@
+import io
+import sys
+import csv
+import gzip
+from itertools import islice
+from typing import List, Dict, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+STDIN_INPUT = '-'
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_LINES = 500000
+
+# Duplicated IDs merge rules
+MERGE_FIRST = 'first'
+MERGE_LAST = 'last'
+MERGE_SUM = 'sum'
+MERGE_MAX = 'max'
+MERGE_RULES = [MERGE_FIRST, MERGE_LAST, MERGE_SUM, MERGE_MAX]
+
+# Malformed lines reasons
+FIELDS_ERR = 'more than 3 fields'
+ID_ERR = 'empty ID'
+ABUNDANCE_ERR = 'non numeric abundance'
+SCORE_ERR = 'non numeric score'
+
+MAX_REPORTED = 10
+
+# In-memory DataFrame inputs columns (IDs column or DataFrame index)
+ID_COLUMN = 'id'
+ABUNDANCE_COLUMN = 'abundance'
+SCORE_COLUMN = 'score'
+
+
+# ==================================================================================================
+# CLASS
+# ==================================================================================================
+class InputSet:
+    """
+    InputSet class: concepts of an input TSV file (ID, optional abundance and optional score per
+    line) as arrays, duplicated IDs merged.
+
+    Attributes
+    ----------
+    self.ids: np.ndarray (size N)
+        Concepts IDs (in first occurrence order)
+    self.abundances: np.ndarray (size N)
+        Concepts abundances (1 if not given), integers or floats
+    self.scores: np.ndarray (size N)
+        Concepts scores (nan if not given)
+    self.malformed: List[Tuple[int, str]]
+        Skipped lines (line number, reason)
+    self.duplicates: int
+        Number of lines merged into a previous line of the same ID
+    """
+
+    def __init__(self, ids: np.ndarray, abundances: np.ndarray, scores: np.ndarray,
+                 malformed: List[Tuple[int, str]] = None, duplicates: int = 0):
+        self.ids = ids
+        self.abundances = abundances
+        self.scores = scores
+        self.malformed = malformed if malformed is not None else list()
+        self.duplicates = duplicates
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_scores_dict(self) -> Dict[str, float] or None:
+        """ Get the scores dictionary of concepts with a score (None if no score given). """
+        has_score = ~np.isnan(self.scores)
+        if not has_score.any():
+            return None
+        return dict(zip(self.ids[has_score].tolist(), self.scores[has_score].tolist()))
+
+    def get_report(self, name: str = 'input') -> str:
+        """ Format the malformed lines (first MAX_REPORTED ones) and duplicates counts. """
+        lines = [f'{name}:{n}: {reason} (line skipped)'
+                 for n, reason in self.malformed[:MAX_REPORTED]]
+        if len(self.malformed) > MAX_REPORTED:
+            lines.append(f'{name}: ... {len(self.malformed) - MAX_REPORTED} other malformed lines')
+        if self.duplicates:
+            lines.append(f'{name}: {self.duplicates} duplicated IDs lines merged')
+        return '\n'.join(lines)
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def read_input(input_file: str, merge: str = MERGE_LAST,
+               chunk_lines: int = CHUNK_LINES) -> InputSet:
+    """ Read an input TSV file (ID, optional abundance, optional score per line) by chunks of
+    lines parsed in bulk. Malformed lines are skipped and reported in the result.
+
+    Parameters
+    ----------
+    input_file: str
+        TSV file, gzip compressed or not, or '-' for standard input
+    merge: str (optional, default=MERGE_LAST)
+        Rule merging abundances and scores of duplicated IDs : first, last, sum or max
+    chunk_lines: int (optional, default=CHUNK_LINES)
+        Number of lines parsed at once
+
+    Returns
+    -------
+    InputSet
+        Input concepts arrays
+    """
+    import pandas as pd  # Loaded only when an input file is read
+    if merge not in MERGE_RULES:
+        raise ValueError(f'Merge rule {merge} not in {MERGE_RULES}')
+    chunks = list()
+    malformed = list()
+    with open_input(input_file) as f:
+        offset = 0
+        while True:
+            lines = list(islice(f, chunk_lines))
+            if not lines:
+                break
+            chunks.append(parse_lines(lines, offset, malformed))
+            offset += len(lines)
+    if chunks:
+        data = pd.concat(chunks, ignore_index=True)
+    else:
+        data = pd.DataFrame({'id': pd.Series(dtype=object), 'ab': pd.Series(dtype=float),
+                             'sc': pd.Series(dtype=float)})
+    n_lines = len(data)
+    data = merge_duplicates(data, merge)
+    return InputSet(ids=data['id'].to_numpy(dtype=object),
+                    abundances=data['ab'].to_numpy(dtype=np.float64),
+                    scores=data['sc'].to_numpy(dtype=np.float64), malformed=malformed,
+                    duplicates=n_lines - len(data))
+
+
+def extract_input(input_file: str or None, merge: str = MERGE_LAST) \
+        -> Tuple[List[str] or None, List[float] or None, Dict[str, float] or None]:
+    """ Read an input TSV file (see read_input) as ontosunburst() lists, malformed lines being
+    reported on standard error.
+
+    Parameters
+    ----------
+    input_file: str or None
+        TSV file, gzip compressed or not, or '-' for standard input (None if no input)
+    merge: str (optional, default=MERGE_LAST)
+        Rule merging abundances and scores of duplicated IDs : first, last, sum or max
+
+    Returns
+    -------
+    List[str] or None
+        Concepts IDs
+    List[float] or None
+        Concepts abundances
+    Dict[str, float] or None
+        Concepts scores (None if no score)
+    """
+    if input_file is not None:
+        input_set = read_input(input_file, merge)
+        report = input_set.get_report(input_file)
+        if report:
+            print(report, file=sys.stderr)
+        if input_set.malformed and not len(input_set):
+            raise ValueError(f'No valid line in {input_file}')
+        return input_set.ids.tolist(), input_set.abundances.tolist(), input_set.get_scores_dict()
+    return None, None, None
+
+
+def get_input_set(concepts, abundances=None, merge: str = None) -> InputSet:
+    """ Get the InputSet of in-memory concepts, without per-element Python loop.
+
+    Parameters
+    ----------
+    concepts: pd.DataFrame, pd.Series, np.ndarray or List[str]
+        Concepts IDs :
+        - DataFrame : 'id' column (or index if no 'id' column), optional 'abundance' and 'score'
+          columns
+        - Series : of IDs, or of numeric abundances indexed by IDs
+        - array or list of IDs
+    abundances: pd.Series, np.ndarray or List[float] (optional, default=None)
+        Abundances aligned with concepts (if not already in concepts), None for abundances of 1
+    merge: str (optional, default=None)
+        Rule merging duplicated IDs (see read_input), None to keep duplicated IDs
+
+    Returns
+    -------
+    InputSet
+        Input concepts arrays (arrays of the inputs when possible, not copied), integer
+        abundances kept as integers
+    """
+    scores = None
+    if is_dataframe(concepts):
+        if ABUNDANCE_COLUMN in concepts.columns:
+            abundances = concepts[ABUNDANCE_COLUMN]
+        if SCORE_COLUMN in concepts.columns:
+            scores = concepts[SCORE_COLUMN].to_numpy(dtype=np.float64)
+        if ID_COLUMN in concepts.columns:
+            concepts = concepts[ID_COLUMN]
+        else:
+            concepts = concepts.index
+    elif is_series(concepts) and abundances is None and concepts.dtype.kind in 'iufb':
+        abundances = concepts
+        concepts = concepts.index
+    ids = np.asarray(concepts, dtype=object)
+    if abundances is None:
+        abundances = np.ones(len(ids), dtype=np.int64)
+    else:
+        abundances = np.asarray(abundances)
+        if abundances.dtype.kind not in 'iu':  # Integer counts kept for enrichment tests
+            abundances = abundances.astype(np.float64, copy=False)
+    if len(ids) != len(abundances):
+        raise AttributeError(f'Length of concepts IDs list must be equal to its abundances list '
+                             f'length : {len(ids)} != {len(abundances)}')
+    if scores is None:
+        scores = np.full(len(ids), np.nan)
+    if merge is None:
+        return InputSet(ids=ids, abundances=abundances, scores=scores)
+    import pandas as pd
+    data = merge_duplicates(pd.DataFrame({'id': ids, 'ab': abundances, 'sc': scores}), merge)
+    return InputSet(ids=data['id'].to_numpy(dtype=object), abundances=data['ab'].to_numpy(),
+                    scores=data['sc'].to_numpy(dtype=np.float64), duplicates=len(ids) - len(data))
+
+
+def merge_duplicates(data: 'pd.DataFrame', merge: str) -> 'pd.DataFrame':
+    """ Merge the lines of duplicated IDs of an (id, ab, sc) DataFrame, IDs kept in first
+    occurrence order. """
+    if merge not in MERGE_RULES:
+        raise ValueError(f'Merge rule {merge} not in {MERGE_RULES}')
+    if data['id'].is_unique:
+        return data
+    grouped = data.groupby('id', sort=False)
+    if merge == MERGE_SUM:
+        return grouped.sum(min_count=1).reset_index()
+    return grouped.agg(merge).reset_index()
+
+
+def is_dataframe(obj) -> bool:
+    """ True if obj is a pandas DataFrame (pandas not imported if not already). """
+    return 'pandas' in sys.modules and isinstance(obj, sys.modules['pandas'].DataFrame)
+
+
+def is_series(obj) -> bool:
+    """ True if obj is a pandas Series (pandas not imported if not already). """
+    return 'pandas' in sys.modules and isinstance(obj, sys.modules['pandas'].Series)
+
+
+def is_array_input(obj) -> bool:
+    """ True if obj is a NumPy array or a pandas DataFrame, Series or Index. """
+    return isinstance(obj, np.ndarray) or \
+        ('pandas' in sys.modules and isinstance(obj, (sys.modules['pandas'].DataFrame,
+                                                      sys.modules['pandas'].Series,
+                                                      sys.modules['pandas'].Index)))
+
+
+def open_input(input_file: str):
+    """ Open an input file in text mode : standard input, gzip or plain file. """
+    if input_file == STDIN_INPUT:
+        stdin = sys.stdin.buffer
+        if not hasattr(stdin, 'peek'):
+            stdin = io.BufferedReader(stdin)
+        if stdin.peek(2)[:2] == GZIP_MAGIC:
+            return gzip.open(stdin, 'rt')
+        return io.TextIOWrapper(stdin)
+    with open(input_file, 'rb') as f:
+        is_gzip = f.read(2) == GZIP_MAGIC
+    if is_gzip:
+        return gzip.open(input_file, 'rt')
+    return open(input_file, 'r')
+
+
+def parse_lines(lines: List[str], offset: int, malformed: List[Tuple[int, str]]) \
+        -> 'pd.DataFrame':
+    """ Parse a chunk of input lines, malformed lines are added to the malformed list.
+
+    Parameters
+    ----------
+    lines: List[str]
+        Lines of the chunk
+    offset: int
+        Number of lines before the chunk
+    malformed: List[Tuple[int, str]]
+        Malformed lines (line number, reason) to complete
+
+    Returns
+    -------
+    pd.DataFrame
+        Valid lines (id, ab, sc) columns, empty lines excluded
+    """
+    import pandas as pd
+    try:
+        # First line of 3 empty fields : the C parser then fails on lines of more than 3 fields.
+        # Fields are kept as strings (no NA tokens : 'NA', 'null' or 'nan' are IDs like others)
+        fields = pd.read_csv(io.StringIO('\t\t\n' + ''.join(lines)), sep='\t', header=None,
+                             names=range(3), dtype=str, keep_default_na=False, na_filter=False,
+                             quoting=csv.QUOTE_NONE,
+                             skip_blank_lines=False).iloc[1:].reset_index(drop=True)
+        fields[3] = ''
+    except pd.errors.ParserError:  # Lines with more than 3 fields : split by pandas str methods
+        fields = pd.Series(lines, dtype=object).str.rstrip('\r\n').str.split('\t', n=3, expand=True)
+        fields = fields.reindex(columns=range(4))
+    fields = fields.fillna('').apply(lambda col: col.str.strip())
+    given = fields != ''
+    ids = fields[0]
+    ab = to_number(fields[1])
+    sc = to_number(fields[2])
+    errors = pd.Series(None, index=fields.index, dtype=object)
+    errors[given[2] & sc.isna()] = SCORE_ERR
+    errors[given[1] & ab.isna()] = ABUNDANCE_ERR
+    errors[~given[0]] = ID_ERR
+    errors[given[3]] = FIELDS_ERR
+    blank = ~given.any(axis=1)
+    bad = errors.notna() & ~blank
+    if bad.any():
+        malformed.extend(zip((offset + errors.index[bad] + 1).tolist(), errors[bad].tolist()))
+    ok = ~(bad | blank)
+    return pd.DataFrame({'id': ids[ok], 'ab': ab[ok].where(given[1][ok], 1.0),
+                         'sc': sc[ok]})
+
+
+def to_number(field: 'pd.Series') -> 'pd.Series':
+    """ Convert a column of stripped string fields to floats, nan for empty or non numeric
+    fields (including a 'nan' field : abundances and scores must be numbers). """
+    import pandas as pd
+    numbers = pd.to_numeric(field.where(field.str.lower() != 'nan', ''), errors='coerce')
+    return numbers.astype(np.float64)
@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+from datetime import datetime
+from typing import List, Dict, Tuple
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+# Ontologies files are named <ontology>__<version>__<suffix>
+FILE_SEP = '__'
+SOURCE_EXT = '.json'
+
+
+# ==================================================================================================
+# CLASSES
+# ==================================================================================================
+class OntologyEntry:
+    """
+    OntologyEntry class: files of one version of an ontology, found in a registered directory.
+
+    Attributes
+    ----------
+    self.name: str
+        Ontology name
+    self.version: str
+        Ontology version
+    self.root: str or None
+        Root item of the ontology (None if unknown)
+    self.files: Dict[str, str]
+        Dictionary associating for each suffix (classes.json, labels.json), its json file
+    self.artifacts: Dict[str, str]
+        Dictionary associating for each suffix, its compiled file (labels.lbl), as found when the
+        directory was indexed
+    self.size: int
+        Size of the json files (bytes)
+    """
+
+    def __init__(self, name: str, version: str, root: str = None):
+        self.name = name
+        self.version = version
+        self.root = root
+        self.files = dict()
+        self.artifacts = dict()
+        self.size = 0
+
+    def __repr__(self):
+        return f'OntologyEntry({self.name}, {self.version}, {sorted(self.files)})'
+
+    def add_file(self, suffix: str, path: str, size: int):
+        if suffix.endswith(SOURCE_EXT):
+            self.files[suffix] = path
+            self.size += size
+        else:
+            self.artifacts[suffix] = path
+
+    def get_file(self, suffix: str) -> str or None:
+        return self.files.get(suffix, self.artifacts.get(suffix))
+
+
+class OntologyRegistry:
+    """
+    OntologyRegistry class: index of the ontologies files of several directories, built once (at
+    first lookup) instead of listing a directory at each file lookup. Each ontology can have
+    several versions : the pinned version is used, otherwise the latest one.
+
+    Attributes
+    ----------
+    self.directories: List[str]
+        Indexed directories (for a same ontology version, files of the last directories are kept)
+    self.roots: Dict[str, str]
+        Dictionary associating for each ontology, its root item
+    self.pinned: Dict[str, str]
+        Dictionary associating for each ontology with a pinned version, its version
+    """
+
+    def __init__(self, directories: List[str] = None, roots: Dict[str, str] = None):
+        self.directories = list(directories) if directories is not None else list()
+        self.roots = dict(roots) if roots is not None else dict()
+        self.pinned = dict()
+        self.__entries = None
+        self.__lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.get_entries()
+
+    def __iter__(self):
+        return iter(self.get_ontologies())
+
+    def add_directory(self, directory: str, roots: Dict[str, str] = None):
+        """ Register a directory of ontologies files, indexed at next lookup.
+
+        Parameters
+        ----------
+        directory: str
+            Directory of files named <ontology>__<version>__<suffix>
+        roots: Dict[str, str] (optional, default=None)
+            Dictionary associating for each ontology of the directory, its root item
+        """
+        if not os.path.isdir(directory):
+            raise ValueError(f'{directory} is not a directory')
+        with self.__lock:
+            self.directories.append(directory)
+            if roots is not None:
+                self.roots.update(roots)
+            self.__entries = None
+
+    def refresh(self):
+        """ Index the registered directories again at next lookup (files added or removed). """
+        with self.__lock:
+            self.__entries = None
+
+    def pin(self, name: str, version: str or None):
+        """ Pin the version of an ontology used by default (None to use the latest one). """
+        if version is None:
+            self.pinned.pop(name, None)
+        else:
+            self.get_entry(name, version)
+            self.pinned[name] = version
+
+    def get_entries(self) -> Dict[str, Dict[str, OntologyEntry]]:
+        """ Get the ontologies entries {ontology: {version: OntologyEntry}}, indexed once. """
+        entries = self.__entries
+        if entries is None:
+            with self.__lock:
+                if self.__entries is None:
+                    self.__entries = self.__index_directories()
+                entries = self.__entries
+        return entries
+
+    def __index_directories(self) -> Dict[str, Dict[str, OntologyEntry]]:
+        entries = dict()
+        for directory in self.directories:
+            for file in os.scandir(directory):
+                parts = file.name.split(FILE_SEP)
+                if len(parts) != 3 or not all(parts) or not file.is_file():
+                    continue
+                name, version, suffix = parts
+                versions = entries.setdefault(name, dict())
+                if version not in versions:
+                    versions[version] = OntologyEntry(name, version, self.roots.get(name))
+                versions[version].add_file(suffix, file.path, file.stat().st_size)
+        return entries
+
+    def get_ontologies(self) -> List[str]:
+        return sorted(self.get_entries())
+
+    def get_versions(self, name: str) -> List[str]:
+        """ Get the versions of an ontology, from the oldest to the latest. """
+        return sorted(self.get_entries().get(name, dict()), key=get_version_key)
+
+    def get_entry(self, name: str, version: str = None) -> OntologyEntry:
+        """ Get an ontology version entry.
+
+        Parameters
+        ----------
+        name: str
+            Ontology name
+        version: str (optional, default=None)
+            Ontology version (None for the pinned version, or the latest one)
+
+        Returns
+        -------
+        OntologyEntry
+            Ontology version entry
+        """
+        versions = self.get_entries().get(name)
+        if not versions:
+            raise ValueError(f'No {name} ontology in {self.directories}')
+        if version is None:
+            version = self.pinned.get(name)
+        if version is None:
+            return versions[max(versions, key=get_version_key)]
+        try:
+            return versions[version]
+        except KeyError:
+            raise ValueError(f'No {version} version of {name} ontology, available versions : '
+                             f'{self.get_versions(name)}') from None
+
+    def get_file(self, name: str, suffix: str, version: str = None) -> str or None:
+        """ Get a file of an ontology version (None if the ontology or the file is missing). """
+        try:
+            return self.get_entry(name, version).get_file(suffix)
+        except ValueError:
+            return None
+
+    def get_root(self, name: str) -> str:
+        try:
+            return self.roots[name]
+        except KeyError:
+            raise ValueError(f'No root registered for {name} ontology') from None
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def get_version_key(version: str) -> Tuple:
+    """ Get the sorting key of a version : dated versions (06feb25) sorted by date, after the
+    other versions (239, 26-0) sorted by their numbers.
+    """
+    try:
+        return 1, datetime.strptime(version, '%d%b%y').timetuple()[:3]
+    except ValueError:
+        return 0, tuple((0, int(t), '') if t.isdigit() else (1, 0, t)
+                        for t in re.findall(r'\d+|[^\d\W_]+', version))
@@ -0,0 +1,388 @@
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from time import perf_counter
+from typing import List, Dict, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from ontosunburst.ontosunburst import _global_analysis, _tree_analysis, is_default_ontology, \
+    TOPOLOGY_A, BINOMIAL_TEST, ROOT_CUT, PATH_UNCUT
+from ontosunburst.ontology_store import LoadedOntology, load_ontology
+from ontosunburst.dag2tree import TreeData
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+DEF_HOST = '127.0.0.1'
+DEF_PORT = 8050
+DEF_WORKERS = 4
+STATS_WINDOW = 1000  # Number of last requests used for latency statistics
+
+# Routes
+SUNBURST_ROUTE = '/sunburst'
+STATS_ROUTE = '/stats'
+ONTOLOGIES_ROUTE = '/ontologies'
+
+# Response formats
+JSON_F = 'json'
+HTML_F = 'html'
+TABLE_F = 'table'
+FORMATS = {JSON_F: 'application/json', HTML_F: 'text/html', TABLE_F: 'application/json'}
+
+# Request keys {key: default value}, other figure keyword arguments are given in 'kwargs'
+REQUEST_DEFAULTS = {'ontology': None, 'interest_set': None, 'abundances': None, 'scores': None,
+                    'reference_set': None, 'ref_abundances': None, 'analysis': TOPOLOGY_A,
+                    'test': BINOMIAL_TEST, 'root_cut': ROOT_CUT, 'path_cut': PATH_UNCUT,
+                    'ref_base': False, 'show_leaves': False, 'labels': True, 'output': 'sunburst',
+                    'format': JSON_F, 'kwargs': None}
+
+
+# ==================================================================================================
+# CLASSES
+# ==================================================================================================
+class ServerStats:
+    """
+    ServerStats class: counts requests and measures their queue wait and computation latency
+    (thread-safe).
+
+    Attributes
+    ----------
+    self.received: int
+        Number of requests received
+    self.queued: int
+        Number of requests waiting for a worker
+    self.running: int
+        Number of requests being computed
+    self.completed: int
+        Number of requests successfully computed
+    self.failed: int
+        Number of requests failed
+    self.waits: deque
+        Queue wait times (s) of the last requests
+    self.latencies: deque
+        Computation times (s) of the last requests
+    """
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.received = 0
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.waits = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        self.__lock = threading.Lock()
+
+    def on_submit(self):
+        with self.__lock:
+            self.received += 1
+            self.queued += 1
+
+    def on_start(self, wait: float):
+        with self.__lock:
+            self.queued -= 1
+            self.running += 1
+            self.waits.append(wait)
+
+    def on_end(self, latency: float, success: bool):
+        with self.__lock:
+            self.running -= 1
+            if success:
+                self.completed += 1
+                self.latencies.append(latency)
+            else:
+                self.failed += 1
+
+    def to_dict(self) -> Dict:
+        """ Get the statistics as a json serializable dictionary.
+
+        Returns
+        -------
+        Dict
+            {received, queued, running, completed, failed, queue wait, latency}, times in seconds
+        """
+        with self.__lock:
+            return {'received': self.received, 'queued': self.queued, 'running': self.running,
+                    'completed': self.completed, 'failed': self.failed,
+                    'queue wait': get_times_summary(self.waits),
+                    'latency': get_times_summary(self.latencies)}
+
+
+class OntologyServer:
+    """
+    OntologyServer class: local HTTP server keeping ontologies loaded in memory. Sunburst requests
+    are computed by a pool of worker threads on the loaded ontologies.
+
+    Routes :
+    - POST /sunburst : json request (see REQUEST_DEFAULTS keys), returns the figure json
+      (format=json), the figure html (format=html) or the TreeData sectors table (format=table)
+    - GET /stats : requests counts, queue wait and latency statistics
+    - GET /ontologies : loaded ontologies
+
+    Attributes
+    ----------
+    self.ontologies: Dict[str, LoadedOntology]
+        Loaded ontologies by name
+    self.workers: int
+        Maximal number of requests computed at the same time
+    self.precompute: bool
+        True to extract all classes ancestors when loading an ontology
+    self.stats: ServerStats
+        Requests statistics
+    self.httpd: ThreadingHTTPServer
+        HTTP server
+    """
+
+    def __init__(self, ontologies: List[str] = None, host: str = DEF_HOST, port: int = DEF_PORT,
+                 workers: int = DEF_WORKERS, precompute: bool = True):
+        self.ontologies = dict()
+        self.workers = workers
+        self.precompute = precompute
+        self.stats = ServerStats()
+        self.__executor = ThreadPoolExecutor(max_workers=workers)
+        self.__load_lock = threading.Lock()  # Guards self.ontologies and self.__loading
+        self.__loading = dict()  # Lock of each ontology loaded at first request
+        if ontologies is not None:
+            for ontology in ontologies:
+                self.get_ontology(ontology)
+        self.httpd = ThreadingHTTPServer((host, port), OntologyRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.ontology_server = self
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    def add_ontology(self, name: str, loaded: LoadedOntology):
+        """ Serve an already loaded (tailored) ontology under a name. """
+        with self.__load_lock:
+            self.ontologies[name] = loaded
+
+    def get_ontology(self, name: str) -> LoadedOntology:
+        """ Get a served ontology, default ontologies are loaded at first request. An ontology
+        being loaded only blocks the requests of this ontology. Other names raise a ValueError
+        before any loading lock is created for them.
+        """
+        loaded = self.ontologies.get(name)
+        if loaded is not None:
+            return loaded
+        if not is_default_ontology(name):
+            raise ValueError(f'Unknown ontology {name}, must be a served ontology '
+                             f'{sorted(self.ontologies)} or a default ontology')
+        with self.__load_lock:
+            ontology_lock = self.__loading.setdefault(name, threading.Lock())
+        with ontology_lock:
+            loaded = self.ontologies.get(name)
+            if loaded is None:
+                print(f'Loading {name} ontology')
+                loaded = load_ontology(name, precompute=self.precompute)
+                with self.__load_lock:
+                    self.ontologies[name] = loaded
+            return loaded
+
+    def serve_forever(self):
+        host, port = self.address
+        print(f'Serving {list(self.ontologies)} ontologies on http://{host}:{port}')
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.__executor.shutdown(wait=True)
+
+    def submit(self, request: Dict) -> Tuple[str, bytes]:
+        """ Compute a sunburst request in the workers pool, waits for the result.
+
+        Parameters
+        ----------
+        request: Dict
+            Sunburst request parameters
+
+        Returns
+        -------
+        str
+            Content type of the response
+        bytes
+            Response body
+        """
+        self.stats.on_submit()
+        return self.__executor.submit(self.__run, request, perf_counter()).result()
+
+    def __run(self, request: Dict, submit_time: float) -> Tuple[str, bytes]:
+        start_time = perf_counter()
+        self.stats.on_start(start_time - submit_time)
+        success = False
+        try:
+            res = run_request(request, self.get_ontology(get_request_ontology(request)))
+            success = True
+            return res
+        finally:
+            self.stats.on_end(perf_counter() - start_time, success)
+
+
+class OntologyRequestHandler(BaseHTTPRequestHandler):
+    """ HTTP requests handler of OntologyServer. """
+
+    def do_GET(self):
+        route = urlparse(self.path).path
+        server = self.server.ontology_server
+        if route == STATS_ROUTE:
+            self.send_json(200, server.stats.to_dict())
+        elif route == ONTOLOGIES_ROUTE:
+            self.send_json(200, {name: loaded.get_stats()
+                                 for name, loaded in list(server.ontologies.items())})
+        else:
+            self.send_json(404, {'error': f'Unknown route {route}'})
+
+    def do_POST(self):
+        route = urlparse(self.path).path
+        if route != SUNBURST_ROUTE:
+            self.send_json(404, {'error': f'Unknown route {route}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            content_type, body = self.server.ontology_server.submit(request)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {'error': f'{type(e).__name__}: {e}'})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+        self.send_body(200, content_type, body)
+
+    def send_json(self, code: int, content: Dict):
+        self.send_body(code, FORMATS[JSON_F], json.dumps(content).encode())
+
+    def send_body(self, code: int, content_type: str, body: bytes):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def get_request_ontology(request: Dict) -> str:
+    if type(request) != dict or request.get('ontology') is None:
+        raise ValueError('Request must be a json object with an "ontology" key')
+    return request['ontology']
+
+
+def get_request_parameters(request: Dict) -> Dict:
+    """ Check a sunburst request and fill its default values.
+
+    Parameters
+    ----------
+    request: Dict
+        Sunburst request parameters
+
+    Returns
+    -------
+    Dict
+        Parameters (all REQUEST_DEFAULTS keys)
+    """
+    unknown = set(request).difference(REQUEST_DEFAULTS)
+    if unknown:
+        raise ValueError(f'Unknown request keys {sorted(unknown)}, figure keyword arguments must '
+                         f'be in "kwargs"')
+    params = {**REQUEST_DEFAULTS, **request}
+    if not params['interest_set']:
+        raise ValueError('Request must have a non empty "interest_set"')
+    if params['format'] not in FORMATS:
+        raise ValueError(f'Unknown format {params["format"]}, must be in {list(FORMATS)}')
+    if params['kwargs'] is None:
+        params['kwargs'] = dict()
+    return params
+
+
+def run_request(request: Dict, loaded: LoadedOntology) -> Tuple[str, bytes]:
+    """ Compute a sunburst request on a loaded ontology.
+
+    Parameters
+    ----------
+    request: Dict
+        Sunburst request parameters (see REQUEST_DEFAULTS)
+    loaded: LoadedOntology
+        Loaded ontology
+
+    Returns
+    -------
+    str
+        Content type of the response
+    bytes
+        Response body : figure json, figure html or sectors table json
+    """
+    params = get_request_parameters(request)
+    analysis_params = dict(analysis=params['analysis'], interest_concepts=params['interest_set'],
+                           abundances=params['abundances'], scores=params['scores'],
+                           reference_concepts=params['reference_set'],
+                           ref_abundances=params['ref_abundances'], ontology_dag=loaded.dag,
+                           id_to_label=loaded.labels if params['labels'] else None,
+                           test=params['test'], root=loaded.root, root_cut=params['root_cut'],
+                           path_cut=params['path_cut'], ref_base=params['ref_base'],
+                           show_leaves=params['show_leaves'], ontology_index=loaded.index)
+    if params['format'] == TABLE_F:
+        tree_data, significant, _ = _tree_analysis(**analysis_params)
+        body = json.dumps({'sectors': get_sectors_table(tree_data), 'significant': significant})
+    else:
+        fig = _global_analysis(output=params['output'], write_output=False, **analysis_params,
+                               **params['kwargs'])
+        if params['format'] == HTML_F:
+            body = fig.to_html()
+        else:
+            body = fig.to_json()
+    return FORMATS[params['format']], body.encode()
+
+
+def get_sectors_table(tree_data: TreeData) -> Dict[str, List]:
+    """ Get TreeData columns as a json serializable dictionary (nan values replaced by None). """
+    return {k: [None if isinstance(x, float) and np.isnan(x) else x for x in v]
+            for k, v in tree_data.get_data_dict().items()}
+
+
+def get_times_summary(times) -> Dict[str, float or None]:
+    """ Get mean, median, 95th percentile and maximum of durations (None if no duration). """
+    if not times:
+        return {'mean': None, 'p50': None, 'p95': None, 'max': None}
+    times = np.array(times)
+    return {'mean': float(np.mean(times)), 'p50': float(np.percentile(times, 50)),
+            'p95': float(np.percentile(times, 95)), 'max': float(np.max(times))}
+
+
+def serve(ontologies: List[str] = None, host: str = DEF_HOST, port: int = DEF_PORT,
+          workers: int = DEF_WORKERS, precompute: bool = True):
+    """ Run an OntologyServer until interrupted.
+
+    Parameters
+    ----------
+    ontologies: List[str] (optional, default=None)
+        Default ontologies to load at start (others are loaded at first request)
+    host: str (optional, default='127.0.0.1')
+        Server host
+    port: int (optional, default=8050)
+        Server port
+    workers: int (optional, default=4)
+        Maximal number of requests computed at the same time
+    precompute: bool (optional, default=True)
+        True to extract all classes ancestors when loading an ontology
+    """
+    server = OntologyServer(ontologies=ontologies, host=host, port=port, workers=workers,
+                            precompute=precompute)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
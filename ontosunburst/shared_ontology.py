@@ -0,0 +1,459 @@
+import os
+import gc
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+import threading
+from collections.abc import Mapping, Sequence
+from typing import List, Dict, Iterator
+
+import numpy as np
+
+from ontosunburst.label_store import LabelStore, compile_labels, get_padded_size
+from ontosunburst.ontology_index import OntologyIndex, AncestorsView
+from ontosunburst.ontology_store import LoadedOntology, load_ontology, LOADED_ONTOLOGIES, \
+    LOADED_ONTOLOGIES_LOCK
+
+# ==================================================================================================
+# CONSTANTS
+# ==================================================================================================
+
+SHARED_EXT = '.osh'
+SHARED_MAGIC = b'OSSHARE1'
+# Header : magic, json description size (json description of the sections follows, then the
+# sections data, 8 bytes aligned)
+SHARED_HEADER = struct.Struct('<8sQ')
+
+# Sections of a shared ontology file
+IDS = 'ids'
+SORTED_IDS = 'sorted_ids'
+SORTED_ORDER = 'sorted_order'
+PARENTS_INDPTR = 'parents_indptr'
+PARENTS_INDICES = 'parents_indices'
+CHILDREN_INDPTR = 'children_indptr'
+CHILDREN_INDICES = 'children_indices'
+CLOSURES_INDPTR = 'closures_indptr'
+CLOSURES_INDICES = 'closures_indices'
+CLOSURES_FOUND = 'closures_found'
+LABELS = 'labels'
+
+# Shared ontologies attached in the process {path: SharedOntology}
+ATTACHED_ONTOLOGIES = dict()
+ATTACHED_ONTOLOGIES_LOCK = threading.Lock()
+
+
+# ==================================================================================================
+# CLASSES
+# ==================================================================================================
+class SharedIds(Sequence):
+    """
+    SharedIds class: read-only sequence of interned IDs stored as fixed-width UTF-8 bytes.
+
+    Attributes
+    ----------
+    self.ids: np.ndarray
+        Interned IDs (UTF-8 encoded, fixed width)
+    """
+
+    def __init__(self, ids: np.ndarray):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [c.decode() for c in self.ids[i].tolist()]
+        return self.ids[i].decode()
+
+
+class SharedPositions(Mapping):
+    """
+    SharedPositions class: read-only mapping associating for each interned ID its integer, looked
+    up by a binary search in the sorted IDs (no dictionary built in the process).
+
+    Attributes
+    ----------
+    self.sorted_ids: np.ndarray
+        Sorted interned IDs (UTF-8 encoded, fixed width)
+    self.sorted_order: np.ndarray
+        Integer of each sorted ID
+    """
+
+    def __init__(self, sorted_ids: np.ndarray, sorted_order: np.ndarray):
+        self.sorted_ids = sorted_ids
+        self.sorted_order = sorted_order
+
+    def __len__(self):
+        return len(self.sorted_ids)
+
+    def __iter__(self) -> Iterator[str]:
+        for c in self.sorted_ids.tolist():
+            yield c.decode()
+
+    def __getitem__(self, c: str) -> int:
+        if not isinstance(c, str):
+            raise KeyError(c)
+        encoded = c.encode()
+        if len(encoded) > self.sorted_ids.dtype.itemsize or not len(self.sorted_ids):
+            raise KeyError(c)
+        position = int(np.searchsorted(self.sorted_ids, encoded))
+        if position == len(self.sorted_ids) or self.sorted_ids[position] != encoded:
+            raise KeyError(c)
+        return int(self.sorted_order[position])
+
+    def get_positions(self, ids: List[str]) -> np.ndarray:
+        """ Get the integers of several interned IDs at once (one vectorized search). """
+        encoded = [c.encode() for c in ids]
+        if not encoded:
+            return np.zeros(0, dtype=self.sorted_order.dtype)
+        if max(map(len, encoded)) > self.sorted_ids.dtype.itemsize or not len(self.sorted_ids):
+            raise KeyError([c for c in ids if c not in self][0])
+        queries = np.array(encoded, dtype=self.sorted_ids.dtype)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, queries), len(self.sorted_ids) - 1)
+        if not np.array_equal(self.sorted_ids[positions], queries):
+            raise KeyError([c for c in ids if c not in self][0])
+        return self.sorted_order[positions]
+
+
+class SharedOntologyIndex(OntologyIndex):
+    """
+    SharedOntologyIndex class: OntologyIndex over read-only arrays of a shared ontology file. The
+    ancestors extracted when the ontology was published are read from the file, other ancestors
+    are extracted in the process.
+
+    Attributes
+    ----------
+    self.closures_indptr, self.closures_indices: np.ndarray
+        Ancestors of class integer i are closures_indices[closures_indptr[i]:closures_indptr[i + 1]]
+    self.closures_found: np.ndarray (size n_classes)
+        True for classes with ancestors in the closures arrays
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], n_classes: int, root: str):
+        self._set_index(SharedIds(arrays[IDS]),
+                        SharedPositions(arrays[SORTED_IDS], arrays[SORTED_ORDER]), n_classes, root,
+                        arrays[PARENTS_INDPTR], arrays[PARENTS_INDICES])
+        self.children_indices = arrays[CHILDREN_INDICES]
+        self.children_indptr = arrays[CHILDREN_INDPTR]
+        self.closures_indptr = arrays[CLOSURES_INDPTR]
+        self.closures_indices = arrays[CLOSURES_INDICES]
+        self.closures_found = arrays[CLOSURES_FOUND]
+        self.__closures_number = int(np.count_nonzero(self.closures_found))
+
+    def sort(self, classes) -> List[str]:
+        classes = list(classes)
+        if not classes:
+            return classes
+        positions = self.positions.get_positions(classes)
+        return [classes[i] for i in np.argsort(positions, kind='stable').tolist()]
+
+    def get_closure(self, i: int) -> np.ndarray:
+        if i < self.n_classes and self.closures_found[i]:
+            return self.closures_indices[self.closures_indptr[i]:self.closures_indptr[i + 1]]
+        return super().get_closure(i)
+
+    def has_closure(self, i: int) -> bool:
+        return bool(i < self.n_classes and self.closures_found[i]) or super().has_closure(i)
+
+    def get_closures_number(self) -> int:
+        return self.__closures_number + super().get_closures_number()
+
+    def precompute_closures(self) -> int:
+        super().precompute_closures()
+        return self.get_closures_number()
+
+
+class SharedDag(Mapping):
+    """
+    SharedDag class: read-only ontology DAG dictionary view of a SharedOntologyIndex (parents
+    classes lists built at lookup). Pickled as its shared ontology file.
+
+    Attributes
+    ----------
+    self.index: SharedOntologyIndex
+        Shared ontology index
+    self.path: str
+        Shared ontology file
+    self.signature: str
+        Signature of the shared ontology file
+    """
+
+    def __init__(self, index: SharedOntologyIndex, path: str, signature: str):
+        self.index = index
+        self.path = path
+        self.signature = signature
+
+    def __reduce__(self):
+        return get_shared_dag, (self.path, self.signature)
+
+    def __len__(self):
+        return self.index.n_classes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index.ids[:self.index.n_classes])
+
+    def __contains__(self, c):
+        i = self.index.positions.get(c)
+        return i is not None and i < self.index.n_classes
+
+    def __getitem__(self, c: str) -> List[str]:
+        i = self.index.positions[c]
+        if i >= self.index.n_classes:
+            raise KeyError(c)
+        ids = self.index.ids
+        return [ids[p] for p in self.index.get_parents(i).tolist()]
+
+
+class SharedOntology(LoadedOntology):
+    """
+    SharedOntology class: LoadedOntology attached read-only to a shared ontology file (see
+    publish_ontology), memory-mapped : the file pages are shared by all the processes attached.
+    Pickled as its file, unpickled by attaching the file (once per process).
+
+    Attributes
+    ----------
+    self.path: str
+        Shared ontology file
+    self.signature: str
+        Signature of the shared ontology file content
+    self.file_key: tuple
+        Identity of the file mapped (device, inode, size, modification time)
+    """
+
+    def __init__(self, path: str, signature: str = None):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            file_key = get_file_key(os.fstat(f.fileno()))
+        if len(buffer) < SHARED_HEADER.size:
+            raise ValueError(f'{path} is not a shared ontology file')
+        magic, description_size = SHARED_HEADER.unpack_from(buffer)
+        if magic != SHARED_MAGIC:
+            raise ValueError(f'{path} is not a shared ontology file')
+        data_start = SHARED_HEADER.size + description_size
+        description = json.loads(bytes(buffer[SHARED_HEADER.size:data_start]).rstrip(b'\0'))
+        if signature is not None and signature != description['signature']:
+            raise ValueError(f'{path} published from another ontology')
+        sections = {name: (data_start + offset, dtype, count)
+                    for name, (offset, dtype, count) in description['sections'].items()}
+        arrays = {name: np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+                  for name, (offset, dtype, count) in sections.items()}
+        self.path = path
+        self.file_key = file_key
+        self.signature = description['signature']
+        self.name = description['name']
+        self.root = description['root']
+        self.index = SharedOntologyIndex(arrays, description['n_classes'], self.root)
+        self.dag = SharedDag(self.index, path, self.signature)
+        self.ancestors = AncestorsView(self.index)
+        self.sources = None
+        self.labels = None
+        if LABELS in arrays:
+            offset, dtype, count = sections[LABELS]
+            self.labels = LabelStore(buffer=memoryview(buffer)[offset:offset + count])
+
+    def __reduce__(self):
+        return attach_ontology, (self.path, self.signature)
+
+    def get_fingerprint(self) -> str:
+        return self.signature
+
+
+class PreloadedOntologies(dict):
+    """
+    PreloadedOntologies class: dictionary associating for each preloaded ontology name, its
+    shared ontology (see preload). Temporary shared files are kept until close() : workers
+    started with spawn or forkserver attach them by path. Can be used as a context manager
+    wrapping the workers pool.
+
+    Attributes
+    ----------
+    self.temporary_files: List[str]
+        Shared ontologies files removed at close
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.temporary_files = list()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """ Remove the temporary shared files, once the workers are shut down (the ontologies
+        stay mapped in this process and its forks).
+        """
+        for path in self.temporary_files:
+            if os.path.exists(path):
+                os.remove(path)
+        self.temporary_files = list()
+
+
+# ==================================================================================================
+# FUNCTIONS
+# ==================================================================================================
+
+def publish_ontology(loaded: LoadedOntology, path: str = None) -> str:
+    """ Publish a loaded ontology in a shared ontology file : interned IDs, parents and children
+    arrays, all classes ancestors and labels. Processes attach the file read-only (see
+    attach_ontology) instead of loading their own copy of the ontology.
+
+    Parameters
+    ----------
+    loaded: LoadedOntology
+        Loaded ontology (its ancestors are all extracted)
+    path: str (optional, default=None)
+        Shared ontology file (None for a new temporary file, to be removed by the caller)
+
+    Returns
+    -------
+    str
+        Shared ontology file
+    """
+    index = loaded.index
+    index.precompute_closures()
+    index.build_children()
+    ids = np.array([c.encode() for c in index.ids], dtype=bytes)
+    if not len(ids):
+        ids = ids.astype('S1')
+    sorted_order = np.argsort(ids, kind='stable').astype(np.int32)
+    found = np.array([index.has_closure(i) for i in range(index.n_classes)], dtype=bool)
+    closures = [index.get_closure(i) for i in np.flatnonzero(found).tolist()]
+    closures_indptr = np.zeros(index.n_classes + 1, dtype=np.int64)
+    closures_indptr[1:][found] = [len(c) for c in closures]
+    np.cumsum(closures_indptr, out=closures_indptr)
+    sections = {IDS: ids, SORTED_IDS: ids[sorted_order], SORTED_ORDER: sorted_order,
+                PARENTS_INDPTR: index.parents_indptr, PARENTS_INDICES: index.parents_indices,
+                CHILDREN_INDPTR: index.children_indptr, CHILDREN_INDICES: index.children_indices,
+                CLOSURES_INDPTR: closures_indptr,
+                CLOSURES_INDICES: np.concatenate(closures).astype(np.int32, copy=False)
+                if closures else np.zeros(0, dtype=np.int32),
+                CLOSURES_FOUND: found}
+    if loaded.labels is not None:
+        labels = loaded.labels.to_bytes() if isinstance(loaded.labels, LabelStore) \
+            else compile_labels(loaded.labels)
+        sections[LABELS] = np.frombuffer(labels, dtype=np.uint8)
+    signature = hashlib.sha256()
+    for name, array in sections.items():
+        signature.update(name.encode() + array.dtype.str.encode() + array.tobytes())
+    description = {'name': loaded.name, 'root': loaded.root, 'n_classes': index.n_classes,
+                   'signature': signature.hexdigest(), 'sections': dict()}
+    offset = 0
+    for name, array in sections.items():
+        description['sections'][name] = [offset, array.dtype.str, len(array)]
+        offset += get_padded_size(array.nbytes)
+    description = json.dumps(description).encode()
+    description += bytes(get_padded_size(len(description)) - len(description))
+
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=SHARED_EXT)
+        os.close(fd)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SHARED_HEADER.pack(SHARED_MAGIC, len(description)) + description)
+            for array in sections.values():
+                f.write(array.tobytes())
+                f.write(bytes(get_padded_size(array.nbytes) - array.nbytes))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def attach_ontology(path: str, signature: str = None) -> SharedOntology:
+    """ Attach a shared ontology file, once per process (see publish_ontology). The file is
+    attached again if it was published again since (other file at this path), an ontology
+    attached from a removed file stays available.
+
+    Parameters
+    ----------
+    path: str
+        Shared ontology file
+    signature: str (optional, default=None)
+        Signature of the shared ontology file expected, raises a ValueError if the file was
+        published again from another ontology (None to accept any file)
+
+    Returns
+    -------
+    SharedOntology
+        Ontology attached read-only
+    """
+    with ATTACHED_ONTOLOGIES_LOCK:
+        shared = ATTACHED_ONTOLOGIES.get(path)
+        if shared is not None and (signature is None or signature == shared.signature):
+            try:
+                file_key = get_file_key(os.stat(path))
+            except OSError:  # Removed file : still mapped by this process
+                file_key = shared.file_key
+            if file_key == shared.file_key:
+                return shared
+        shared = SharedOntology(path, signature)
+        ATTACHED_ONTOLOGIES[path] = shared
+        return shared
+
+
+def get_file_key(stat: os.stat_result) -> tuple:
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def get_shared_dag(path: str, signature: str = None) -> SharedDag:
+    return attach_ontology(path, signature).dag
+
+
+def detach_ontology(path: str):
+    """ Remove a shared ontology attached in the process (its file is unmapped once no more
+    used). """
+    with ATTACHED_ONTOLOGIES_LOCK:
+        ATTACHED_ONTOLOGIES.pop(path, None)
+
+
+def preload(ontologies: List[str], labels: bool = True, directory: str = None,
+            freeze: bool = True) -> PreloadedOntologies:
+    """ Load default ontologies before forking worker processes (pre-fork servers) : each ontology
+    is published and attached as a SharedOntology, kept loaded in the process (see
+    ontology_store.get_loaded_ontology), then the objects of the process are frozen out of the
+    garbage collector. Forked workers use the ontologies without loading them, and without
+    copying their pages : the arrays are memory-mapped and the garbage collector does not visit
+    the frozen objects.
+
+    Parameters
+    ----------
+    ontologies: List[str]
+        Default ontologies names
+    labels: bool (optional, default=True)
+        True to load labels, False otherwise
+    directory: str (optional, default=None)
+        Directory of the shared ontologies files (<ontology>.osh), kept to be attached by other
+        processes. None for temporary files, removed when the returned PreloadedOntologies is
+        closed (once the workers are shut down).
+    freeze: bool (optional, default=True)
+        True to freeze the objects of the process (gc.freeze), call it once all preloaded
+
+    Returns
+    -------
+    PreloadedOntologies
+        Dictionary associating for each ontology name, its shared ontology
+    """
+    preloaded = PreloadedOntologies()
+    for ontology in ontologies:
+        path = None
+        if directory is not None:
+            path = os.path.join(directory, f'{ontology}{SHARED_EXT}')
+        path = publish_ontology(load_ontology(ontology, labels=labels), path)
+        if directory is None:
+            preloaded.temporary_files.append(path)
+        shared = attach_ontology(path)
+        with LOADED_ONTOLOGIES_LOCK:
+            LOADED_ONTOLOGIES[(ontology, labels)] = shared
+        preloaded[ontology] = shared
+    if freeze:
+        gc.collect()  # Loaded dictionaries freed before freezing
+        gc.freeze()
+    return preloaded
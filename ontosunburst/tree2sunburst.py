@@ -1,10 +1,14 @@
 import os.path
 import difflib
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import math
+from xml.sax.saxutils import escape
+from typing import TYPE_CHECKING
 from ontosunburst.dag2tree import *
 
+# plotly is only imported when rendering a plotly figure (see generate_sunburst_fig)
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
 # ==================================================================================================
 # CONSTANTS
 # ==================================================================================================
@@ -29,6 +33,37 @@ KWARGS_TYPE = {C_MIN: float, C_MAX: float, C_MID: float, MAX_DEPTH: int, COLORSC
                TITLE: str, COLORBAR_LEGEND: str, BG_COLOR: str, FONT_COLOR: str, FONT_SIZE: int,
                TABLE_TITLE: str, TABLE_LEGEND: str, TABLE_COLOR: str}
 
+# Kwargs default values
+DEF_COLORSCALE = {TOPOLOGY_A: 'Viridis', ENRICHMENT_A: 'RdBu'}
+DEF_COLORBAR = {TOPOLOGY_A: 'Count', ENRICHMENT_A: 'Log10(p-value)'}
+DEF_C_MIN = {TOPOLOGY_A: 1, ENRICHMENT_A: -10}
+DEF_C_MAX = {TOPOLOGY_A: None, ENRICHMENT_A: 10}
+DEF_C_MID = {TOPOLOGY_A: None, ENRICHMENT_A: 0}
+DEF_MAX_DEPTH = 7
+DEF_BG_COLOR = 'rgba(255, 255, 255, 0)'
+DEF_FONT_COLOR = '#111111'
+DEF_FONT_SIZE = 20
+
+# Figures formats : interactive plotly html figure or static svg figure
+HTML_F = 'html'
+SVG_F = 'svg'
+FIGURE_FORMATS = [HTML_F, SVG_F]
+
+# Static SVG figure
+SVG_SIZE = 800
+SVG_NAN_COLOR = '#dddddd'
+SVG_COLORSCALES = {'Viridis': [[0.0, '#440154'], [0.1111111111111111, '#482878'],
+                               [0.2222222222222222, '#3e4989'], [0.3333333333333333, '#31688e'],
+                               [0.4444444444444444, '#26828e'], [0.5555555555555556, '#1f9e89'],
+                               [0.6666666666666666, '#35b779'], [0.7777777777777777, '#6ece58'],
+                               [0.8888888888888888, '#b5de2b'], [1.0, '#fde725']],
+                   'RdBu': [[0.0, 'rgb(103,0,31)'], [0.1, 'rgb(178,24,43)'],
+                            [0.2, 'rgb(214,96,77)'], [0.3, 'rgb(244,165,130)'],
+                            [0.4, 'rgb(253,219,199)'], [0.5, 'rgb(247,247,247)'],
+                            [0.6, 'rgb(209,229,240)'], [0.7, 'rgb(146,197,222)'],
+                            [0.8, 'rgb(67,147,195)'], [0.9, 'rgb(33,102,172)'],
+                            [1.0, 'rgb(5,48,97)']]}
+
 
 # ==================================================================================================
 # FUNCTIONS
@@ -47,26 +82,17 @@ def get_fig_kwargs(output: str, analysis: str, **kwargs):
             Analysis mode : topology or enrichment
         """
     check_kwargs(**kwargs)
-    def_colorscale = {TOPOLOGY_A: 'Viridis',
-                      ENRICHMENT_A: 'RdBu'}
-    def_titles = {TOPOLOGY_A: f'{os.path.basename(output)} : Proportion of classes',
-                  ENRICHMENT_A: f'{os.path.basename(output)} : Classes enrichment representation'}
-    def_colorbar = {TOPOLOGY_A: 'Count',
-                    ENRICHMENT_A: 'Log10(p-value)'}
-    def_c_min = {TOPOLOGY_A: 1, ENRICHMENT_A: -10}
-    def_c_max = {TOPOLOGY_A: None, ENRICHMENT_A: 10}
-    def_c_mid = {TOPOLOGY_A: None, ENRICHMENT_A: 0}
-
-    c_min = kwargs.get(C_MIN, def_c_min[analysis])
-    c_max = kwargs.get(C_MAX, def_c_max[analysis])
-    c_mid = kwargs.get(C_MID, def_c_mid[analysis])
-    max_depth = kwargs.get(MAX_DEPTH, 7)
-    colorscale = px.colors.get_colorscale(kwargs.get(COLORSCALE, def_colorscale[analysis]))
-    title = kwargs.get(TITLE, def_titles[analysis])
-    colorbar_legend = kwargs.get(COLORBAR_LEGEND, def_colorbar[analysis])
-    background_color = kwargs.get(BG_COLOR, 'rgba(255, 255, 255, 0)')
-    font_color = kwargs.get(FONT_COLOR, '#111111')
-    font_size = kwargs.get(FONT_SIZE, 20)
+    c_min = kwargs.get(C_MIN, DEF_C_MIN[analysis])
+    c_max = kwargs.get(C_MAX, DEF_C_MAX[analysis])
+    c_mid = kwargs.get(C_MID, DEF_C_MID[analysis])
+    max_depth = kwargs.get(MAX_DEPTH, DEF_MAX_DEPTH)
+    from plotly.colors import get_colorscale
+    colorscale = get_colorscale(kwargs.get(COLORSCALE, DEF_COLORSCALE[analysis]))
+    title = kwargs.get(TITLE, get_default_title(output, analysis))
+    colorbar_legend = kwargs.get(COLORBAR_LEGEND, DEF_COLORBAR[analysis])
+    background_color = kwargs.get(BG_COLOR, DEF_BG_COLOR)
+    font_color = kwargs.get(FONT_COLOR, DEF_FONT_COLOR)
+    font_size = kwargs.get(FONT_SIZE, DEF_FONT_SIZE)
     table_title = kwargs.get(TABLE_TITLE, 'Significant p-values')
     table_legend = kwargs.get(TABLE_LEGEND, 'IDs')
     table_color = kwargs.get(TABLE_COLOR, '#666666')
@@ -75,6 +101,12 @@ def get_fig_kwargs(output: str, analysis: str, **kwargs):
         font_color, font_size, table_title, table_legend, table_color
 
 
+def get_default_title(output: str, analysis: str) -> str:
+    def_titles = {TOPOLOGY_A: f'{os.path.basename(output)} : Proportion of classes',
+                  ENRICHMENT_A: f'{os.path.basename(output)} : Classes enrichment representation'}
+    return def_titles[analysis]
+
+
 def check_kwargs(**kwargs):
     close_matches = {x: difflib.get_close_matches(x, KWARGS, n=1, cutoff=0.5)[0] for x in kwargs
                      if difflib.get_close_matches(x, KWARGS, n=1, cutoff=0.5) and x not in KWARGS}
@@ -90,7 +122,7 @@ def check_kwargs(**kwargs):
 
 def generate_sunburst_fig(data: TreeData, output: str, analysis: str = TOPOLOGY_A,
                           test=BINOMIAL_TEST, significant: Dict[str, float] = None,
-                          ref_set: bool = True, write_fig: bool = True, **kwargs) -> go.Figure:
+                          ref_set: bool = True, write_fig: bool = True, **kwargs) -> 'go.Figure':
     """ Generate a Sunburst figure and save it to output path.
 
     Parameters
@@ -120,6 +152,9 @@ def generate_sunburst_fig(data: TreeData, output: str, analysis: str = TOPOLOGY_
     go.Figure
         Sunburst figure generated.
     """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     c_min, c_max, c_mid, max_depth, colorscale, title, colorbar_legend, background_color, \
         font_color, font_size, table_title, table_legend, table_color = \
         get_fig_kwargs(output, analysis, **kwargs)
@@ -211,3 +246,278 @@ def get_hover_fig_text(data: TreeData, analysis: str, ref_set: bool) \
                     f'{PROP}: <b>{round(data.prop[i] * 100, 2)}%</b><br>'
                     f'{IDS}: {data.onto_ids[i]}'
                     for i in range(data.len)]
+
+
+# Static SVG figure
+# --------------------------------------------------------------------------------------------------
+def generate_sunburst_svg(data: TreeData, output: str, analysis: str = TOPOLOGY_A,
+                          write_fig: bool = True, size: int = SVG_SIZE, **kwargs) -> str:
+    """ Generate a static SVG Sunburst figure and save it to output path. Sectors angles and radii
+    are computed from data relative proportions and parents, without any plotting library.
+
+    Parameters
+    ----------
+    data: TreeData
+        DataTable of figure parameters
+        (sectors id, label, parent, count, proportion, p-value, ...)
+    output: str
+        Path to output to save the figure without extension
+    analysis: str (optional, default=topology)
+        Analysis mode : topology or enrichment
+    write_fig: bool (optional, default=True)
+        True to write the svg figure, False to only return figure
+    size: int (optional, default=800)
+        Width and height of the figure in pixels
+    **kwargs
+        Keyword args: c_min, c_max, c_mid, max_depth, colorscale, title, bg_color, font_color,
+        font_size
+
+    Returns
+    -------
+    str
+        SVG document of the sunburst figure.
+    """
+    check_kwargs(**kwargs)
+    if analysis == TOPOLOGY_A:
+        colors = data.count
+    elif analysis == ENRICHMENT_A:
+        colors = data.p_val
+    else:
+        raise ValueError('Wrong type input')
+    max_depth = kwargs.get(MAX_DEPTH, DEF_MAX_DEPTH)
+    colorscale = get_svg_colorscale(kwargs.get(COLORSCALE, DEF_COLORSCALE[analysis]))
+    c_min, c_max = get_color_range(colors, kwargs.get(C_MIN, DEF_C_MIN[analysis]),
+                                   kwargs.get(C_MAX, DEF_C_MAX[analysis]),
+                                   kwargs.get(C_MID, DEF_C_MID[analysis]))
+    title = kwargs.get(TITLE, get_default_title(output, analysis))
+    background_color = kwargs.get(BG_COLOR, DEF_BG_COLOR)
+    font_color = kwargs.get(FONT_COLOR, DEF_FONT_COLOR)
+    font_size = kwargs.get(FONT_SIZE, DEF_FONT_SIZE)
+
+    sectors, center, nb_rings = get_svg_sectors(data, max_depth)
+    title_height = font_size * 2
+    radius = (size - title_height) / 2 - 2
+    cx = size / 2
+    cy = title_height + radius
+    ring = radius / nb_rings if nb_rings else radius
+    label_size = max(8, int(font_size * 0.5))
+
+    svg = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+           f'viewBox="0 0 {size} {size}" font-family="Arial, sans-serif">',
+           f'<rect width="100%" height="100%" fill="{background_color}"/>',
+           f'<text x="{cx:.1f}" y="{font_size * 1.3:.1f}" font-size="{font_size}" '
+           f'fill="{font_color}" text-anchor="middle">{escape(title)}</text>']
+    if center is not None:
+        svg.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{ring:.2f}" fill="{SVG_NAN_COLOR}" '
+                   f'stroke="#ffffff"><title>{escape(center)}</title></circle>')
+        svg.append(get_svg_label(center, cx, cy, 2 * ring, label_size, font_color))
+    for i, depth, start, span in sectors:
+        r_in = depth * ring
+        r_out = r_in + ring
+        color = get_svg_color(colors[i], c_min, c_max, colorscale)
+        svg.append(f'<path d="{get_svg_sector_path(cx, cy, r_in, r_out, start, span)}" '
+                   f'fill="{color}" stroke="#ffffff" stroke-width="1">'
+                   f'<title>{escape(str(data.labels[i]))} ({escape(str(data.onto_ids[i]))})'
+                   f'</title></path>')
+        mid_angle = start + span / 2
+        if r_in > 0:
+            mid_radius = (r_in + r_out) / 2
+            width = mid_radius * span
+        else:
+            mid_radius = 0
+            width = 2 * ring
+        if width >= label_size * 2:
+            x = cx + mid_radius * math.cos(mid_angle)
+            y = cy + mid_radius * math.sin(mid_angle)
+            svg.append(get_svg_label(data.labels[i], x, y, width, label_size, font_color))
+    svg.append('</svg>')
+    svg = '\n'.join(svg)
+    if write_fig:
+        with open(f'{output}.svg', 'w') as f:
+            f.write(svg)
+    return svg
+
+
+def get_svg_sectors(data: TreeData, max_depth: int):
+    """ Compute the position of each sector of the sunburst : depth (ring), start angle and angular
+    span. Each sector span is its relative proportion share of its parent span, top level sectors
+    share the whole circle.
+
+    Parameters
+    ----------
+    data: TreeData
+        DataTable of figure parameters
+    max_depth: int
+        Maximal number of rings to display (all rings if <= 0)
+
+    Returns
+    -------
+    List[Tuple[int, int, float, float]]
+        List of (sector index, depth, start angle, angular span) of sectors to draw
+    str or None
+        Label of the implicit center (parent referenced by top level sectors but not in data IDs)
+        or None if no implicit center
+    int
+        Number of rings to draw
+    """
+    children = dict()
+    for i in range(data.len):
+        children.setdefault(data.parents[i], []).append(i)
+    ids = set(data.ids)
+    top_parents = [p for p in children if p not in ids]
+    top = [i for p in top_parents for i in children[p]]
+    center = None
+    first_depth = 0
+    if len(top_parents) == 1 and top_parents[0] != '':
+        center = top_parents[0]
+        first_depth = 1
+    if max_depth is None or max_depth <= 0:
+        max_depth = data.len + first_depth
+
+    sectors = list()
+    total = sum(data.relative_prop[i] for i in top)
+    stack = list()
+    start = -math.pi / 2
+    for i in top:
+        span = 2 * math.pi * data.relative_prop[i] / total if total else 0
+        stack.append((i, first_depth, start, span))
+        start += span
+    nb_rings = first_depth
+    while stack:
+        i, depth, start, span = stack.pop()
+        if depth >= max_depth or span <= 0:
+            continue
+        sectors.append((i, depth, start, span))
+        nb_rings = max(nb_rings, depth + 1)
+        value = data.relative_prop[i]
+        c_start = start
+        for c in children.get(data.ids[i], []):
+            c_span = span * data.relative_prop[c] / value if value else 0
+            stack.append((c, depth + 1, c_start, c_span))
+            c_start += c_span
+    return sectors, center, nb_rings
+
+
+def get_svg_sector_path(cx: float, cy: float, r_in: float, r_out: float, start: float,
+                        span: float) -> str:
+    """ Get the SVG path of an annular sector (disc sector if r_in is 0).
+
+    Parameters
+    ----------
+    cx: float
+        Center x coordinate
+    cy: float
+        Center y coordinate
+    r_in: float
+        Inner radius
+    r_out: float
+        Outer radius
+    start: float
+        Start angle (radians)
+    span: float
+        Angular span (radians)
+
+    Returns
+    -------
+    str
+        SVG path "d" attribute
+    """
+    if span >= 2 * math.pi - 1e-6:
+        # Full circle : two half arcs
+        path = f'M{cx + r_out:.2f},{cy:.2f}A{r_out:.2f},{r_out:.2f} 0 1 1 {cx - r_out:.2f},' \
+               f'{cy:.2f}A{r_out:.2f},{r_out:.2f} 0 1 1 {cx + r_out:.2f},{cy:.2f}Z'
+        if r_in > 0:
+            path += f'M{cx + r_in:.2f},{cy:.2f}A{r_in:.2f},{r_in:.2f} 0 1 0 {cx - r_in:.2f},' \
+                    f'{cy:.2f}A{r_in:.2f},{r_in:.2f} 0 1 0 {cx + r_in:.2f},{cy:.2f}Z'
+        return path
+    end = start + span
+    large = 1 if span > math.pi else 0
+    cos_s, sin_s, cos_e, sin_e = math.cos(start), math.sin(start), math.cos(end), math.sin(end)
+    path = f'M{cx + r_out * cos_s:.2f},{cy + r_out * sin_s:.2f}' \
+           f'A{r_out:.2f},{r_out:.2f} 0 {large} 1 {cx + r_out * cos_e:.2f},{cy + r_out * sin_e:.2f}'
+    if r_in > 0:
+        path += f'L{cx + r_in * cos_e:.2f},{cy + r_in * sin_e:.2f}' \
+                f'A{r_in:.2f},{r_in:.2f} 0 {large} 0 {cx + r_in * cos_s:.2f},' \
+                f'{cy + r_in * sin_s:.2f}Z'
+    else:
+        path += f'L{cx:.2f},{cy:.2f}Z'
+    return path
+
+
+def get_svg_label(label: str, x: float, y: float, width: float, font_size: int,
+                  font_color: str) -> str:
+    """ Get the SVG text of a sector label, truncated to fit the sector width.
+    """
+    label = str(label)
+    max_chars = max(1, int(width / (font_size * 0.6)))
+    if len(label) > max_chars:
+        label = label[:max(1, max_chars - 1)] + '…'
+    return f'<text x="{x:.2f}" y="{y:.2f}" font-size="{font_size}" fill="{font_color}" ' \
+           f'text-anchor="middle" dominant-baseline="middle">{escape(label)}</text>'
+
+
+def get_svg_colorscale(colorscale: str or List) -> List[List]:
+    """ Get a colorscale as a list of [position, color] pairs. Viridis and RdBu (default
+    colorscales) are available without plotly, other named colorscales are resolved with plotly.
+
+    Parameters
+    ----------
+    colorscale: str or List
+        Name of the colorscale (suffixed with "_r" to reverse it) or list of [position, color]
+
+    Returns
+    -------
+    List[List]
+        List of [position, color] pairs
+    """
+    if type(colorscale) != str:
+        return colorscale
+    name = colorscale[:-2] if colorscale.endswith('_r') else colorscale
+    if name in SVG_COLORSCALES:
+        scale = SVG_COLORSCALES[name]
+        if name != colorscale:
+            scale = [[1 - pos, color] for pos, color in reversed(scale)]
+        return scale
+    from plotly.colors import get_colorscale
+    return get_colorscale(colorscale)
+
+
+def get_color_range(colors: List[float], c_min: float or None, c_max: float or None,
+                    c_mid: float or None):
+    """ Get the (min, max) values mapped to the colorscale bounds, missing bounds are taken from
+    the colors values and the range is centered on c_mid if given.
+    """
+    values = [c for c in colors if c == c]
+    if c_min is None:
+        c_min = min(values) if values else 0
+    if c_max is None:
+        c_max = max(values) if values else 1
+    if c_mid is not None:
+        half = max(c_max - c_mid, c_mid - c_min)
+        c_min, c_max = c_mid - half, c_mid + half
+    return c_min, c_max
+
+
+def get_svg_color(value: float, c_min: float, c_max: float, colorscale: List[List]) -> str:
+    """ Get the interpolated color of a value in the colorscale (SVG_NAN_COLOR if value is nan).
+    """
+    if value != value:
+        return SVG_NAN_COLOR
+    t = (value - c_min) / (c_max - c_min) if c_max != c_min else 1
+    t = min(max(t, 0), 1)
+    for k in range(1, len(colorscale)):
+        if t <= colorscale[k][0] or k == len(colorscale) - 1:
+            p0, col0 = colorscale[k - 1]
+            p1, col1 = colorscale[k]
+            f = (t - p0) / (p1 - p0) if p1 != p0 else 0
+            rgb0, rgb1 = parse_color(col0), parse_color(col1)
+            return 'rgb({},{},{})'.format(*[round(a + (b - a) * f) for a, b in zip(rgb0, rgb1)])
+    return colorscale[0][1]
+
+
+def parse_color(color: str):
+    """ Get (r, g, b) values of a '#rrggbb' or 'rgb(r, g, b)' color.
+    """
+    if color.startswith('#'):
+        return tuple(int(color[k:k + 2], 16) for k in (1, 3, 5))
+    return tuple(int(float(x)) for x in color[color.index('(') + 1:color.index(')')].split(',')[:3])
@@ -0,0 +1,33 @@
+import argparse
+
+from ontosunburst.benchmark import run_synthetic_benchmark, format_results, SYNTHETIC_PRESETS, \
+    DEFAULT_SIZES
+
+"""
+Times each pipeline stage on synthetic ontologies over a size sweep.
+
+python tests/benchmarks/synthetic_benchmarks.py -o synthetic_bench.json
+python tests/benchmarks/synthetic_benchmarks.py --presets go_bp kegg --sizes 1000 10000 -r 1
+"""
+
+
+def get_command_line_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', '-s', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Numbers of classes of the synthetic ontologies')
+    parser.add_argument('--presets', '-p', type=str, nargs='+', default=list(SYNTHETIC_PRESETS),
+                        help='Ontologies shapes')
+    parser.add_argument('--interest_ratio', type=float, default=0.05,
+                        help='Interest set size relative to the number of leaves')
+    parser.add_argument('--repeats', '-r', type=int, default=3, help='Runs of each case')
+    parser.add_argument('--output', '-o', type=str, default='synthetic_bench.json',
+                        help='Json results file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_command_line_args()
+    results = run_synthetic_benchmark(sizes=args.sizes, presets=args.presets,
+                                      interest_ratio=args.interest_ratio, repeats=args.repeats,
+                                      output=args.output)
+    print(format_results(results))
@@ -0,0 +1,157 @@
+import unittest
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import plotly.graph_objects  # Heavy dependencies imported before timing runs
+import scipy.stats
+
+from ontosunburst.aio import *
+from ontosunburst.ontosunburst import ontosunburst, ENRICHMENT_A, TOPOLOGY_A, EC
+from ontosunburst.ontology_store import load_ontology, clear_loaded_ontologies, LOADED_ONTOLOGIES
+from ontosunburst.profiling import StageObserver, PipelineCancelledError, STAGES, TREE_S, \
+    PROPORTIONS_S, RENDER_S, WRITE_S
+
+"""
+Tests asyncio API.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+E_LST = ['02', '03', '04', '05', '08', '09']
+E_LAB = [23, 20, 1, 4, 1, 1]
+E_REF = ['01', '02', '03', '04', '05', '06', '07', '08', '09']
+E_RAB = [14, 26, 20, 10, 20, 5, 1, 1, 3]
+E_ONTO = {'01': ['00'], '02': ['00'], '03': ['00'], '04': ['00'], '05': ['01'],
+          '06': ['01'], '07': ['01'], '08': ['02'], '09': ['02']}
+E_LABElS = {'00': '0', '01': '1', '02': '2', '03': '3', '04': '4',
+            '05': '5', '06': '6', '07': '7', '08': '8', '09': '9'}
+
+E_PARAMS = dict(interest_set=E_LST, abundances=E_LAB, reference_set=E_REF, ref_abundances=E_RAB,
+                analysis=ENRICHMENT_A, input_root='00', ontology_dag_input=E_ONTO,
+                id_to_label_input=E_LABElS, write_output=False)
+
+EC_LST = ['1.1.1.1', '1.1.1.2', '2.7.1.1', '3.1.1.1', '1.2.1.3']
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+class SlowStageObserver(StageObserver):
+    """ Sleeps at the start of a stage, records ended stages. """
+
+    def __init__(self, stage, duration):
+        self.stage = stage
+        self.duration = duration
+        self.ended = list()
+
+    def on_stage_start(self, stage, **counts):
+        if stage == self.stage:
+            time.sleep(self.duration)
+
+    def on_stage_end(self, stage, **counts):
+        self.ended.append(stage)
+
+
+def get_fig_data(fig):
+    return json.loads(fig.to_json())['data']
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestOntosunburstAsync(unittest.TestCase):
+
+    def test_same_figure(self):
+        fig = asyncio.run(ontosunburst_async(**E_PARAMS))
+        self.assertEqual(get_fig_data(fig), get_fig_data(ontosunburst(**E_PARAMS)))
+
+    def test_profile(self):
+        fig, profile = asyncio.run(ontosunburst_async(**E_PARAMS, profile=True))
+        self.assertEqual([s['stage'] for s in profile.stages], STAGES[:-1])
+
+    def test_cached_default_ontology(self):
+        clear_loaded_ontologies()
+        asyncio.run(ontosunburst_async(interest_set=EC_LST, ontology=EC, write_output=False))
+        self.assertIn((EC, True), LOADED_ONTOLOGIES)
+        self.assertGreater(len(LOADED_ONTOLOGIES[(EC, True)].ancestors), 0)
+        clear_loaded_ontologies()
+
+    def test_loaded_ontology(self):
+        loaded = load_ontology(ontology_dag_input=E_ONTO, input_root='00',
+                               id_to_label_input=E_LABElS)
+        fig = asyncio.run(ontosunburst_async(E_LST, abundances=E_LAB, reference_set=E_REF,
+                                             ref_abundances=E_RAB, analysis=ENRICHMENT_A,
+                                             write_output=False, loaded_ontology=loaded))
+        self.assertEqual(get_fig_data(fig), get_fig_data(ontosunburst(**E_PARAMS)))
+
+    def test_event_loop_not_blocked(self):
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await ontosunburst_async(**E_PARAMS, observer=SlowStageObserver(TREE_S, 0.3))
+            task.cancel()
+            return ticks
+
+        self.assertGreater(asyncio.run(run()), 10)
+
+    def test_timeout_stops_run(self):
+        observer = SlowStageObserver(TREE_S, 0.3)
+        executor = ThreadPoolExecutor(1)
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(ontosunburst_async(**E_PARAMS, observer=observer, executor=executor,
+                                           timeout=0.1))
+        executor.shutdown(wait=True)
+        self.assertEqual(observer.ended[-1], TREE_S)  # Stopped at the start of the next stage
+        self.assertNotIn(RENDER_S, observer.ended)
+
+    def test_cancel_concurrent_runs(self):
+        slow_observer = SlowStageObserver(TREE_S, 1)
+        executor = ThreadPoolExecutor(2)
+
+        async def run():
+            slow = asyncio.create_task(ontosunburst_async(**E_PARAMS, observer=slow_observer,
+                                                          executor=executor))
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            await ontosunburst_async(**E_PARAMS, executor=executor)
+            fast_time = time.perf_counter() - start
+            slow.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await slow
+            return fast_time
+
+        self.assertLess(asyncio.run(run()), 1)
+        executor.shutdown(wait=True)
+        self.assertEqual(slow_observer.ended[-1], TREE_S)
+
+    def test_process_executor(self):
+        with ProcessPoolExecutor(1) as executor:
+            fig = asyncio.run(ontosunburst_async(**E_PARAMS, executor=executor))
+            with self.assertRaises(ValueError):
+                asyncio.run(ontosunburst_async(**E_PARAMS, executor=executor, profile=True))
+        self.assertEqual(get_fig_data(fig), get_fig_data(ontosunburst(**E_PARAMS)))
+
+
+class TestCancellationObserver(unittest.TestCase):
+
+    def test_cancellation_observer(self):
+        from ontosunburst.profiling import CancellationObserver
+        cancellation = CancellationObserver()
+        cancellation.on_stage_start(TREE_S)
+        cancellation.cancel()
+        with self.assertRaises(PipelineCancelledError):
+            cancellation.on_stage_start(RENDER_S)
+        cancellation.on_stage_end(WRITE_S)
@@ -0,0 +1,179 @@
+import unittest
+import os
+import json
+import sys
+import tempfile
+from unittest.mock import patch
+
+from ontosunburst.batch import *
+from ontosunburst.ontology_store import load_ontology
+from ontosunburst.commands import main, get_command_line_args, BENCH_COMMAND, SERVE_COMMAND
+from ontosunburst.ontosunburst import ENRICHMENT_A, TOPOLOGY_A, BINOMIAL_TEST, ROOT_CUT, \
+    PATH_UNCUT
+
+"""
+Tests batch generation of many interest sets in one process.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+E_REF = ['01', '02', '03', '04', '05', '06', '07', '08', '09']
+E_RAB = [14, 26, 20, 10, 20, 5, 1, 1, 3]
+E_ONTO = {'01': ['00'], '02': ['00'], '03': ['00'], '04': ['00'], '05': ['01'],
+          '06': ['01'], '07': ['01'], '08': ['02'], '09': ['02']}
+E_LABElS = {'00': '0', '01': '1', '02': '2', '03': '3', '04': '4',
+            '05': '5', '06': '6', '07': '7', '08': '8', '09': '9'}
+
+SAMPLES = {'s1': '02\t23\n03\t20\n05\t4\n08\t1\n',
+           's2': '04\t1\n06\t3\n07\t2\n',
+           's3': '02\tnot_a_number\n09\tnan?\n'}
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def write_samples(directory):
+    for name, content in SAMPLES.items():
+        with open(os.path.join(directory, f'{name}.tsv'), 'w') as f:
+            f.write(content)
+
+
+def get_context(analysis=TOPOLOGY_A):
+    loaded = load_ontology(ontology_dag_input=E_ONTO, input_root='00', id_to_label_input=E_LABElS)
+    return BatchContext(loaded, E_REF, E_RAB, analysis=analysis, labels=True,
+                        test=BINOMIAL_TEST, root_cut=ROOT_CUT, path_cut=PATH_UNCUT,
+                        ref_base=False, show_leaves=False)
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestBatchInputs(unittest.TestCase):
+
+    def test_get_batch_inputs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_samples(tmp_dir)
+            os.mkdir(os.path.join(tmp_dir, 'sub'))
+            expected = [(os.path.join(tmp_dir, f'{s}.tsv'), os.path.join('out', s))
+                        for s in SAMPLES]
+            self.assertTrue(is_batch_input(tmp_dir))
+            self.assertEqual(get_batch_inputs(tmp_dir, 'out'), expected)
+            pattern = os.path.join(tmp_dir, 's[12].tsv')
+            self.assertTrue(is_batch_input(pattern))
+            self.assertEqual(get_batch_inputs(pattern, 'out'), expected[:2])
+            manifest = os.path.join(tmp_dir, 'manifest.tsv')
+            with open(manifest, 'w') as f:
+                f.write('# input\toutput\ns2.tsv\tsample_2\n\ns1.tsv\n')
+            self.assertTrue(is_batch_input(manifest, manifest=True))
+            self.assertFalse(is_batch_input(manifest))
+            single = os.path.join(tmp_dir, 'sample[1].tsv')
+            self.assertTrue(is_batch_input(single))
+            with open(single, 'w') as f:
+                f.write('a\n')
+            self.assertFalse(is_batch_input(single))
+            self.assertFalse(is_batch_input(os.path.join(tmp_dir, 'missing.tsv')))
+            self.assertEqual(get_batch_inputs(manifest, 'out', manifest=True),
+                             [(os.path.join(tmp_dir, 's2.tsv'), os.path.join('out', 'sample_2')),
+                              expected[0]])
+
+
+class TestRunBatch(unittest.TestCase):
+
+    def test_run_batch_shared_ontology(self):
+        classes = list()
+        for share_ontology in [False, True]:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                write_samples(tmp_dir)
+                output_dir = os.path.join(tmp_dir, 'out')
+                context = get_context()
+                context.params['table_format'] = 'tsv'
+                results = run_batch(context, get_batch_inputs(tmp_dir, output_dir), jobs=2,
+                                    summary=False, share_ontology=share_ontology)
+                self.assertEqual([r[STATUS] for r in results],
+                                 [OK_STATUS, OK_STATUS, FAILED_STATUS])
+                with open(os.path.join(output_dir, 's1_tree.tsv')) as f:
+                    classes.append(f.read())
+        self.assertEqual(classes[0], classes[1])
+
+    def test_run_batch(self):
+        for jobs in [1, 2]:
+            with self.subTest(jobs=jobs), tempfile.TemporaryDirectory() as tmp_dir:
+                write_samples(tmp_dir)
+                output_dir = os.path.join(tmp_dir, 'out')
+                results = run_batch(get_context(ENRICHMENT_A),
+                                    get_batch_inputs(tmp_dir, output_dir), jobs=jobs)
+                self.assertEqual([r[STATUS] for r in results],
+                                 [OK_STATUS, OK_STATUS, FAILED_STATUS])
+                self.assertIn('ValueError', results[2][ERROR])
+                self.assertTrue(os.path.exists(os.path.join(output_dir, 's1.html')))
+                self.assertTrue(os.path.exists(os.path.join(output_dir, 's2.html')))
+                self.assertFalse(os.path.exists(os.path.join(output_dir, 's3.html')))
+                with open(os.path.join(output_dir, SUMMARY_FILE)) as f:
+                    lines = f.read().splitlines()
+                self.assertEqual(len(lines), 4)
+                self.assertEqual(lines[3].split('\t')[2], FAILED_STATUS)
+
+    def test_run_batch_duplicated_names(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_samples(tmp_dir)
+            manifest = os.path.join(tmp_dir, 'manifest.tsv')
+            with open(manifest, 'w') as f:
+                f.write('s1.tsv\tsample\ns2.tsv\tsample\ns3.tsv\n')
+            output_dir = os.path.join(tmp_dir, 'out')
+            inputs = get_batch_inputs(manifest, output_dir, manifest=True)
+            with self.assertRaises(ValueError) as e:
+                run_batch(get_context(), inputs)
+            self.assertIn(os.path.join(output_dir, 'sample'), str(e.exception))
+            self.assertFalse(os.path.exists(output_dir))
+
+    def test_format_batch_summary(self):
+        results = [{INPUT: 'a', OUTPUT: 'o/a', STATUS: OK_STATUS, DURATION: 1.0, ERROR: ''},
+                   {INPUT: 'b', OUTPUT: 'o/b', STATUS: FAILED_STATUS, DURATION: 0.5,
+                    ERROR: 'KeyError: x'}]
+        self.assertEqual(format_batch_summary(results),
+                         'b failed : KeyError: x\n'
+                         '1/2 samples succeeded, 1 failed (1.50 s of samples computation)')
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_samples(tmp_dir)
+            onto_file = os.path.join(tmp_dir, 'onto.json')
+            with open(onto_file, 'w') as f:
+                json.dump(E_ONTO, f)
+            output_dir = os.path.join(tmp_dir, 'out')
+            argv = ['ontosunburst', '-i', os.path.join(tmp_dir, 's*.tsv'), '-od', onto_file,
+                    '-ir', '00', '-o', output_dir, '-j', '2']
+            with patch.object(sys, 'argv', argv):
+                with self.assertRaises(SystemExit) as e:
+                    main()
+            self.assertEqual(e.exception.code, 1)
+            self.assertEqual(sorted(os.listdir(output_dir)), [SUMMARY_FILE, 's1.html', 's2.html'])
+
+    def test_command_line_subcommands(self):
+        args = get_command_line_args(['--profile', BENCH_COMMAND, '-s', '10', '20'])
+        self.assertEqual((args.command, args.sizes, args.profile), (BENCH_COMMAND, [10, 20], True))
+        args = get_command_line_args([SERVE_COMMAND, '-p', '8000'])
+        self.assertEqual((args.command, args.port), (SERVE_COMMAND, 8000))
+        args = get_command_line_args(['-i', 'sample.tsv', '--kwargs', 'title=t'])
+        self.assertEqual((args.command, args.input, args.kwargs), (None, 'sample.tsv', ['title=t']))
+        with patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                get_command_line_args([])
+
+    def test_command_line_svg(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_samples(tmp_dir)
+            onto_file = os.path.join(tmp_dir, 'onto.json')
+            with open(onto_file, 'w') as f:
+                json.dump(E_ONTO, f)
+            output_dir = os.path.join(tmp_dir, 'out')
+            argv = ['ontosunburst', '-i', os.path.join(tmp_dir, 's*.tsv'), '-od', onto_file,
+                    '-ir', '00', '-o', output_dir, '--format', 'svg']
+            with patch.object(sys, 'argv', argv):
+                with self.assertRaises(SystemExit):
+                    main()
+            self.assertEqual(sorted(os.listdir(output_dir)), [SUMMARY_FILE, 's1.svg', 's2.svg'])
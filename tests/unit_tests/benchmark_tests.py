@@ -0,0 +1,115 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+
+from ontosunburst.benchmark import *
+from ontosunburst.ontosunburst import CHEBI
+from ontosunburst.profiling import STAGES, LOAD_S, WRITE_S
+
+"""
+Tests synthetic ontologies generation and benchmark harness.
+"""
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def get_depths(ontology_dag, root):
+    depths = {root: 0}
+
+    def depth(c):
+        if c not in depths:
+            depths[c] = 1 + min(depth(p) for p in ontology_dag[c])
+        return depths[c]
+
+    for c in ontology_dag:
+        depth(c)
+    return depths
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestSyntheticOntology(unittest.TestCase):
+
+    def test_generate_synthetic_ontology(self):
+        ontology_dag = generate_synthetic_ontology(2000, depth=6, branching=4,
+                                                   multi_parent_rate=0.3)
+        self.assertEqual(len(ontology_dag), 2000)
+        self.assertNotIn(SYNTHETIC_ROOT, ontology_dag)
+        self.assertEqual(max(get_depths(ontology_dag, SYNTHETIC_ROOT).values()), 6)
+        multi = sum(1 for ps in ontology_dag.values() if len(ps) > 1) / len(ontology_dag)
+        self.assertAlmostEqual(multi, 0.3, delta=0.05)
+
+    def test_generate_synthetic_ontology_tree(self):
+        ontology_dag = generate_synthetic_ontology(500, depth=3, branching=8,
+                                                   multi_parent_rate=0)
+        self.assertTrue(all(len(ps) == 1 for ps in ontology_dag.values()))
+        self.assertEqual(len([c for c, ps in ontology_dag.items() if ps == [SYNTHETIC_ROOT]]), 8)
+
+    def test_generate_synthetic_ontology_seed(self):
+        shape = SYNTHETIC_PRESETS[GO_BP]
+        self.assertEqual(generate_synthetic_ontology(1000, seed=1, **shape),
+                         generate_synthetic_ontology(1000, seed=1, **shape))
+        self.assertNotEqual(generate_synthetic_ontology(1000, seed=1, **shape),
+                            generate_synthetic_ontology(1000, seed=2, **shape))
+
+    def test_get_leaves(self):
+        ontology_dag = {'a': ['ab'], 'b': ['ab'], 'ab': ['r'], 'c': ['r', 'ab']}
+        self.assertEqual(get_leaves(ontology_dag), ['a', 'b', 'c'])
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run_synthetic_benchmark(self):
+        results = run_synthetic_benchmark(sizes=[400, 200], presets=[EC, GO_CC], repeats=1)
+        self.assertEqual([(r['preset'], r['classes']) for r in results],
+                         [(EC, 200), (EC, 400), (GO_CC, 200), (GO_CC, 400)])
+        for r in results:
+            self.assertEqual(list(r['stages']),
+                             [s for s in STAGES if s not in {LOAD_S, WRITE_S}])
+            self.assertGreater(r['sectors'], 0)
+        self.assertEqual(results[0]['scaling'], {})
+        self.assertIn(TREE_S, results[1]['scaling'])
+        self.assertIn('classes', format_results(results))
+
+    def test_get_scaling_exponents(self):
+        previous = {'classes': 100, 'stages': {'tree': 1.0, 'render': 1.0}}
+        current = {'classes': 400, 'stages': {'tree': 4.0, 'render': 16.0}}
+        self.assertEqual(get_scaling_exponents(previous, current), {'tree': 1.0, 'render': 2.0})
+        self.assertEqual(get_scaling_exponents(None, current), {})
+
+
+class TestOntologiesBenchmark(unittest.TestCase):
+
+    def test_get_bench_cases(self):
+        cases = get_bench_cases(EC, [10, 100000], [TOPOLOGY_A, ENRICHMENT_A])
+        self.assertEqual([(c['analysis'], len(c['interest_set'])) for c in cases],
+                         [(TOPOLOGY_A, 10), (ENRICHMENT_A, 10),
+                          (TOPOLOGY_A, len(cases[2]['reference_set'])),
+                          (ENRICHMENT_A, len(cases[2]['reference_set']))])
+        self.assertEqual(len(cases[0]['reference_set']), 10 * BENCH_REF_FACTOR)
+        self.assertTrue(set(cases[0]['interest_set']).issubset(cases[0]['reference_set']))
+
+    def test_bench_ontologies_shipped(self):
+        for ontology in BENCH_ONTOLOGIES:
+            with self.subTest(ontology=ontology):
+                self.assertTrue(is_ontology_available(ontology))
+
+    def test_run_ontologies_benchmark(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            results = run_ontologies_benchmark(ontologies=[EC, CHEBI], interest_sizes=[10],
+                                               isolate=False)
+        self.assertIn(f'{CHEBI} ontology files not found, skipped.', stdout.getvalue())
+        self.assertEqual([(r['ontology'], r['analysis']) for r in results],
+                         [(EC, TOPOLOGY_A), (EC, ENRICHMENT_A)])
+        for r in results:
+            self.assertEqual(r['concepts'], 10)
+            self.assertEqual(r['ref_concepts'], 100)
+            self.assertIn(LOAD_S, r['stages'])
+            self.assertIn(WRITE_S, r['stages'])
+            self.assertGreater(r['html bytes'], 0)
+        self.assertIn('html bytes', format_results(results, BENCH_COLUMNS))
@@ -0,0 +1,165 @@
+import unittest
+import os
+import io
+import pickle
+import tempfile
+from collections.abc import Mapping
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from ontosunburst.checkpoint import *
+from ontosunburst.ontosunburst import _tree_analysis, ontosunburst, get_checkpoint, \
+    ENRICHMENT_A, TOPOLOGY_A, BINOMIAL_TEST, HYPERGEO_TEST, ROOT_CUT, ROOT_UNCUT, PATH_UNCUT, \
+    PATH_DEEPER, EC
+from ontosunburst.ontology_store import LoadedOntology
+from ontosunburst.label_store import LabelStore, compile_labels
+
+"""
+Tests pipeline stages checkpoints.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+E_LST = ['02', '03', '04', '05', '08', '09']
+E_LAB = [23, 20, 1, 4, 1, 1]
+E_REF = ['01', '02', '03', '04', '05', '06', '07', '08', '09']
+E_RAB = [14, 26, 20, 10, 20, 5, 1, 1, 3]
+E_ONTO = {'01': ['00'], '02': ['00'], '03': ['00'], '04': ['00'], '05': ['01'],
+          '06': ['01'], '07': ['01'], '08': ['02'], '09': ['02']}
+E_LABElS = {'00': '0', '01': '1', '02': '2', '03': '3', '04': '4',
+            '05': '5', '06': '6', '07': '7', '08': '8', '09': '9'}
+
+PARAMS = dict(analysis=ENRICHMENT_A, interest_concepts=E_LST, abundances=E_LAB, scores=None,
+              reference_concepts=E_REF, ref_abundances=E_RAB, ontology_dag=E_ONTO,
+              id_to_label=E_LABElS, test=BINOMIAL_TEST, root='00', root_cut=ROOT_CUT,
+              path_cut=PATH_UNCUT, ref_base=False, show_leaves=False)
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def run(checkpoint=None, **params):
+    with redirect_stdout(io.StringIO()):
+        tree_data, significant, ref_set = _tree_analysis(**{**PARAMS, **params},
+                                                         checkpoint=checkpoint)
+    return tree_data.get_col(), significant
+
+
+def hits(checkpoint):
+    return [checkpoint.hits[s] for s in CHECKPOINT_STAGES]
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestCheckpointCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint = CheckpointCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertSameRun(self, res, exp):
+        self.assertEqual(str(res), str(exp))
+
+    def test_resume_downstream_parameters(self):
+        self.assertSameRun(run(self.checkpoint), run())
+        self.assertEqual([self.checkpoint.misses[s] for s in CHECKPOINT_STAGES], [1, 1, 1, 1])
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 4)
+        for root_cut, path_cut in [(ROOT_CUT, PATH_UNCUT), (ROOT_UNCUT, PATH_DEEPER)]:
+            params = dict(root_cut=root_cut, path_cut=path_cut)
+            self.assertSameRun(run(self.checkpoint, **params), run(**params))
+        self.assertEqual(hits(self.checkpoint), [0, 0, 0, 2])
+
+    def test_resume_upstream_parameters(self):
+        run(self.checkpoint)
+        self.assertSameRun(run(self.checkpoint, test=HYPERGEO_TEST), run(test=HYPERGEO_TEST))
+        self.assertEqual(hits(self.checkpoint), [0, 0, 1, 0])
+        self.assertSameRun(run(self.checkpoint, ref_base=True), run(ref_base=True))
+        self.assertEqual(hits(self.checkpoint), [1, 0, 1, 0])
+        self.assertSameRun(run(self.checkpoint, analysis=TOPOLOGY_A), run(analysis=TOPOLOGY_A))
+        self.assertEqual(hits(self.checkpoint), [1, 0, 2, 0])
+        self.assertSameRun(run(self.checkpoint, abundances=[1] * 6), run(abundances=[1] * 6))
+        self.assertEqual(hits(self.checkpoint), [1, 0, 2, 0])
+
+    def test_resume_each_stage(self):
+        keys = self.checkpoint.get_stages_keys(**{k: v for k, v in PARAMS.items()
+                                                  if k not in ('root_cut', 'path_cut')})
+        for i, stage in enumerate(CHECKPOINT_STAGES):
+            with self.subTest(stage=stage):
+                self.checkpoint.clear()
+                run(self.checkpoint)
+                for later_stage in CHECKPOINT_STAGES[i + 1:]:
+                    os.remove(self.checkpoint.get_path(later_stage, keys[later_stage]))
+                exp_hits = hits(self.checkpoint)
+                exp_hits[i] += 1
+                params = dict(root_cut=ROOT_UNCUT, path_cut=PATH_DEEPER)
+                self.assertSameRun(run(self.checkpoint, **params), run(**params))
+                self.assertEqual(hits(self.checkpoint), exp_hits)
+
+    def test_invalid_checkpoint(self):
+        run(self.checkpoint)
+        keys = self.checkpoint.get_stages_keys(**{k: v for k, v in PARAMS.items()
+                                                  if k not in ('root_cut', 'path_cut')})
+        with open(self.checkpoint.get_path(ENRICHMENT_S, keys[ENRICHMENT_S]), 'wb') as f:
+            f.write(b'truncated')
+        self.assertSameRun(run(self.checkpoint), run())
+        self.assertEqual(hits(self.checkpoint), [0, 0, 1, 0])
+        self.checkpoint.clear()
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_pickle_without_fingerprints(self):
+        self.checkpoint.get_fingerprint(E_ONTO)
+        copy = pickle.loads(pickle.dumps(self.checkpoint))
+        self.assertEqual(copy.cache_dir, self.checkpoint.cache_dir)
+        self.assertEqual(copy.get_fingerprint(E_ONTO), self.checkpoint.get_fingerprint(E_ONTO))
+        self.assertNotEqual(get_hash(E_ONTO), get_hash(E_LABElS))
+
+    def test_files_fingerprints(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            onto_file = os.path.join(tmp, 'onto.json')
+            with open(onto_file, 'w') as f:
+                f.write('{}')
+            checkpoint = get_checkpoint(self.tmp_dir.name, None, onto_file, E_ONTO)
+            fingerprint = get_files_fingerprint([onto_file])
+            self.assertEqual(checkpoint.get_fingerprint(E_ONTO), fingerprint)
+            os.utime(onto_file, ns=(0, 0))
+            self.assertNotEqual(get_files_fingerprint([onto_file]), fingerprint)
+        self.assertEqual(get_checkpoint(self.tmp_dir.name, None, E_ONTO, E_ONTO)
+                         .get_fingerprint(E_ONTO), get_hash(E_ONTO))
+        self.assertIsNone(get_checkpoint(None, EC, None, E_ONTO))
+        store = LabelStore(buffer=compile_labels(E_LABElS, bytes(range(32))))
+        self.assertEqual(self.checkpoint.get_fingerprint(store), bytes(range(32)).hex())
+        unsigned_store = LabelStore(buffer=compile_labels(E_LABElS))
+        self.assertEqual(self.checkpoint.get_fingerprint(unsigned_store), get_hash(unsigned_store))
+
+    def test_default_ontology_not_hashed(self):
+        hashed = list()
+
+        def spy_hash(obj):
+            if isinstance(obj, Mapping):
+                hashed.append(len(obj))
+            return get_hash(obj)
+
+        with patch('ontosunburst.checkpoint.get_hash', side_effect=spy_hash), \
+                redirect_stdout(io.StringIO()):
+            for _ in range(2):
+                ontosunburst(interest_set=['1.1.1.1', '2.7.1.1'], ontology=EC, write_output=False,
+                             cache_dir=self.tmp_dir.name)
+        self.assertEqual(hashed, [])
+        files = os.listdir(self.tmp_dir.name)
+        self.assertEqual(len([f for f in files if f.endswith(CHECKPOINT_EXT)]), 3)  # Topology
+
+    def test_loaded_ontology_fingerprint(self):
+        loaded = LoadedOntology(E_ONTO, '00')
+        with patch('ontosunburst.ontology_store.get_hash', side_effect=get_hash) as spy:
+            self.assertEqual(loaded.get_fingerprint(), get_hash(E_ONTO))
+            self.assertEqual(loaded.get_fingerprint(), get_hash(E_ONTO))
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(pickle.loads(pickle.dumps(loaded)).get_fingerprint(), get_hash(E_ONTO))
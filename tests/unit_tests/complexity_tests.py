@@ -0,0 +1,278 @@
+import unittest
+import os
+import gc
+import io
+from contextlib import redirect_stdout
+from time import perf_counter
+from unittest.mock import patch
+
+from ontosunburst.dag2tree import *
+from ontosunburst.benchmark import get_leaves, sample_concepts
+from ontosunburst.onto2dag import ontology_to_weighted_dag
+
+"""
+Complexity regression tests : each TreeData core operation on synthetic trees of sizes n and 4n
+must not scan the IDs or parents lists and must build its lookup dictionaries a constant number of
+times (deterministic, always run).
+Each operation is also timed, the growth ratio of the time must stay under a linear bound with a
+noise margin (x8, an n.log(n) operation gives ~x4.7, a quadratic operation gives ~x16). Timings
+depend on the machine load : the scaling benchmarks only run when the BENCHMARK_ENV environment
+variable is set (ONTOSUNBURST_BENCHMARKS=1 python -m pytest complexity_tests.py).
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+SIZE = 4000
+FACTOR = 4
+BRANCHING = 3
+CHAIN_STEP = 4  # One parent class on CHAIN_STEP has a single child class (nested paths)
+ROOT = 'c0'
+REPEATS = 7
+# Margin over the linear ratio for timing noise (still far under the quadratic ratio)
+SLACK = 2
+LINEAR_BOUND = FACTOR * SLACK
+BENCHMARK_ENV = 'ONTOSUNBURST_BENCHMARKS'
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def generate_tree_ontology(nb_classes):
+    """ Generate a complete BRANCHING-ary tree ontology of nb_classes classes (root excluded), one
+    parent on CHAIN_STEP gets an intermediate single child class.
+    """
+    ontology_dag = dict()
+    for i in range(1, nb_classes + 1):
+        p = (i - 1) // BRANCHING
+        if p % CHAIN_STEP == 1:
+            ontology_dag[f'c{p}_'] = [f'c{p}']
+            ontology_dag[f'c{i}'] = [f'c{p}_']
+        else:
+            ontology_dag[f'c{i}'] = [f'c{p}']
+    return ontology_dag
+
+
+def get_synthetic_tree_inputs(nb_classes):
+    """ Get dag_to_tree inputs of a synthetic tree ontology with all leaves in the reference set
+    and a quarter of them in the interest set.
+    """
+    ontology_dag = generate_tree_ontology(nb_classes)
+    leaves = get_leaves(ontology_dag)
+    ref_set, ref_ab = sample_concepts(leaves, len(leaves))
+    with redirect_stdout(io.StringIO()):
+        ref_abundance = ontology_to_weighted_dag(ref_set, ref_ab, ROOT, ontology_dag, False)
+        set_abundance = ontology_to_weighted_dag(ref_set[::4], ref_ab[::4], ROOT, ontology_dag,
+                                                 False)
+    return set_abundance, ref_abundance, ontology_dag
+
+
+def get_tree(inputs, ref_base=True, proportions=True):
+    data = TreeData()
+    data.dag_to_tree(*inputs, ROOT, ref_base=ref_base)
+    if proportions:
+        data.calculate_proportions(ref_base)
+    return data
+
+
+def time_operation(operation, setup):
+    """ Get the minimal time of an operation over REPEATS runs, setup (not timed) returns the
+    operation argument. The garbage collector is disabled while timing to reduce noise.
+    """
+    times = list()
+    for _ in range(REPEATS):
+        arg = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            operation(arg)
+            times.append(perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(times)
+
+
+def get_growth_ratio(operation, setup_factory):
+    """ Get the time ratio of an operation between trees of sizes SIZE and FACTOR * SIZE. """
+    small = time_operation(operation, setup_factory(SIZE))
+    large = time_operation(operation, setup_factory(FACTOR * SIZE))
+    return large / small
+
+
+class ScanCountingList(list):
+    """ List counting its linear scans (membership tests, index and count lookups). """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.scans = 0
+
+    def __contains__(self, item):
+        self.scans += 1
+        return super().__contains__(item)
+
+    def index(self, *args):
+        self.scans += 1
+        return super().index(*args)
+
+    def count(self, item):
+        self.scans += 1
+        return super().count(item)
+
+
+LOOKUP_BUILDERS = ['get_index_dict', 'get_children_index_dict']
+
+
+def count_lookups(operation, arg, data):
+    """ Run an operation and count the linear scans of data IDs and parents lists and the
+    lookup dictionaries built : {'scans': int, builder: int}.
+    """
+    columns = [ScanCountingList(data.ids), ScanCountingList(data.parents)]
+    data.ids, data.parents = columns
+    spies = [patch.object(TreeData, b, autospec=True, side_effect=getattr(TreeData, b))
+             for b in LOOKUP_BUILDERS]
+    mocks = [spy.start() for spy in spies]
+    try:
+        operation(arg)
+    finally:
+        for spy in spies:
+            spy.stop()
+    counts = {b: m.call_count for b, m in zip(LOOKUP_BUILDERS, mocks)}
+    counts['scans'] = sum(c.scans for c in columns)
+    return counts
+
+
+INPUTS = dict()
+
+
+def get_inputs(nb_classes):
+    if nb_classes not in INPUTS:
+        INPUTS[nb_classes] = get_synthetic_tree_inputs(nb_classes)
+    return INPUTS[nb_classes]
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestSyntheticTree(unittest.TestCase):
+
+    def test_synthetic_tree_size(self):
+        for n in [SIZE, FACTOR * SIZE]:
+            set_abundance, ref_abundance, ontology_dag = get_inputs(n)
+            data = get_tree(get_inputs(n), proportions=False)
+            # Tree ontology : one sector per reference class
+            self.assertEqual(data.len, len(ref_abundance))
+            data.calculate_proportions(True)
+            data.cut_nested_path(PATH_DEEPER, True)
+            self.assertLess(data.len, len(ref_abundance))
+        self.assertAlmostEqual(len(get_inputs(FACTOR * SIZE)[1]) / len(get_inputs(SIZE)[1]),
+                               FACTOR, delta=0.5)
+
+
+class TestTreeDataLookups(unittest.TestCase):
+
+    def assert_lookups(self, operation, setup_factory, get_data=lambda arg: arg):
+        counts = list()
+        for n in [SIZE, FACTOR * SIZE]:
+            arg = setup_factory(n)()
+            counts.append(count_lookups(operation, arg, get_data(arg)))
+        self.assertEqual(counts[0]['scans'], 0)
+        self.assertEqual(counts[1], counts[0])
+
+    def test_dag_to_tree(self):
+        self.assert_lookups(lambda args: args[0].dag_to_tree(*args[1], ROOT),
+                            lambda n: lambda: (TreeData(), get_inputs(n)), lambda args: args[0])
+
+    def test_add_value(self):
+        def add_values(data):
+            for i in range(data.len):
+                data.add_value(f'n{i}', 'c', 'l', 1, 1, '')
+
+        self.assert_lookups(add_values,
+                            lambda n: lambda: get_tree(get_inputs(n), proportions=False))
+
+    def test_calculate_proportions(self):
+        for ref_base in [True, False]:
+            with self.subTest(ref_base=ref_base):
+                self.assert_lookups(lambda data: data.calculate_proportions(ref_base),
+                                    lambda n: lambda: get_tree(get_inputs(n), ref_base=ref_base,
+                                                               proportions=False))
+
+    def test_cut_root(self):
+        for mode in [ROOT_CUT, ROOT_TOTAL_CUT]:
+            with self.subTest(mode=mode):
+                self.assert_lookups(lambda data: data.cut_root(mode),
+                                    lambda n: lambda: get_tree(get_inputs(n)))
+
+    def test_cut_nested_path(self):
+        for mode in [PATH_DEEPER, PATH_HIGHER, PATH_BOUND]:
+            with self.subTest(mode=mode):
+                self.assert_lookups(lambda data: data.cut_nested_path(mode, True),
+                                    lambda n: lambda: get_tree(get_inputs(n)))
+
+    def test_delete_value(self):
+        self.assert_lookups(lambda data: data.delete_value(list(range(0, data.len, 2))),
+                            lambda n: lambda: get_tree(get_inputs(n), proportions=False))
+
+    def test_make_enrichment_analysis(self):
+        self.assert_lookups(
+            lambda args: args[0].make_enrichment_analysis(BINOMIAL_TEST, args[1]),
+            lambda n: lambda: (get_tree(get_inputs(n)), {c: 0.01 for c in get_inputs(n)[1]}),
+            lambda args: args[0])
+
+
+@unittest.skipUnless(os.environ.get(BENCHMARK_ENV), f'timing benchmark, set {BENCHMARK_ENV}=1')
+class TestTreeDataScaling(unittest.TestCase):
+
+    def assert_scaling(self, operation, setup_factory, bound):
+        ratio = get_growth_ratio(operation, setup_factory)
+        self.assertLess(ratio, bound, f'x{FACTOR} size -> x{ratio:.2f} time')
+
+    def test_dag_to_tree(self):
+        self.assert_scaling(
+            lambda inputs: TreeData().dag_to_tree(*inputs, ROOT),
+            lambda n: lambda: get_inputs(n), LINEAR_BOUND)
+
+    def test_add_value(self):
+        def add_values(data):
+            for i in range(data.len):
+                data.add_value(f'n{i}', 'c', 'l', 1, 1, '')
+
+        self.assert_scaling(add_values,
+                            lambda n: lambda: get_tree(get_inputs(n), proportions=False),
+                            LINEAR_BOUND)
+
+    def test_calculate_proportions(self):
+        self.assert_scaling(lambda data: data.calculate_proportions(True),
+                            lambda n: lambda: get_tree(get_inputs(n), proportions=False),
+                            LINEAR_BOUND)
+
+    def test_calculate_proportions_set_base(self):
+        self.assert_scaling(lambda data: data.calculate_proportions(False),
+                            lambda n: lambda: get_tree(get_inputs(n), ref_base=False,
+                                                       proportions=False),
+                            LINEAR_BOUND)
+
+    def test_cut_root(self):
+        self.assert_scaling(lambda data: data.cut_root(ROOT_CUT),
+                            lambda n: lambda: get_tree(get_inputs(n)), LINEAR_BOUND)
+
+    def test_cut_nested_path(self):
+        for mode in [PATH_DEEPER, PATH_HIGHER, PATH_BOUND]:
+            with self.subTest(mode=mode):
+                self.assert_scaling(lambda data: data.cut_nested_path(mode, True),
+                                    lambda n: lambda: get_tree(get_inputs(n)), LINEAR_BOUND)
+
+    def test_delete_value(self):
+        self.assert_scaling(lambda data: data.delete_value(list(range(0, data.len, 2))),
+                            lambda n: lambda: get_tree(get_inputs(n), proportions=False),
+                            LINEAR_BOUND)
+
+    def test_make_enrichment_analysis(self):
+        scores_factory = lambda n: {c: 0.01 for c in get_inputs(n)[1]}
+        self.assert_scaling(
+            lambda args: args[0].make_enrichment_analysis(BINOMIAL_TEST, args[1]),
+            lambda n: lambda: (get_tree(get_inputs(n)), scores_factory(n)), LINEAR_BOUND)
@@ -1,7 +1,11 @@
 import unittest
 import io
+import os
+import tempfile
+import importlib.util
 
 from functools import wraps
+import scipy.stats as stats
 from ontosunburst.dag2tree import *
 
 """
@@ -700,3 +704,74 @@ class TestTopologyManagement(unittest.TestCase):
         for line in lines:
             line = tuple([nan if type(x) != str and np.isnan(x) else x for x in line])
             self.assertIn(line, exp_l)
+
+
+# TABLES EXPORT TESTS
+# ==================================================================================================
+
+def nan_cols(data):
+    return [tuple(None if type(x) != str and np.isnan(x) else x for x in c) for c in data.get_col()]
+
+
+class TestTreeDataTable(unittest.TestCase):
+
+    def setUp(self):
+        self.data = TreeData()
+        self.data.dag_to_tree(ENRICH_AB, ENRICH_REF_AB, E_ONTO, '00', E_LABElS)
+        self.data.calculate_proportions(True)
+        self.data.make_enrichment_analysis(BINOMIAL_TEST)
+
+    def test_copy(self):
+        copy = self.data.copy()
+        self.assertEqual(copy.get_col(), self.data.get_col())
+        copy.cut_root(ROOT_TOTAL_CUT)
+        copy.cut_nested_path(PATH_HIGHER, True)
+        self.assertEqual(nan_cols(self.data), nan_cols(self.data.copy()))
+        self.assertLess(copy.len, self.data.len)
+        self.assertEqual(len(self.data.ids), self.data.len)
+        with self.assertRaises(ValueError):
+            self.data.copy().add_value(self.data.ids[0], 'x', 'X', 1, 1, '')
+
+    def test_add_value_after_delete(self):
+        deleted, kept = self.data.ids[1], self.data.ids[2]
+        self.data.delete_value(1)
+        self.data.add_value(deleted, 'x', 'X', 1, 1, '')
+        with self.assertRaises(ValueError):
+            self.data.add_value(kept, 'x', 'X', 1, 1, '')
+        self.assertEqual(len(self.data.ids), self.data.len)
+
+    def test_to_dataframe(self):
+        df = self.data.to_dataframe()
+        self.assertEqual(list(df.columns), list(self.data.get_data_dict().keys()))
+        self.assertEqual(len(df), self.data.len)
+        self.assertEqual(df[ONTO_ID].tolist(), self.data.onto_ids)
+        np.testing.assert_array_equal(df[PVAL].to_numpy(), np.array(self.data.p_val))
+
+    def test_tree_from_dataframe(self):
+        data = tree_from_dataframe(self.data.to_dataframe())
+        self.assertEqual(data.len, self.data.len)
+        self.assertEqual(nan_cols(data), nan_cols(self.data))
+        self.assertEqual(type(data.count[0]), int)
+        data.add_value('new', 'new', 'New', 1, 1, data.ids[0])
+        with self.assertRaises(ValueError):
+            data.add_value(data.ids[1], 'x', 'X', 1, 1, data.ids[0])
+
+    def test_write_read_table_tsv(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'tree.tsv')
+            self.data.write_table(output)
+            self.assertEqual(nan_cols(read_table(output)), nan_cols(self.data))
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow not installed')
+    def test_write_read_table_arrow(self):
+        for table_format in [PARQUET_F, FEATHER_F]:
+            with self.subTest(table_format=table_format), tempfile.TemporaryDirectory() as tmp_dir:
+                output = os.path.join(tmp_dir, f'tree.{table_format}')
+                self.data.write_table(output)
+                self.assertEqual(nan_cols(read_table(output)), nan_cols(self.data))
+
+    def test_get_table_format(self):
+        self.assertEqual(get_table_format('a/tree.parquet'), PARQUET_F)
+        self.assertEqual(get_table_format('tree.out', TSV_F), TSV_F)
+        with self.assertRaises(ValueError):
+            get_table_format('tree.csv')
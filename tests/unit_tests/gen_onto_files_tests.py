@@ -0,0 +1,143 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+
+from ontosunburst.Inputs_generation.gen_onto_files import *
+
+"""
+Tests the paged SPARQL queries of the ontology inputs generation (SPARQLWrapper stubbed).
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+QUERY = f"""
+SELECT ?childId ?parentId
+WHERE {{
+    ?child ?p ?parent .
+    {CURSOR_FILTER}
+}}
+"""
+KEYS = ['childId', 'parentId']
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def binding(child_id, parent_id):
+    return {'childId': {'type': 'literal', 'value': child_id},
+            'parentId': {'type': 'literal', 'value': parent_id}}
+
+
+class FakeResult:
+    def __init__(self, bindings):
+        self.bindings = bindings
+
+    def convert(self):
+        return {'results': {'bindings': self.bindings}}
+
+
+class FakeSPARQLWrapper:
+    """ Serves pages (lists of bindings or exceptions to raise) in order, records the queries. """
+    pages = list()
+    queries = list()
+
+    def __init__(self, endpoint_url):
+        self.endpoint_url = endpoint_url
+        self.query_str = None
+
+    def setReturnFormat(self, return_format):
+        pass
+
+    def setQuery(self, query):
+        self.query_str = query
+
+    def query(self):
+        FakeSPARQLWrapper.queries.append(self.query_str)
+        page = FakeSPARQLWrapper.pages.pop(0)
+        if isinstance(page, Exception):
+            raise page
+        return FakeResult(page)
+
+
+def run_pages(pages, page_size=2, retries=MAX_RETRIES):
+    FakeSPARQLWrapper.pages = list(pages)
+    FakeSPARQLWrapper.queries = list()
+    with patch('ontosunburst.Inputs_generation.gen_onto_files.SPARQLWrapper', FakeSPARQLWrapper), \
+            patch('ontosunburst.Inputs_generation.gen_onto_files.time.sleep') as sleep, \
+            redirect_stdout(io.StringIO()):
+        bindings = list(query_pages(QUERY, 'http://endpoint/', KEYS, page_size, retries))
+    return bindings, FakeSPARQLWrapper.queries, sleep
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestQueryPages(unittest.TestCase):
+
+    def test_multi_pages(self):
+        pages = [[binding('C:1', 'C:0'), binding('C:2', 'C:0')],
+                 [binding('C:2', 'C:1'), binding('C:3', 'C:"x"')],
+                 [binding('C:4', 'C:3')]]
+        bindings, queries, _ = run_pages(pages)
+        self.assertEqual(bindings, [b for page in pages for b in page])
+        self.assertEqual(len(queries), 3)
+        for query in queries:
+            self.assertTrue(query.endswith('ORDER BY STR(?childId) STR(?parentId)\nLIMIT 2'))
+            self.assertNotIn('OFFSET', query)
+        self.assertIn(CURSOR_FILTER, queries[0])
+        self.assertIn('FILTER((STR(?childId) > "C:2") || '
+                      '(STR(?childId) = "C:2" && STR(?parentId) > "C:0"))', queries[1])
+        self.assertIn('FILTER((STR(?childId) > "C:3") || '
+                      '(STR(?childId) = "C:3" && STR(?parentId) > "C:\\"x\\""))', queries[2])
+
+    def test_last_full_page(self):
+        pages = [[binding('C:1', 'C:0'), binding('C:2', 'C:0')], []]
+        bindings, queries, _ = run_pages(pages)
+        self.assertEqual(len(bindings), 2)
+        self.assertEqual(len(queries), 2)
+
+    def test_single_short_page(self):
+        bindings, queries, _ = run_pages([[binding('C:1', 'C:0')]])
+        self.assertEqual(bindings, [binding('C:1', 'C:0')])
+        self.assertEqual(len(queries), 1)
+
+    def test_retry_then_success(self):
+        pages = [[binding('C:1', 'C:0'), binding('C:2', 'C:0')],
+                 EndPointInternalError(), ConnectionResetError(), [binding('C:3', 'C:0')]]
+        bindings, queries, sleep = run_pages(pages)
+        self.assertEqual(bindings, [binding('C:1', 'C:0'), binding('C:2', 'C:0'),
+                                    binding('C:3', 'C:0')])
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(queries[1], queries[2])
+        self.assertEqual(queries[2], queries[3])
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [RETRY_DELAY, 2 * RETRY_DELAY])
+
+    def test_retries_exhausted(self):
+        pages = [EndPointInternalError(), EndPointInternalError(), EndPointInternalError()]
+        with self.assertRaises(EndPointInternalError):
+            run_pages(pages, retries=2)
+        self.assertEqual(FakeSPARQLWrapper.pages, [])
+        self.assertEqual(len(FakeSPARQLWrapper.queries), 3)
+
+
+class TestOntoQueries(unittest.TestCase):
+
+    def test_go_onto_query(self):
+        FakeSPARQLWrapper.pages = [[{'childLabel': {'value': 'two'},
+                                     'parentLabel': {'value': 'one'},
+                                     'childId': {'value': 'GO:2'},
+                                     'parentId': {'value': 'GO:1'}}]]
+        FakeSPARQLWrapper.queries = list()
+        with patch('ontosunburst.Inputs_generation.gen_onto_files.SPARQLWrapper',
+                   FakeSPARQLWrapper):
+            results = list(go_onto_query(ROOTS[GO_MF], 'http://endpoint/'))
+        self.assertEqual(len(results), 1)
+        self.assertIn('ORDER BY STR(?childId) STR(?parentId) STR(?childLabel) STR(?parentLabel)',
+                      FakeSPARQLWrapper.queries[0])
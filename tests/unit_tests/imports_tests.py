@@ -0,0 +1,66 @@
+import unittest
+import subprocess
+import sys
+import json
+
+"""
+Lazy imports : heavy dependencies (plotly, scipy, pandas) must only be loaded at first use, checked
+in sys.modules of a fresh interpreter.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+HEAVY_MODULES = ['plotly', 'scipy', 'pandas']
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def import_in_subprocess(statement):
+    """ Run an import statement in a fresh interpreter, returns the heavy modules loaded by the
+    import.
+    """
+    code = f"""
+import json, sys
+{statement}
+print(json.dumps([m for m in {HEAVY_MODULES} if m in sys.modules]))
+"""
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_import_package(self):
+        self.assertEqual(import_in_subprocess('import ontosunburst'), [])
+
+    def test_import_commands(self):
+        self.assertEqual(import_in_subprocess('import ontosunburst.commands'), [])
+
+    def test_topology_without_plotly_scipy(self):
+        res = import_in_subprocess(
+            'from ontosunburst.dag2tree import TreeData\n'
+            'from ontosunburst.tree2sunburst import generate_sunburst_svg\n'
+            'data = TreeData()\n'
+            'data.dag_to_tree({"r": 2, "a": 1, "b": 1}, {"r": 2, "a": 1, "b": 1}, '
+            '{"a": ["r"], "b": ["r"]}, "r")\n'
+            'data.calculate_proportions(False)\n'
+            'generate_sunburst_svg(data, "out", write_fig=False)')
+        self.assertEqual(res, [])
+
+    def test_enrichment_loads_scipy(self):
+        res = import_in_subprocess(
+            'from ontosunburst.dag2tree import TreeData\n'
+            'data = TreeData()\n'
+            'data.dag_to_tree({"r": 2, "a": 2}, {"r": 4, "a": 2, "b": 2}, '
+            '{"a": ["r"], "b": ["r"]}, "r")\n'
+            'data.calculate_proportions(True)\n'
+            'data.make_enrichment_analysis("binomial")')
+        self.assertEqual(res, ['scipy'])
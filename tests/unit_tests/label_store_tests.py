@@ -0,0 +1,162 @@
+import unittest
+import os
+import json
+import stat
+import pickle
+import tempfile
+from unittest.mock import patch
+
+from ontosunburst.label_store import *
+from ontosunburst.onto2dag import reduce_labels
+from ontosunburst.ontosunburst import ontosunburst, get_id_to_label_dict, get_file, EC, KEGG, \
+    LABELS_SUFFIX, CACHE_HOME_ENV, CACHE_DIR_NAME, DEFAULT_PATH
+
+"""
+Tests the compiled labels store.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+LABELS = {'GO:02': 'two', 'GO:10': 'ten', 'GO:01': 'one', 'CHEBI:9': 'rôle β', 'x': ''}
+OTHER_LABELS = {'GO:10': 'TEN', 'GO:11': 'eleven'}
+EC_LST = ['1.1.1.1', '1.1.1.2', '2.7.1.1', '3.1.1.1', '1.2.1.3']
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def write_json(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        json.dump(content, f)
+    return path
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestLabelStore(unittest.TestCase):
+
+    def test_mapping(self):
+        store = LabelStore(buffer=compile_labels(LABELS))
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store, LABELS)
+        self.assertEqual(store['CHEBI:9'], 'rôle β')
+        self.assertEqual(store['x'], '')
+        self.assertNotIn('GO:0', store)
+        self.assertNotIn('GO:010', store)
+        self.assertIsNone(store.get('GO:1000000000'))
+        with self.assertRaises(KeyError):
+            store['GO:03']
+
+    def test_get_labels(self):
+        store = LabelStore(buffer=compile_labels(LABELS))
+        self.assertEqual(store.get_labels(['GO:10', 'GO:03', 'GO:01', 'too long ID', 1]),
+                         {'GO:10': 'ten', 'GO:01': 'one'})
+        self.assertEqual(store.get_labels({'GO:02': 3.0}), {'GO:02': 'two'})
+        self.assertEqual(store.get_labels([]), dict())
+        self.assertEqual(LabelStore(buffer=compile_labels(dict())).get_labels(['GO:01']), dict())
+
+    def test_reduce_labels(self):
+        store = LabelStore(buffer=compile_labels(LABELS))
+        reduced = reduce_labels(store, {'GO:01': 2, 'GO:02': 1, 'GO:03': 1})
+        self.assertEqual(reduced, {'GO:01': 'one', 'GO:02': 'two'})
+        self.assertEqual(type(reduced), dict)
+
+    def test_pickle(self):
+        store = LabelStore(buffer=compile_labels(LABELS))
+        self.assertEqual(pickle.loads(pickle.dumps(store)), LABELS)
+
+
+class TestGetLabelStore(unittest.TestCase):
+
+    def test_compiled_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sources = [write_json(tmp, 'a.json', LABELS), write_json(tmp, 'b.json', OTHER_LABELS)]
+            blob_file = os.path.join(tmp, 'ab' + LABELS_BLOB_EXT)
+            store = get_label_store(sources, blob_file)
+            self.assertEqual(store, {**LABELS, **OTHER_LABELS})
+            self.assertEqual(store.path, blob_file)
+            mtime = os.stat(blob_file).st_mtime_ns
+            self.assertEqual(get_label_store(sources, blob_file), store)
+            self.assertEqual(os.stat(blob_file).st_mtime_ns, mtime)
+            self.assertEqual(pickle.loads(pickle.dumps(store))['GO:11'], 'eleven')
+
+    def test_source_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_json(tmp, 'a.json', LABELS)
+            blob_file = os.path.join(tmp, 'a' + LABELS_BLOB_EXT)
+            store = get_label_store([source], blob_file)
+            write_json(tmp, 'a.json', OTHER_LABELS)
+            os.utime(source, ns=(0, 0))
+            self.assertEqual(get_label_store([source], blob_file), OTHER_LABELS)
+            with self.assertRaises(ValueError):
+                pickle.loads(pickle.dumps(store))
+
+    def test_corrupted_blob(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_json(tmp, 'a.json', LABELS)
+            blob_file = os.path.join(tmp, 'a' + LABELS_BLOB_EXT)
+            with open(blob_file, 'wb') as f:
+                f.write(b'not a blob')
+            self.assertEqual(get_label_store([source], blob_file), LABELS)
+
+    def test_shared_blob_mode(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_json(tmp, 'a.json', LABELS)
+            blob_file = os.path.join(tmp, 'a' + LABELS_BLOB_EXT)
+            umask = os.umask(0o022)
+            try:
+                with patch('os.umask', side_effect=AssertionError('process umask changed')):
+                    get_label_store([source], os.path.join(tmp, 'cache', 'a' + LABELS_BLOB_EXT))
+                    get_label_store([source], blob_file)
+            finally:
+                os.umask(umask)
+            self.assertEqual(stat.S_IMODE(os.stat(blob_file).st_mode), 0o644)
+            self.assertEqual(sorted(os.listdir(tmp)), ['a.json', 'a' + LABELS_BLOB_EXT, 'cache'])
+
+    def test_blob_not_writable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_json(tmp, 'a.json', LABELS)
+            store = get_label_store([source], os.path.join(source, 'a' + LABELS_BLOB_EXT))
+            self.assertIsNone(store.path)
+            self.assertEqual(store, LABELS)
+
+    @unittest.skipIf(hasattr(os, 'geteuid') and os.geteuid() == 0, 'root reads all files')
+    def test_blob_not_readable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_json(tmp, 'a.json', LABELS)
+            blob_dir = os.path.join(tmp, 'shared')
+            os.mkdir(blob_dir)
+            blob_file = os.path.join(blob_dir, 'a' + LABELS_BLOB_EXT)
+            get_label_store([source], blob_file)
+            os.chmod(blob_file, 0)
+            os.chmod(blob_dir, 0o555)
+            try:
+                store = get_label_store([source], blob_file)
+            finally:
+                os.chmod(blob_dir, 0o755)
+            self.assertIsNone(store.path)
+            self.assertEqual(store, LABELS)
+
+    def test_default_ontology(self):
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, {CACHE_HOME_ENV: tmp}):
+            store = get_id_to_label_dict(None, True, EC)
+            self.assertIsInstance(store, LabelStore)
+            self.assertEqual(os.path.dirname(store.path), os.path.join(tmp, CACHE_DIR_NAME))
+            with open(get_file(EC, LABELS_SUFFIX), 'r') as f:
+                labels = json.load(f)
+            self.assertEqual(store, labels)
+            self.assertIsNone(get_id_to_label_dict(None, True, KEGG))
+            fig_store = ontosunburst(interest_set=EC_LST, ontology=EC, write_output=False)
+            fig_dict = ontosunburst(interest_set=EC_LST, ontology=EC, id_to_label_input=labels,
+                                    write_output=False)
+            self.assertEqual(fig_store.to_json(), fig_dict.to_json())
+            cache_dir = os.path.join(tmp, 'run_cache')
+            store = get_id_to_label_dict(None, True, EC, cache_dir)
+            self.assertEqual(os.path.dirname(store.path), cache_dir)
+        self.assertFalse(any(f.endswith(LABELS_BLOB_EXT) for f in os.listdir(DEFAULT_PATH)))
@@ -0,0 +1,204 @@
+import unittest
+import os
+import io
+import gzip
+import tempfile
+from contextlib import redirect_stdout
+
+from ontosunburst.Inputs_generation.obo_parser import *
+
+"""
+Tests the OBO / OWL releases parsing to generate ontology inputs without SPARQL server.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+OBO = """format-version: 1.2
+ontology: test
+
+[Term]
+id: T:1
+name: root
+
+[Term]
+id: T:2
+name: two
+is_a: T:1 ! root
+
+[Term]
+id: T:3
+name: three
+is_a: T:2 ! two
+is_a: T:1 ! root
+
+[Term]
+id: T:4
+name: four
+is_a: T:3 ! three
+
+[Term]
+id: T:5
+name: obsolete five
+is_a: T:1 ! root
+is_obsolete: true
+
+[Term]
+id: T:6
+name: chemical
+is_a: T:9 ! other
+relationship: has_role T:4 ! four
+relationship: has_role T:3 ! three
+
+[Term]
+id: T:9
+name: other
+
+[Typedef]
+id: has_role
+name: has role
+"""
+
+OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns="http://purl.obolibrary.org/obo/test.owl#"
+     xmlns:obo="http://purl.obolibrary.org/obo/"
+     xmlns:owl="http://www.w3.org/2002/07/owl#"
+     xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+     xmlns:oboInOwl="http://www.geneontology.org/formats/oboInOwl#">
+    <owl:Ontology rdf:about="http://purl.obolibrary.org/obo/test.owl"/>
+    <owl:ObjectProperty rdf:about="http://purl.obolibrary.org/obo/RO_0000087">
+        <rdfs:label>has role</rdfs:label>
+    </owl:ObjectProperty>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_1">
+        <oboInOwl:id>T:1</oboInOwl:id>
+        <rdfs:label>root</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_2">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/T_1"/>
+        <rdfs:label>two</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_3">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/T_2"/>
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/T_1"/>
+        <rdfs:label>three</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_4">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/T_3"/>
+        <rdfs:label>four</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_5">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/T_1"/>
+        <rdfs:label>obsolete five</rdfs:label>
+        <owl:deprecated>true</owl:deprecated>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_6">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/T_9"/>
+        <rdfs:subClassOf>
+            <owl:Restriction>
+                <owl:onProperty rdf:resource="http://purl.obolibrary.org/obo/RO_0000087"/>
+                <owl:someValuesFrom rdf:resource="http://purl.obolibrary.org/obo/T_4"/>
+            </owl:Restriction>
+        </rdfs:subClassOf>
+        <rdfs:subClassOf>
+            <owl:Restriction>
+                <owl:onProperty rdf:resource="http://purl.obolibrary.org/obo/RO_0000087"/>
+                <owl:someValuesFrom rdf:resource="http://purl.obolibrary.org/obo/T_3"/>
+            </owl:Restriction>
+        </rdfs:subClassOf>
+        <rdfs:label>chemical</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/T_9">
+        <rdfs:label>other</rdfs:label>
+    </owl:Class>
+    <owl:Axiom>
+        <owl:annotatedSource rdf:resource="http://purl.obolibrary.org/obo/T_2"/>
+    </owl:Axiom>
+</rdf:RDF>
+"""
+
+TERMS_IDS = ['T:1', 'T:2', 'T:3', 'T:4', 'T:6', 'T:9']
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def write_release(directory, name, content):
+    path = os.path.join(directory, name)
+    if name.endswith('.gz'):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(content)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    return path
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestReadTerms(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_obo_terms(self):
+        terms = read_terms(write_release(self.tmp.name, 'test.obo', OBO))
+        self.assertEqual(list(terms), TERMS_IDS)
+        self.assertEqual(terms['T:3'], {ID: 'T:3', NAME: 'three', IS_A: ['T:2', 'T:1'],
+                                        HAS_ROLE: [], OBSOLETE: False})
+        self.assertEqual(terms['T:6'][HAS_ROLE], ['T:4', 'T:3'])
+        self.assertEqual(terms['T:9'][IS_A], [])
+
+    def test_read_owl_terms(self):
+        obo_terms = read_terms(write_release(self.tmp.name, 'test.obo', OBO))
+        owl_terms = read_terms(write_release(self.tmp.name, 'test.owl', OWL))
+        self.assertEqual(owl_terms, obo_terms)
+
+    def test_read_gzip_terms(self):
+        obo_terms = read_terms(write_release(self.tmp.name, 'test.obo', OBO))
+        for name, content in [('test.obo.gz', OBO), ('test.owl.gz', OWL)]:
+            with self.subTest(name=name):
+                self.assertEqual(read_terms(write_release(self.tmp.name, name, content)),
+                                 obo_terms)
+
+    def test_get_iri_id(self):
+        self.assertEqual(get_iri_id('http://purl.obolibrary.org/obo/GO_0008150'), 'GO:0008150')
+        self.assertEqual(get_iri_id('http://purl.obolibrary.org/obo/CHEBI_50906'), 'CHEBI:50906')
+
+
+class TestExtractOntology(unittest.TestCase):
+
+    def setUp(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.terms = read_terms(write_release(tmp, 'test.obo', OBO))
+
+    def test_get_descendants(self):
+        self.assertEqual(get_descendants(self.terms, 'T:1'), ['T:1', 'T:2', 'T:3', 'T:4'])
+        self.assertEqual(get_descendants(self.terms, 'T:3'), ['T:3', 'T:4'])
+        self.assertEqual(get_descendants(self.terms, 'T:0'), [])
+
+    def test_extract_ontology(self):
+        d_ontology, d_labels = extract_ontology(self.terms, 'T:1')
+        self.assertEqual(d_ontology, {'T:2': ['T:1'], 'T:3': ['T:2', 'T:1'], 'T:4': ['T:3']})
+        self.assertEqual(d_labels, {'T:1': 'root', 'T:2': 'two', 'T:3': 'three', 'T:4': 'four'})
+
+    def test_extract_roles_ontology(self):
+        with redirect_stdout(io.StringIO()) as out:
+            d_ontology, d_labels = extract_roles_ontology(self.terms, 'T:2')
+        self.assertEqual(d_ontology, {'T:2': ['T:1'], 'T:3': ['T:2', 'T:1'], 'T:4': ['T:3'],
+                                      'T:6': ['T:3', 'T:2', 'T:1']})
+        self.assertEqual(d_labels, {'T:1': 'root', 'T:2': 'two', 'T:3': 'three', 'T:4': 'four',
+                                    'T:6': 'chemical'})
+        self.assertEqual(out.getvalue(), '')
+        with redirect_stdout(io.StringIO()) as out:
+            d_ontology, d_labels = extract_roles_ontology(self.terms, 'T:4')
+        self.assertEqual(d_ontology, {'T:4': ['T:3'], 'T:6': ['T:3', 'T:2', 'T:1']})
+        self.assertEqual(out.getvalue(), 'Role two not in the ontology.\n'
+                                         'Role root not in the ontology.\n')
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch
 import io
 import sys
+import pickle
 from functools import wraps
 from ontosunburst.onto2dag import *
 
@@ -113,6 +114,22 @@ class TestReduceDAG(unittest.TestCase):
                               'c': {'cdeeg+', 'cde', 'cdeeg', 'root', 'cdecf', 'cf'}}
         self.assertEqual(all_classes_met, wanted_all_classes)
 
+    @test_for(get_ancestors)
+    def test_get_ancestors(self):
+        ancestors = dict()
+        parents = get_ancestors('c', ONTO_DAG, ROOT, ancestors)
+        self.assertEqual(parents, {'cdeeg+', 'root', 'cf', 'cde', 'cdecf', 'cdeeg'})
+        self.assertEqual(ancestors['cde'], {'cdeeg+', 'root', 'cdecf', 'cdeeg'})
+        self.assertIs(get_ancestors('c', ONTO_DAG, ROOT, ancestors), parents)
+
+    @test_for(get_all_classes)
+    def test_get_all_classes_ancestors(self):
+        leaf_classes = {'a': ['ab'], 'b': ['ab'], 'c': ['cde', 'cf'], 'e': ['cde', 'eg']}
+        ancestors = dict()
+        self.assertEqual(get_all_classes(leaf_classes, ONTO_DAG, ROOT, ancestors),
+                         get_all_classes(leaf_classes, ONTO_DAG, ROOT))
+        self.assertEqual(set(ancestors), {'ab', 'cde', 'cf', 'eg', 'cdecf', 'cdeeg', 'cdeeg+'})
+
 
 # TESTS WEIGHTS CALCULATION
 # --------------------------------------------------------------------------------------------------
@@ -233,6 +250,34 @@ class TestMainFunctions(unittest.TestCase):
                                      'cdecf': 'CDECF', 'cde': 'CDE', 'cf': 'CF', 'ab': 'AB'}
         self.assertEqual(d_ontology_reduced, wanted_d_ontology_reduced)
 
+    @test_for(reduce_d_ontology)
+    def test_reduce_d_ontology_index(self):
+        classes_abundance = {'root': 6, 'cdeeg': 3, 'cde': 3, 'ab': 3, 'cdeeg+': 3, 'cf': 3,
+                             'cdecf': 3}
+        d_ontology_reduced = reduce_d_ontology(ONTO_DAG, classes_abundance,
+                                               OntologyIndex(ONTO_DAG))
+        self.assertIsInstance(d_ontology_reduced, SubDag)
+        self.assertEqual(list(d_ontology_reduced),
+                         list(reduce_d_ontology(ONTO_DAG, classes_abundance)))
+        self.assertEqual(list(d_ontology_reduced), ['ab', 'cde', 'cf', 'cdecf', 'cdeeg', 'cdeeg+'])
+        self.assertIs(d_ontology_reduced['cde'], ONTO_DAG['cde'])
+        self.assertNotIn('a', d_ontology_reduced)
+        with self.assertRaises(KeyError):
+            d_ontology_reduced['a']
+        unpickled = pickle.loads(pickle.dumps(d_ontology_reduced))
+        self.assertEqual(type(unpickled), dict)
+        self.assertEqual(list(unpickled.items()), list(d_ontology_reduced.items()))
+
+    @test_for(reduce_labels)
+    def test_reduce_labels(self):
+        classes_abundance = {'root': 6, 'cde': 3, 'cf': 3, 'cdecf': 3, 'cdeeg+': 3, 'cdeeg': 3,
+                             'ab': 3, 'unknown': 1}
+        labels_reduced = reduce_labels(ID2LAB, classes_abundance)
+        wanted_labels_reduced = {'root': 'Root', 'cdeeg+': 'CDEEG+', 'cdeeg': 'CDEEG',
+                                 'cdecf': 'CDECF', 'cde': 'CDE', 'cf': 'CF', 'ab': 'AB'}
+        self.assertEqual(labels_reduced, wanted_labels_reduced)
+        self.assertIsNone(reduce_labels(None, classes_abundance))
+
     @test_for(ontology_to_weighted_dag)
     def test_ontology_to_weighted_dag_no_lvs(self):
         calculated_weights = ontology_to_weighted_dag(CPT_LST, CPT_AB, ROOT, ONTO_DAG, False)
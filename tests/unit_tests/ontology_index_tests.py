@@ -0,0 +1,165 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+
+from unittest.mock import patch
+
+from ontosunburst.ontology_index import *
+from ontosunburst.ontosunburst import ontosunburst, get_ontology_dag_dict, EC, ROOTS
+from ontosunburst.ontology_store import clear_loaded_ontologies, LOADED_ONTOLOGIES
+from ontosunburst.onto2dag import ontology_to_weighted_dag, get_ancestors, reduce_d_ontology
+from ontosunburst.dag2tree import TreeData, get_children_dict
+
+"""
+Tests the ontology index : interned classes, ancestors and weights on integers arrays.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+ROOT = 'root'
+ONTO_DAG = {'a': ['ab'], 'b': ['ab'], 'c': ['cde', 'cf'], 'd': ['cde'], 'e': ['cde', 'eg'],
+            'f': ['cf'], 'g': ['gh', 'eg'], 'h': ['gh'],
+            'ab': [ROOT], 'cde': ['cdecf', 'cdeeg'], 'cf': ['cdecf'],
+            'eg': [ROOT, 'cdeeg'], 'gh': [ROOT],
+            'cdecf': [ROOT], 'cdeeg': ['cdeeg+'], 'cdeeg+': [ROOT]}
+CPT_LST = ['a', 'b', 'c', 'g', 'cde', 'unknown', 'c']
+CPT_AB = [1, 2, 3, 4, 5, 6, 7]
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def get_weights(abundances, show_leaves, **params):
+    with redirect_stdout(io.StringIO()):
+        return ontology_to_weighted_dag(CPT_LST, abundances, ROOT, ONTO_DAG, show_leaves,
+                                        **params)
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestOntologyIndex(unittest.TestCase):
+
+    def test_interned_ids(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        self.assertEqual(len(index), 16)
+        self.assertEqual(index.ids[:16], list(ONTO_DAG))
+        self.assertEqual(index.ids[16:], [ROOT])
+        self.assertEqual(index.positions['cdeeg'], 14)
+        self.assertEqual([index.ids[i] for i in index.get_parents(index.positions['e'])],
+                         ['cde', 'eg'])
+        self.assertEqual(len(index.get_parents(index.positions[ROOT])), 0)
+
+    def test_get_closure(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        for c in ONTO_DAG:
+            with self.subTest(c=c):
+                closure = {index.ids[i] for i in index.get_closure(index.positions[c])}
+                self.assertEqual(closure, get_ancestors(c, ONTO_DAG, ROOT, dict()))
+
+    def test_missing_parent(self):
+        index = OntologyIndex({'a': ['b'], 'b': ['missing'], 'c': [ROOT]}, ROOT)
+        with self.assertRaises(KeyError):
+            index.get_closure(index.positions['a'])
+        self.assertEqual(index.precompute_closures(), 1)
+
+    def test_get_weights(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        for abundances in [CPT_AB, [a / 3 for a in CPT_AB], None]:
+            for show_leaves in [False, True]:
+                with self.subTest(abundances=abundances, show_leaves=show_leaves):
+                    weights = get_weights(abundances, show_leaves, index=index)
+                    wanted = get_weights(abundances, show_leaves)
+                    self.assertEqual(weights, wanted)
+                    self.assertEqual(list(weights.values()), list(wanted.values()))
+                    self.assertEqual({type(w) for w in weights.values()},
+                                     {type(w) for w in wanted.values()})
+
+    def test_get_weights_other_root(self):
+        index = OntologyIndex(ONTO_DAG, 'cdeeg+')
+        self.assertEqual(get_weights(CPT_AB, False, index=index), get_weights(CPT_AB, False))
+
+
+class TestChildrenIndex(unittest.TestCase):
+
+    def test_build_children(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        index.build_children()
+        indptr, indices = index.children_indptr, index.children_indices
+        i = index.positions['cde']
+        self.assertEqual([index.ids[c] for c in indices[indptr[i]:indptr[i + 1]]],
+                         ['c', 'd', 'e'])
+        self.assertEqual(indptr[-1], len(index.parents_indices))
+        index.build_children()
+        self.assertIs(index.children_indptr, indptr)
+
+    def test_get_children_dict(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        children_dict = index.get_children_dict()
+        self.assertIs(index.get_children_dict(), children_dict)
+        wanted = get_children_dict(ONTO_DAG)
+        self.assertEqual({c: ch for c, ch in children_dict.items() if c in wanted}, wanted)
+        self.assertEqual(children_dict['a'], [])
+
+    def test_dag_to_tree(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        for show_leaves in [True, False]:
+            abundances = get_weights(CPT_AB, show_leaves)
+            ref_abundances = get_weights([1] * len(CPT_AB), show_leaves)
+            for dag in [ONTO_DAG, reduce_d_ontology(ONTO_DAG, abundances, index)]:
+                with self.subTest(show_leaves=show_leaves, reduced=dag is not ONTO_DAG):
+                    trees = list()
+                    for ref_base in [True, False]:
+                        for i in [None, index]:
+                            tree_data = TreeData()
+                            tree_data.dag_to_tree(abundances, ref_abundances, dag, ROOT,
+                                                  ref_base=ref_base, index=i)
+                            trees.append((tree_data.ids, tree_data.onto_ids, tree_data.parents,
+                                          tree_data.count, tree_data.ref_count))
+                    self.assertEqual(trees[0], trees[1])
+                    self.assertEqual(trees[2], trees[3])
+
+
+class TestAncestorsView(unittest.TestCase):
+
+    def test_view(self):
+        index = OntologyIndex(ONTO_DAG, ROOT)
+        ancestors = AncestorsView(index)
+        self.assertEqual(len(ancestors), 0)
+        get_weights(CPT_AB, False, index=index)
+        self.assertIn('cde', ancestors)
+        self.assertIn('a', ancestors)
+        self.assertNotIn('d', ancestors)
+        self.assertNotIn(ROOT, ancestors)
+        self.assertEqual(ancestors['cde'], {'cdecf', 'cdeeg', 'cdeeg+', ROOT})
+        index.precompute_closures()
+        self.assertEqual(len(ancestors), 16)
+        self.assertEqual(dict(ancestors), {c: get_ancestors(c, ONTO_DAG, ROOT, dict())
+                                           for c in ONTO_DAG})
+
+
+class TestDefaultOntologyIndex(unittest.TestCase):
+
+    def test_ontosunburst_reuses_index(self):
+        clear_loaded_ontologies()
+        interest_set = ['1.1.1.1', '1.1.1.2', '2.7.1.1', '3.1.1.1']
+        with patch.object(OntologyIndex, 'get_weights', autospec=True,
+                          side_effect=OntologyIndex.get_weights) as spy, \
+                redirect_stdout(io.StringIO()):
+            figs = list()
+            for _ in range(2):
+                figs.append(ontosunburst(interest_set=interest_set, ontology=EC, labels=False,
+                                         write_output=False))
+                self.assertEqual(len(LOADED_ONTOLOGIES), 1)
+            self.assertEqual(spy.call_count, 2)
+            fig_dict = ontosunburst(interest_set=interest_set,
+                                    ontology_dag_input=get_ontology_dag_dict(EC, None),
+                                    input_root=ROOTS[EC], labels=False, write_output=False)
+            self.assertEqual(spy.call_count, 2)
+        self.assertEqual(figs[0].to_json(), figs[1].to_json())
+        self.assertEqual(figs[0].to_json(), fig_dict.to_json())
+        clear_loaded_ontologies()
@@ -1,5 +1,8 @@
 import unittest
 import io
+import stat
+import tempfile
+from unittest.mock import patch
 from functools import wraps
 
 from ontosunburst.ontosunburst import *
@@ -551,3 +554,79 @@ class TestOntosunburstGO(unittest.TestCase):
         # save_fig_json(fig, w_fig_file)
         self.assertTrue(are_fig_dict_equals(fig, w_fig_file))
 
+    def test_go_classes_file(self):
+        with tempfile.TemporaryDirectory() as inputs_dir, \
+                tempfile.TemporaryDirectory() as cache_dir, \
+                patch('ontosunburst.ontosunburst.DEFAULT_PATH', inputs_dir):
+            # Not written without cache directory : aggregated in memory
+            self.assertIsNone(get_go_classes_file())
+            self.assertEqual(get_ontology_dag_dict(GO, None),
+                             aggregate_go_ontologies(CLASSES_SUFFIX))
+            umask = os.umask(0o022)
+            try:
+                go_file = get_go_classes_file(cache_dir)
+            finally:
+                os.umask(umask)
+            self.assertEqual(go_file, os.path.join(cache_dir, 'go__06feb25__classes.json'))
+            self.assertEqual(stat.S_IMODE(os.stat(go_file).st_mode), 0o644)
+            with open(go_file, 'r') as f:
+                self.assertEqual(json.load(f), aggregate_go_ontologies(CLASSES_SUFFIX))
+            self.assertEqual(get_ontology_dag_dict(GO, None, cache_dir),
+                             aggregate_go_ontologies(CLASSES_SUFFIX))
+            mtime = os.stat(go_file).st_mtime_ns
+            self.assertEqual(get_go_classes_file(cache_dir), go_file)
+            self.assertEqual(os.stat(go_file).st_mtime_ns, mtime)
+            # Older than the sub-ontologies files : written again
+            os.utime(go_file, ns=(0, 0))
+            self.assertEqual(get_go_classes_file(cache_dir), go_file)
+            self.assertGreater(os.stat(go_file).st_mtime_ns, 0)
+            # Cache directory not writable : aggregated in memory
+            os.utime(go_file, ns=(0, 0))
+            self.assertIsNone(get_go_classes_file(os.path.join(go_file, 'not_a_dir')))
+            # Up to date file of the Inputs directory used without cache directory
+            os.replace(go_file, os.path.join(inputs_dir, os.path.basename(go_file)))
+            os.utime(os.path.join(inputs_dir, os.path.basename(go_file)))
+            self.assertEqual(get_go_classes_file(),
+                             os.path.join(inputs_dir, os.path.basename(go_file)))
+
+
+class TestOntosunburstSvg(unittest.TestCase):
+
+    def test_ontosunburst_svg(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'svg')
+            svg = ontosunburst(interest_set=C_LST, abundances=C_LAB, reference_set=C_REF,
+                               ref_abundances=C_RAB, analysis=ENRICHMENT_A,
+                               ontology_dag_input=C_ONTO, id_to_label_input=C_LABELS,
+                               input_root=ROOT, output=output, output_format=SVG_F)
+            self.assertEqual(os.listdir(tmp_dir), ['svg.svg'])
+            with open(f'{output}.svg', 'r') as f:
+                self.assertEqual(f.read(), svg)
+        self.assertTrue(svg.startswith('<svg '))
+        self.assertTrue(svg.endswith('</svg>'))
+
+    def test_ontosunburst_wrong_format(self):
+        with self.assertRaises(ValueError):
+            ontosunburst(interest_set=C_LST, ontology_dag_input=C_ONTO, input_root=ROOT,
+                         write_output=False, output_format='png')
+
+
+class TestOntosunburstSweep(unittest.TestCase):
+
+    def test_ontosunburst_sweep(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'sweep')
+            figs = ontosunburst_sweep(interest_set=C_LST, abundances=C_LAB, reference_set=C_REF,
+                                      ref_abundances=C_RAB, analysis=ENRICHMENT_A,
+                                      ontology_dag_input=C_ONTO, id_to_label_input=C_LABELS,
+                                      input_root=ROOT, output=output)
+            self.assertEqual(len(figs), len(ROOT_CUTS) * len(PATH_CUTS))
+            self.assertEqual(len(os.listdir(tmp_dir)), len(figs))
+        for (root_cut, path_cut), sweep_fig in figs.items():
+            with self.subTest(root_cut=root_cut, path_cut=path_cut):
+                fig = ontosunburst(interest_set=C_LST, abundances=C_LAB, reference_set=C_REF,
+                                   ref_abundances=C_RAB, analysis=ENRICHMENT_A,
+                                   ontology_dag_input=C_ONTO, id_to_label_input=C_LABELS,
+                                   input_root=ROOT, root_cut=root_cut, path_cut=path_cut,
+                                   write_output=False)
+                self.assertEqual(sweep_fig.to_dict()['data'], fig.to_dict()['data'])
@@ -0,0 +1,144 @@
+import unittest
+import json
+import os
+import tempfile
+import tracemalloc
+
+from ontosunburst.profiling import *
+from ontosunburst.ontosunburst import ontosunburst, ENRICHMENT_A, TOPOLOGY_A
+
+"""
+Tests pipeline per-stage profiling.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+E_LST = ['02', '03', '04', '05', '08', '09']
+E_LAB = [23, 20, 1, 4, 1, 1]
+E_REF = ['01', '02', '03', '04', '05', '06', '07', '08', '09']
+E_RAB = [14, 26, 20, 10, 20, 5, 1, 1, 3]
+E_ONTO = {'01': ['00'], '02': ['00'], '03': ['00'], '04': ['00'], '05': ['01'],
+          '06': ['01'], '07': ['01'], '08': ['02'], '09': ['02']}
+E_LABElS = {'00': '0', '01': '1', '02': '2', '03': '3', '04': '4',
+            '05': '5', '06': '6', '07': '7', '08': '8', '09': '9'}
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestPipelineProfile(unittest.TestCase):
+
+    def test_stage_report(self):
+        profile = PipelineProfile()
+        profile.on_stage_start(WEIGHT_S, concepts=3)
+        lst = [str(i) for i in range(10000)]
+        profile.on_stage_end(WEIGHT_S, classes=len(lst))
+        profile.stop()
+        self.assertEqual(len(profile.stages), 1)
+        stage = profile.stages[0]
+        self.assertEqual(stage[STAGE], WEIGHT_S)
+        self.assertEqual(stage[COUNTS], {'concepts': 3, 'classes': 10000})
+        self.assertGreater(stage[TIME], 0)
+        self.assertGreater(stage[PEAK_MEMORY], 10000 * 40)
+        self.assertEqual(profile.total_time(), stage[TIME])
+
+    def test_concurrent_profiles(self):
+        first, second = PipelineProfile(), PipelineProfile()
+        first.on_stage_start(WEIGHT_S)
+        second.on_stage_start(WEIGHT_S)
+        first.on_stage_end(WEIGHT_S)
+        second.on_stage_end(WEIGHT_S)
+        second.stop()
+        self.assertTrue(tracemalloc.is_tracing())
+        first.on_stage_start(TREE_S)
+        first.on_stage_end(TREE_S)
+        first.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIsNone(first.stages[0][PEAK_MEMORY])
+        self.assertIsNone(second.stages[0][PEAK_MEMORY])
+        self.assertIsNotNone(first.stages[1][PEAK_MEMORY])
+
+    def test_stage_report_no_memory(self):
+        profile = PipelineProfile(trace_memory=False)
+        profile.on_stage_start(TREE_S)
+        profile.on_stage_end(TREE_S, sectors=2)
+        self.assertIsNone(profile.stages[0][PEAK_MEMORY])
+        self.assertIn('tree', str(profile))
+
+    def test_ontosunburst_profile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'profile')
+            fig, profile = ontosunburst(interest_set=E_LST, input_root='00', abundances=E_LAB,
+                                        reference_set=E_REF, ref_abundances=E_RAB,
+                                        analysis=ENRICHMENT_A, output=output,
+                                        ontology_dag_input=E_ONTO, id_to_label_input=E_LABElS,
+                                        profile=True)
+            with open(f'{output}_profile.json', 'r') as f:
+                report = json.load(f)
+        stages = [s[STAGE] for s in profile.stages]
+        self.assertEqual(stages, STAGES)
+        self.assertEqual([s[STAGE] for s in report['stages']], STAGES)
+        counts = {s[STAGE]: s[COUNTS] for s in profile.stages}
+        self.assertEqual(counts[LOAD_S], {'classes': 9, 'labels': 10})
+        self.assertEqual(counts[WEIGHT_S]['classified'], 6)
+        self.assertEqual(counts[TREE_S], {'sectors': 3})
+        self.assertEqual(counts[ROOT_CUT_S], {'sectors': 3, 'cut_sectors': 2})
+
+    def test_ontosunburst_profile_failure(self):
+        with self.assertRaises(ValueError):
+            ontosunburst(interest_set=E_LST, input_root='00', ontology_dag_input=1,
+                         write_output=False, profile=True)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_ontosunburst_no_profile(self):
+        fig = ontosunburst(interest_set=E_LST, input_root='00', abundances=E_LAB,
+                           analysis=TOPOLOGY_A, write_output=False, ontology_dag_input=E_ONTO,
+                           id_to_label_input=E_LABElS)
+        self.assertNotIsInstance(fig, tuple)
+
+
+class StagesRecorder(StageObserver):
+    def __init__(self):
+        self.calls = list()
+
+    def on_stage_start(self, stage, **counts):
+        self.calls.append(('start', stage, counts))
+
+    def on_stage_end(self, stage, **counts):
+        self.calls.append(('end', stage, counts))
+
+
+class TestStageObserver(unittest.TestCase):
+
+    def test_ontosunburst_observer(self):
+        recorder = StagesRecorder()
+        ontosunburst(interest_set=E_LST, input_root='00', abundances=E_LAB, reference_set=E_REF,
+                     ref_abundances=E_RAB, analysis=ENRICHMENT_A, write_output=False,
+                     ontology_dag_input=E_ONTO, id_to_label_input=E_LABElS, observer=recorder)
+        starts = [c[1] for c in recorder.calls if c[0] == 'start']
+        ends = [c[1] for c in recorder.calls if c[0] == 'end']
+        self.assertEqual(starts, STAGES[:-1])
+        self.assertEqual(ends, STAGES[:-1])
+        self.assertIn(('end', TREE_S, {'sectors': 3}), recorder.calls)
+
+    def test_ontosunburst_observer_and_profile(self):
+        recorder = StagesRecorder()
+        fig, profile = ontosunburst(interest_set=E_LST, input_root='00', abundances=E_LAB,
+                                    analysis=TOPOLOGY_A, write_output=False,
+                                    ontology_dag_input=E_ONTO, id_to_label_input=E_LABElS,
+                                    observer=recorder, profile=True)
+        stages = [s for s in STAGES if s not in {ENRICHMENT_S, WRITE_S}]
+        self.assertEqual([s[STAGE] for s in profile.stages], stages)
+        self.assertEqual([c[1] for c in recorder.calls if c[0] == 'end'], stages)
+
+    def test_merge_observers(self):
+        recorder = StagesRecorder()
+        self.assertIsNone(merge_observers(None, None))
+        self.assertIs(merge_observers(None, recorder), recorder)
+        group = merge_observers(recorder, StageObserver())
+        self.assertIsInstance(group, ObserverGroup)
+        group.on_stage_start(LOAD_S, classes=2)
+        self.assertEqual(recorder.calls, [('start', LOAD_S, {'classes': 2})])
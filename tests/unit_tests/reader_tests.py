@@ -0,0 +1,187 @@
+import unittest
+import io
+import os
+import json
+import sys
+import gzip
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from ontosunburst.reader import *
+from ontosunburst.ontosunburst import ontosunburst, ENRICHMENT_A
+
+"""
+Tests input TSV files reading.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+INPUT = 'a\t1\t0.5\n' \
+        'b\t2\t0.1\t3\n' \
+        '\n' \
+        'c\tx\n' \
+        'd\t3\n' \
+        '\t4\n' \
+        'e\t1\ty\n' \
+        'a\t5\n' \
+        'f\n' \
+        'd\t1\t0.01\n'
+MALFORMED = [(2, FIELDS_ERR), (4, ABUNDANCE_ERR), (6, ID_ERR), (7, SCORE_ERR)]
+IDS = ['a', 'd', 'f']
+
+E_LST = ['02', '03', '04', '05', '08', '09']
+E_LAB = [23, 20, 1, 4, 1, 1]
+E_REF = ['01', '02', '03', '04', '05', '06', '07', '08', '09']
+E_RAB = [14, 26, 20, 10, 20, 5, 1, 1, 3]
+E_ONTO = {'01': ['00'], '02': ['00'], '03': ['00'], '04': ['00'], '05': ['01'],
+          '06': ['01'], '07': ['01'], '08': ['02'], '09': ['02']}
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def write_input(directory, content, compress=False):
+    path = os.path.join(directory, 'input.tsv.gz' if compress else 'input.tsv')
+    with (gzip.open(path, 'wt') if compress else open(path, 'w')) as f:
+        f.write(content)
+    return path
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestReadInput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_file = write_input(self.tmp_dir.name, INPUT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_input_merge(self):
+        expected = {MERGE_FIRST: ([1, 3, 1], [0.5, 0.01, np.nan]),
+                    MERGE_LAST: ([5, 1, 1], [0.5, 0.01, np.nan]),
+                    MERGE_SUM: ([6, 4, 1], [0.5, 0.01, np.nan]),
+                    MERGE_MAX: ([5, 3, 1], [0.5, 0.01, np.nan])}
+        for merge, (abundances, scores) in expected.items():
+            with self.subTest(merge=merge):
+                input_set = read_input(self.input_file, merge)
+                self.assertEqual(input_set.ids.tolist(), IDS)
+                np.testing.assert_array_equal(input_set.abundances, abundances)
+                np.testing.assert_array_equal(input_set.scores, scores)
+                self.assertEqual(input_set.malformed, MALFORMED)
+                self.assertEqual(input_set.duplicates, 2)
+        with self.assertRaises(ValueError):
+            read_input(self.input_file, 'mean')
+
+    def test_read_input_na_tokens(self):
+        content = 'NA\t2\nnull\nN/A \t 3 \t 0.1\r\n  b  \nc\tnan\nd\t1\tNaN\n'
+        for extra in ['', 'e\t1\t2\t3\n']:  # Without and with the fields split fallback
+            with self.subTest(fallback=bool(extra)):
+                input_set = read_input(write_input(self.tmp_dir.name, content + extra))
+                self.assertEqual(input_set.ids.tolist(), ['NA', 'null', 'N/A', 'b'])
+                np.testing.assert_array_equal(input_set.abundances, [2, 1, 3, 1])
+                np.testing.assert_array_equal(input_set.scores, [np.nan, np.nan, 0.1, np.nan])
+                self.assertEqual(input_set.malformed[:2], [(5, ABUNDANCE_ERR), (6, SCORE_ERR)])
+
+    def test_read_input_chunks(self):
+        for chunk_lines in [1, 3, 4]:
+            with self.subTest(chunk_lines=chunk_lines):
+                input_set = read_input(self.input_file, chunk_lines=chunk_lines)
+                self.assertEqual(input_set.ids.tolist(), IDS)
+                np.testing.assert_array_equal(input_set.abundances, [5, 1, 1])
+                self.assertEqual(input_set.malformed, MALFORMED)
+
+    def test_read_input_gzip(self):
+        input_set = read_input(write_input(self.tmp_dir.name, INPUT, compress=True))
+        self.assertEqual(input_set.ids.tolist(), IDS)
+        self.assertEqual(input_set.malformed, MALFORMED)
+
+    def test_read_input_stdin(self):
+        for content in [INPUT.encode(), gzip.compress(INPUT.encode())]:
+            with patch.object(sys, 'stdin', io.TextIOWrapper(io.BytesIO(content))):
+                self.assertEqual(read_input(STDIN_INPUT).ids.tolist(), IDS)
+
+    def test_read_input_empty(self):
+        input_set = read_input(write_input(self.tmp_dir.name, ''))
+        self.assertEqual(len(input_set), 0)
+        self.assertIsNone(input_set.get_scores_dict())
+
+    def test_get_report(self):
+        input_set = read_input(self.input_file)
+        self.assertEqual(input_set.get_report('in'),
+                         f'in:2: {FIELDS_ERR} (line skipped)\n'
+                         f'in:4: {ABUNDANCE_ERR} (line skipped)\n'
+                         f'in:6: {ID_ERR} (line skipped)\n'
+                         f'in:7: {SCORE_ERR} (line skipped)\n'
+                         f'in: 2 duplicated IDs lines merged')
+
+    def test_extract_input(self):
+        with patch('sys.stderr', new_callable=io.StringIO):
+            ids, abundances, scores = extract_input(self.input_file)
+        self.assertEqual(ids, IDS)
+        self.assertEqual(abundances, [5.0, 1.0, 1.0])
+        self.assertEqual(scores, {'a': 0.5, 'd': 0.01})
+        self.assertEqual(extract_input(write_input(self.tmp_dir.name, 'a\nb\t2\n')),
+                         (['a', 'b'], [1.0, 2.0], None))
+        with patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(ValueError):
+                extract_input(write_input(self.tmp_dir.name, 'a\tx\n'))
+
+
+class TestGetInputSet(unittest.TestCase):
+
+    def test_get_input_set_arrays(self):
+        abundances = np.array([1., 2., 3.])
+        input_set = get_input_set(np.array(['a', 'b', 'a']), abundances)
+        self.assertEqual(input_set.ids.tolist(), ['a', 'b', 'a'])
+        self.assertIs(input_set.abundances, abundances)
+        input_set = get_input_set(['a', 'b', 'a'], [1, 2, 3], merge=MERGE_SUM)
+        self.assertEqual(input_set.ids.tolist(), ['a', 'b'])
+        np.testing.assert_array_equal(input_set.abundances, [4, 2])
+        self.assertEqual(input_set.duplicates, 1)
+        np.testing.assert_array_equal(get_input_set(['a', 'b']).abundances, [1, 1])
+        with self.assertRaises(AttributeError):
+            get_input_set(['a', 'b'], [1])
+
+    def test_get_input_set_pandas(self):
+        df = pd.DataFrame({'id': ['a', 'b'], 'abundance': [2, 3], 'score': [0.1, np.nan]})
+        input_set = get_input_set(df)
+        self.assertEqual(input_set.ids.tolist(), ['a', 'b'])
+        np.testing.assert_array_equal(input_set.abundances, [2, 3])
+        self.assertEqual(input_set.get_scores_dict(), {'a': 0.1})
+        input_set = get_input_set(df.set_index('id')[['abundance']])
+        self.assertEqual(input_set.ids.tolist(), ['a', 'b'])
+        np.testing.assert_array_equal(input_set.abundances, [2, 3])
+        input_set = get_input_set(pd.Series([2., 3.], index=['a', 'b']))
+        self.assertEqual(input_set.ids.tolist(), ['a', 'b'])
+        np.testing.assert_array_equal(input_set.abundances, [2, 3])
+        input_set = get_input_set(pd.Series(['a', 'b']), pd.Series([2, 3]))
+        self.assertEqual(input_set.ids.tolist(), ['a', 'b'])
+        np.testing.assert_array_equal(input_set.abundances, [2, 3])
+        self.assertTrue(is_array_input(df))
+        self.assertFalse(is_array_input(['a']))
+
+    def test_ontosunburst_pandas_inputs(self):
+        fig = ontosunburst(interest_set=E_LST, abundances=E_LAB, reference_set=E_REF,
+                           ref_abundances=E_RAB, analysis=ENRICHMENT_A, ontology_dag_input=E_ONTO,
+                           input_root='00', write_output=False)
+        interest = pd.DataFrame({'id': E_LST, 'abundance': E_LAB})
+        reference = pd.Series(E_RAB, index=E_REF)
+        pd_fig = ontosunburst(interest_set=interest, reference_set=reference,
+                              analysis=ENRICHMENT_A, ontology_dag_input=E_ONTO, input_root='00',
+                              write_output=False)
+        self.assertEqual(json.loads(pd_fig.to_json()), json.loads(fig.to_json()))
+        np_fig = ontosunburst(interest_set=np.array(E_LST), abundances=np.array(E_LAB),
+                              reference_set=np.array(E_REF), ref_abundances=np.array(E_RAB),
+                              analysis=ENRICHMENT_A, ontology_dag_input=E_ONTO, input_root='00',
+                              write_output=False)
+        self.assertEqual(json.loads(np_fig.to_json()), json.loads(fig.to_json()))
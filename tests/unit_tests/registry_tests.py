@@ -0,0 +1,119 @@
+import unittest
+import os
+import tempfile
+
+from ontosunburst.registry import *
+from ontosunburst.ontosunburst import get_file, get_ontology_root, REGISTRY, EC, GO, \
+    CLASSES_SUFFIX, LABELS_SUFFIX
+
+"""
+Tests the ontologies registry : files indexed once, versions selection and pinning.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+FILES = ['onto__1-2__classes.json', 'onto__1-10__classes.json', 'onto__1-10__labels.json',
+         'onto__1-10__labels.lbl', 'dated__06feb25__classes.json', 'dated__10jan25__classes.json',
+         'README.md', 'tmp1234.tmp', '__init__.py']
+ROOTS = {'onto': 'root'}
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def write_files(directory, files, content='{}'):
+    for file in files:
+        with open(os.path.join(directory, file), 'w') as f:
+            f.write(content)
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestOntologyRegistry(unittest.TestCase):
+
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_files(tmp, FILES)
+            registry = OntologyRegistry([tmp], ROOTS)
+            self.assertEqual(registry.get_ontologies(), ['dated', 'onto'])
+            self.assertEqual(registry.get_versions('onto'), ['1-2', '1-10'])
+            entry = registry.get_entry('onto')
+            self.assertEqual((entry.name, entry.version, entry.root), ('onto', '1-10', 'root'))
+            self.assertEqual(sorted(entry.files), ['classes.json', 'labels.json'])
+            self.assertEqual(entry.artifacts,
+                             {'labels.lbl': os.path.join(tmp, 'onto__1-10__labels.lbl')})
+            self.assertEqual(entry.size, 4)
+            self.assertEqual(registry.get_entry('dated').version, '06feb25')
+            self.assertIsNone(registry.get_entry('dated').root)
+
+    def test_get_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_files(tmp, FILES)
+            registry = OntologyRegistry([tmp], ROOTS)
+            self.assertEqual(registry.get_file('onto', 'classes.json', '1-2'),
+                             os.path.join(tmp, 'onto__1-2__classes.json'))
+            self.assertIsNone(registry.get_file('onto', 'labels.json', '1-2'))
+            self.assertIsNone(registry.get_file('other', 'classes.json'))
+            with self.assertRaises(ValueError):
+                registry.get_entry('onto', '2-0')
+            with self.assertRaises(ValueError):
+                registry.get_root('dated')
+
+    def test_pin(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_files(tmp, FILES)
+            registry = OntologyRegistry([tmp], ROOTS)
+            registry.pin('onto', '1-2')
+            self.assertEqual(registry.get_entry('onto').version, '1-2')
+            self.assertEqual(registry.get_entry('onto', '1-10').version, '1-10')
+            with self.assertRaises(ValueError):
+                registry.pin('onto', '2-0')
+            registry.pin('onto', None)
+            self.assertEqual(registry.get_entry('onto').version, '1-10')
+
+    def test_add_directory(self):
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as user_tmp:
+            write_files(tmp, FILES)
+            write_files(user_tmp, ['onto__1-2__classes.json', 'mine__1__classes.json'])
+            registry = OntologyRegistry([tmp], ROOTS)
+            self.assertNotIn('mine', registry)
+            registry.add_directory(user_tmp, {'mine': 'mine_root'})
+            self.assertIn('mine', registry)
+            self.assertEqual(registry.get_root('mine'), 'mine_root')
+            self.assertEqual(registry.get_file('onto', 'classes.json', '1-2'),
+                             os.path.join(user_tmp, 'onto__1-2__classes.json'))
+            with self.assertRaises(ValueError):
+                registry.add_directory(os.path.join(tmp, 'missing'))
+
+    def test_refresh(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_files(tmp, FILES)
+            registry = OntologyRegistry([tmp], ROOTS)
+            self.assertEqual(registry.get_versions('onto'), ['1-2', '1-10'])
+            write_files(tmp, ['onto__2-0__classes.json'])
+            self.assertEqual(registry.get_entry('onto').version, '1-10')
+            registry.refresh()
+            self.assertEqual(registry.get_entry('onto').version, '2-0')
+
+    def test_version_key(self):
+        self.assertEqual(sorted(['26-0', '113-0', '3-1', '26-10'], key=get_version_key),
+                         ['3-1', '26-0', '26-10', '113-0'])
+        self.assertEqual(sorted(['06feb25', '239', '01mar24', '10jan25'], key=get_version_key),
+                         ['239', '01mar24', '10jan25', '06feb25'])
+
+
+class TestDefaultRegistry(unittest.TestCase):
+
+    def test_default_ontologies(self):
+        self.assertIn(EC, REGISTRY)
+        self.assertEqual(os.path.basename(get_file(EC, CLASSES_SUFFIX)),
+                         'ec__05feb25__classes.json')
+        self.assertEqual(get_file(EC, LABELS_SUFFIX, '05feb25'),
+                         REGISTRY.get_entry(EC).files[LABELS_SUFFIX])
+        self.assertIsNone(get_file(GO, LABELS_SUFFIX))
+        self.assertEqual(get_ontology_root(EC, None), 'Enzyme')
@@ -0,0 +1,213 @@
+import unittest
+import json
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from ontosunburst.server import *
+from ontosunburst.ontology_store import *
+from ontosunburst.ontosunburst import ontosunburst, _tree_analysis, ENRICHMENT_A, EC
+
+"""
+Tests the local ontology server and the loaded ontologies store.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+E_LST = ['02', '03', '04', '05', '08', '09']
+E_LAB = [23, 20, 1, 4, 1, 1]
+E_REF = ['01', '02', '03', '04', '05', '06', '07', '08', '09']
+E_RAB = [14, 26, 20, 10, 20, 5, 1, 1, 3]
+E_ONTO = {'01': ['00'], '02': ['00'], '03': ['00'], '04': ['00'], '05': ['01'],
+          '06': ['01'], '07': ['01'], '08': ['02'], '09': ['02']}
+E_LABElS = {'00': '0', '01': '1', '02': '2', '03': '3', '04': '4',
+            '05': '5', '06': '6', '07': '7', '08': '8', '09': '9'}
+E_ONTO_NAME = 'e_onto'
+
+E_REQUEST = {'ontology': E_ONTO_NAME, 'interest_set': E_LST, 'abundances': E_LAB,
+             'reference_set': E_REF, 'ref_abundances': E_RAB, 'analysis': ENRICHMENT_A}
+
+EC_LST = ['1.1.1.1', '1.1.1.2', '2.7.1.1', '3.1.1.1', '1.2.1.3']
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def post(server, request):
+    host, port = server.address
+    req = urllib.request.Request(f'http://{host}:{port}{SUNBURST_ROUTE}',
+                                 data=json.dumps(request).encode(), method='POST',
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req) as res:
+        return res.headers['Content-Type'], res.read()
+
+
+def get(server, route):
+    host, port = server.address
+    with urllib.request.urlopen(f'http://{host}:{port}{route}') as res:
+        return json.loads(res.read())
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestOntologyStore(unittest.TestCase):
+
+    def test_load_ontology(self):
+        loaded = load_ontology(ontology_dag_input=E_ONTO, input_root='00',
+                               id_to_label_input=E_LABElS, precompute=True)
+        self.assertEqual(loaded.root, '00')
+        self.assertEqual(loaded.get_stats(), {'name': None, 'root': '00', 'classes': 9,
+                                              'labels': 10, 'ancestors': 9})
+        self.assertEqual(loaded.ancestors['05'], {'00', '01'})
+
+    def test_get_loaded_ontology(self):
+        clear_loaded_ontologies()
+        loaded = get_loaded_ontology(EC)
+        self.assertIs(get_loaded_ontology(EC), loaded)
+        self.assertIsNot(get_loaded_ontology(EC, labels=False), loaded)
+        self.assertIsNone(get_loaded_ontology(EC, labels=False).labels)
+        clear_loaded_ontologies()
+        self.assertIsNot(get_loaded_ontology(EC), loaded)
+        loaded = get_loaded_ontology(EC)
+        self.assertFalse(is_outdated(loaded))
+        with patch('ontosunburst.ontology_store.get_ontology_files', return_value=['other.json']):
+            self.assertTrue(is_outdated(loaded))
+        with patch('ontosunburst.ontology_store.get_files_fingerprint', return_value='modified'):
+            self.assertIsNot(get_loaded_ontology(EC), loaded)
+        clear_loaded_ontologies()
+
+
+class TestOntologyServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = OntologyServer(port=0, workers=2)
+        cls.server.add_ontology(E_ONTO_NAME, load_ontology(
+            ontology_dag_input=E_ONTO, input_root='00', id_to_label_input=E_LABElS))
+        cls.thread = threading.Thread(target=cls.server.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def test_sunburst_json(self):
+        content_type, body = post(self.server, E_REQUEST)
+        self.assertEqual(content_type, FORMATS[JSON_F])
+        fig = ontosunburst(interest_set=E_LST, abundances=E_LAB, reference_set=E_REF,
+                           ref_abundances=E_RAB, analysis=ENRICHMENT_A, input_root='00',
+                           ontology_dag_input=E_ONTO, id_to_label_input=E_LABElS,
+                           write_output=False)
+        self.assertEqual(json.loads(body)['data'], json.loads(fig.to_json())['data'])
+
+    def test_sunburst_html(self):
+        content_type, body = post(self.server, {**E_REQUEST, 'format': HTML_F,
+                                                'kwargs': {'title': 'Served'}})
+        self.assertEqual(content_type, FORMATS[HTML_F])
+        self.assertIn(b'Served', body)
+
+    def test_sunburst_table(self):
+        content_type, body = post(self.server, {**E_REQUEST, 'format': TABLE_F})
+        table = json.loads(body)
+        loaded = self.server.get_ontology(E_ONTO_NAME)
+        tree_data, significant, ref_set = _tree_analysis(
+            analysis=ENRICHMENT_A, interest_concepts=E_LST, abundances=E_LAB, scores=None,
+            reference_concepts=E_REF, ref_abundances=E_RAB, ontology_dag=loaded.dag,
+            id_to_label=loaded.labels, test=BINOMIAL_TEST, root=loaded.root, root_cut=ROOT_CUT,
+            path_cut=PATH_UNCUT, ref_base=False, show_leaves=False)
+        self.assertEqual(table['sectors'], json.loads(json.dumps(get_sectors_table(tree_data))))
+        self.assertEqual(table['significant'], significant)
+        self.assertEqual(table['sectors']['Label'][0], '1')
+
+    def test_default_ontology_loaded_at_first_request(self):
+        content_type, body = post(self.server, {'ontology': EC, 'interest_set': EC_LST,
+                                                'format': TABLE_F})
+        self.assertIn(EC, get(self.server, ONTOLOGIES_ROUTE))
+        self.assertGreater(get(self.server, ONTOLOGIES_ROUTE)[EC]['ancestors'], 0)
+        self.assertIn('1.1.1.-', json.loads(body)['sectors']['Onto ID'])
+
+    def test_loading_does_not_block_other_ontologies(self):
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_load(name, precompute=False):
+            if name == 'slow':
+                loading.set()
+                release.wait(10)
+            return LoadedOntology(E_ONTO, '00', name=name)
+
+        with patch('ontosunburst.server.load_ontology', slow_load), \
+                patch('ontosunburst.server.is_default_ontology', return_value=True), \
+                ThreadPoolExecutor(3) as executor:
+            slow = [executor.submit(self.server.get_ontology, 'slow') for _ in range(2)]
+            self.assertTrue(loading.wait(10))
+            try:
+                self.assertEqual(self.server.get_ontology(E_ONTO_NAME).root, '00')
+                self.assertEqual(executor.submit(self.server.get_ontology, 'fast')
+                                 .result(timeout=10).name, 'fast')
+                self.assertFalse(any(f.done() for f in slow))
+            finally:
+                release.set()
+            self.assertIs(slow[0].result(), slow[1].result())
+        for name in ['slow', 'fast']:
+            self.server.ontologies.pop(name)
+
+    def test_bad_requests(self):
+        for request in [{'interest_set': E_LST}, {'ontology': E_ONTO_NAME},
+                        {**E_REQUEST, 'format': 'png'}, {**E_REQUEST, 'title': 'x'},
+                        {**E_REQUEST, 'ontology': 'unknown'}]:
+            with self.subTest(request=request):
+                with self.assertRaises(urllib.error.HTTPError) as e:
+                    post(self.server, request)
+                self.assertEqual(e.exception.code, 400)
+
+    def test_unknown_ontology_no_lock(self):
+        locks = self.server._OntologyServer__loading
+        n_locks = len(locks)
+        for i in range(10):
+            with self.subTest(i=i):
+                with self.assertRaises(urllib.error.HTTPError) as e:
+                    post(self.server, {**E_REQUEST, 'ontology': f'unknown_{i}'})
+                self.assertEqual(e.exception.code, 400)
+        self.assertEqual(len(locks), n_locks)
+        self.assertNotIn('unknown_0', self.server.ontologies)
+
+    def test_concurrent_requests_stats(self):
+        before = get(self.server, STATS_ROUTE)
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: post(self.server, E_REQUEST), range(8)))
+        self.assertEqual(len({r[1] for r in results}), 1)
+        stats = get(self.server, STATS_ROUTE)
+        self.assertEqual(stats['received'] - before['received'], 8)
+        self.assertEqual(stats['completed'] - before['completed'], 8)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['running'], 0)
+        self.assertGreater(stats['latency']['max'], 0)
+        self.assertGreaterEqual(stats['queue wait']['p95'], 0)
+
+
+class TestServerStats(unittest.TestCase):
+
+    def test_stats(self):
+        stats = ServerStats()
+        self.assertEqual(stats.to_dict()['latency'], {'mean': None, 'p50': None, 'p95': None,
+                                                      'max': None})
+        stats.on_submit()
+        stats.on_submit()
+        self.assertEqual(stats.to_dict()['queued'], 2)
+        stats.on_start(0.5)
+        stats.on_end(2.0, True)
+        stats.on_start(0.1)
+        stats.on_end(1.0, False)
+        res = stats.to_dict()
+        self.assertEqual((res['received'], res['queued'], res['running'], res['completed'],
+                          res['failed']), (2, 0, 0, 1, 1))
+        self.assertEqual(res['latency']['max'], 2.0)
+        self.assertAlmostEqual(res['queue wait']['mean'], 0.3)
@@ -0,0 +1,211 @@
+import unittest
+import os
+import io
+import gc
+import pickle
+import tempfile
+import multiprocessing
+from contextlib import redirect_stdout
+
+from ontosunburst.shared_ontology import *
+from ontosunburst.ontology_store import LoadedOntology, get_loaded_ontology, \
+    clear_loaded_ontologies
+from ontosunburst.ontosunburst import EC
+from ontosunburst.onto2dag import ontology_to_weighted_dag, reduce_d_ontology, get_ancestors
+from ontosunburst.dag2tree import get_children_dict
+
+"""
+Tests the shared ontology file : published once, attached read-only by processes.
+"""
+
+# ==================================================================================================
+# GLOBAL
+# ==================================================================================================
+
+ROOT = 'root'
+ONTO_DAG = {'a': ['ab'], 'b': ['ab'], 'c': ['cde', 'cf'], 'd': ['cde'], 'e': ['cde', 'eg'],
+            'f': ['cf'], 'g': ['gh', 'eg'], 'h': ['gh'],
+            'ab': [ROOT], 'cde': ['cdecf', 'cdeeg'], 'cf': ['cdecf'],
+            'eg': [ROOT, 'cdeeg'], 'gh': [ROOT],
+            'cdecf': [ROOT], 'cdeeg': ['cdeeg+'], 'cdeeg+': [ROOT]}
+LABELS = {'a': 'A', 'cde': 'CDE', 'é': 'accent'}
+CPT_LST = ['a', 'b', 'c', 'g', 'cde', 'unknown']
+CPT_AB = [1, 2, 3, 4, 5, 6]
+
+
+# ==================================================================================================
+# FUNCTIONS UTILS
+# ==================================================================================================
+
+def get_weights(loaded, show_leaves=True):
+    with redirect_stdout(io.StringIO()):
+        return ontology_to_weighted_dag(CPT_LST, CPT_AB, ROOT, loaded.dag, show_leaves,
+                                        index=loaded.index)
+
+
+def get_shared_stats(shared):
+    return type(shared).__name__, len(shared.dag)
+
+
+def get_worker_ontology(ontology):
+    loaded = get_loaded_ontology(ontology)
+    return type(loaded).__name__, loaded.get_stats()
+
+
+# ==================================================================================================
+# UNIT TESTS
+# ==================================================================================================
+
+class TestSharedOntology(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'onto' + SHARED_EXT)
+        self.loaded = LoadedOntology(ONTO_DAG, ROOT, LABELS, name='onto')
+
+    def tearDown(self):
+        detach_ontology(self.path)
+        self.tmp.cleanup()
+
+    def test_publish_attach(self):
+        self.assertEqual(publish_ontology(self.loaded, self.path), self.path)
+        shared = attach_ontology(self.path)
+        self.assertIs(attach_ontology(self.path), shared)
+        self.assertEqual((shared.name, shared.root), ('onto', ROOT))
+        self.assertEqual(dict(shared.dag), ONTO_DAG)
+        self.assertEqual(list(shared.dag), list(ONTO_DAG))
+        self.assertIn('cdeeg+', shared.dag)
+        self.assertNotIn(ROOT, shared.dag)
+        self.assertNotIn('unknown', shared.dag)
+        self.assertEqual(dict(shared.labels), LABELS)
+        self.assertEqual(shared.index.ids[:], self.loaded.index.ids)
+        self.assertEqual(dict(shared.index.positions), self.loaded.index.positions)
+        self.assertFalse(shared.index.parents_indices.flags.writeable)
+
+    def test_ancestors(self):
+        publish_ontology(self.loaded, self.path)
+        shared = attach_ontology(self.path)
+        self.assertEqual(len(shared.ancestors), len(ONTO_DAG))
+        self.assertEqual(dict(shared.ancestors), {c: get_ancestors(c, ONTO_DAG, ROOT, dict())
+                                                  for c in ONTO_DAG})
+        self.assertEqual(shared.precompute_ancestors(), len(ONTO_DAG))
+
+    def test_missing_parent(self):
+        loaded = LoadedOntology({'a': ['b'], 'b': ['missing'], 'c': [ROOT]}, ROOT)
+        publish_ontology(loaded, self.path)
+        shared = attach_ontology(self.path)
+        with self.assertRaises(KeyError):
+            shared.index.get_closure(shared.index.positions['a'])
+        self.assertEqual(shared.get_stats()['ancestors'], 1)
+
+    def test_pipeline(self):
+        publish_ontology(self.loaded, self.path)
+        shared = attach_ontology(self.path)
+        for show_leaves in [False, True]:
+            with self.subTest(show_leaves=show_leaves):
+                weights = get_weights(shared, show_leaves)
+                wanted = get_weights(self.loaded, show_leaves)
+                self.assertEqual(list(weights.items()), list(wanted.items()))
+                reduced = reduce_d_ontology(shared.dag, weights, shared.index)
+                self.assertEqual(list(reduced.items()),
+                                 list(reduce_d_ontology(ONTO_DAG, wanted).items()))
+        children_dict = shared.index.get_children_dict()
+        wanted = get_children_dict(ONTO_DAG)
+        self.assertEqual({c: ch for c, ch in children_dict.items() if c in wanted}, wanted)
+
+    def test_pickle(self):
+        publish_ontology(self.loaded, self.path)
+        shared = attach_ontology(self.path)
+        self.assertLess(len(pickle.dumps(shared)), 1000)
+        self.assertIs(pickle.loads(pickle.dumps(shared)), shared)
+        self.assertIs(pickle.loads(pickle.dumps(shared.dag)), shared.dag)
+        # Published again from another ontology : attached ontology no more valid
+        publish_ontology(LoadedOntology({'x': [ROOT]}, ROOT), self.path)
+        detach_ontology(self.path)
+        with self.assertRaises(ValueError):
+            pickle.loads(pickle.dumps(shared))
+
+    def test_published_again(self):
+        publish_ontology(self.loaded, self.path)
+        shared = attach_ontology(self.path)
+        publish_ontology(LoadedOntology({'x': [ROOT]}, ROOT), self.path)
+        other = attach_ontology(self.path)
+        self.assertIsNot(other, shared)
+        self.assertEqual(dict(other.dag), {'x': [ROOT]})
+        self.assertEqual(dict(shared.dag), ONTO_DAG)
+        self.assertIs(attach_ontology(self.path), other)
+        # Removed file : attached ontology kept
+        os.remove(self.path)
+        self.assertIs(attach_ontology(self.path), other)
+
+    def test_not_shared_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a shared ontology')
+        with self.assertRaises(ValueError):
+            attach_ontology(self.path)
+
+
+class TestSharedPositions(unittest.TestCase):
+
+    def test_get_positions(self):
+        loaded = LoadedOntology(ONTO_DAG, ROOT)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = publish_ontology(loaded, os.path.join(tmp, 'onto' + SHARED_EXT))
+            positions = attach_ontology(path).index.positions
+            self.assertEqual(positions.get_positions(['cdeeg', 'a', ROOT]).tolist(),
+                             [loaded.index.positions[c] for c in ['cdeeg', 'a', ROOT]])
+            self.assertEqual(len(positions.get_positions([])), 0)
+            for missing in [['a', 'ab+'], ['a', 'much longer than all IDs']]:
+                with self.subTest(missing=missing), self.assertRaises(KeyError):
+                    positions.get_positions(missing)
+            self.assertIsNone(positions.get('cdeeg++'))
+            self.assertIsNone(positions.get(1))
+            detach_ontology(path)
+
+
+class TestPreload(unittest.TestCase):
+
+    def tearDown(self):
+        clear_loaded_ontologies()
+
+    def test_preload(self):
+        with preload([EC], freeze=False) as preloaded:
+            shared = preloaded[EC]
+            self.assertIsInstance(shared, SharedOntology)
+            self.assertTrue(os.path.exists(shared.path))
+        self.assertFalse(os.path.exists(shared.path))
+        self.assertIs(get_loaded_ontology(EC), shared)
+        self.assertEqual(shared.get_stats()['ancestors'], len(shared.dag))
+        self.assertEqual(shared.labels['1.1.1.1'], 'alcohol dehydrogenase.')
+        detach_ontology(shared.path)
+
+    def test_preload_spawn(self):
+        with preload([EC], freeze=False) as preloaded:
+            shared = preloaded[EC]
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                stats = pool.apply(get_shared_stats, (shared,))
+            self.assertEqual(stats, ('SharedOntology', len(shared.dag)))
+        detach_ontology(shared.path)
+
+    def test_preload_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shared = preload([EC], labels=False, directory=tmp, freeze=False)[EC]
+            self.assertEqual(shared.path, os.path.join(tmp, EC + SHARED_EXT))
+            self.assertIsNone(shared.labels)
+            self.assertIs(get_loaded_ontology(EC, labels=False), shared)
+            self.assertIs(pickle.loads(pickle.dumps(shared)), shared)
+            detach_ontology(shared.path)
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'needs fork')
+    def test_preload_fork(self):
+        preloaded = preload([EC])
+        shared = preloaded[EC]
+        try:
+            self.assertGreater(gc.get_freeze_count(), 0)
+            with multiprocessing.get_context('fork').Pool(2) as pool:
+                results = pool.map(get_worker_ontology, [EC] * 2)
+            self.assertEqual(results, [('SharedOntology', shared.get_stats())] * 2)
+        finally:
+            gc.unfreeze()
+            preloaded.close()
+            detach_ontology(shared.path)
@@ -4,8 +4,11 @@ import unittest
 import io
 import sys
 import copy
+import math
+import tempfile
 from functools import wraps
 from unittest.mock import patch
+import plotly.express as px
 
 from ontosunburst.tree2sunburst import *
 
@@ -299,3 +302,59 @@ class TestSunburstFigure(unittest.TestCase):
         w_fig_file = os.path.join('test_files', 'fig_case4.json')
         # save_fig_json(fig, w_fig_file)
         self.assertTrue(are_fig_dict_equals(fig, w_fig_file))
+
+
+class TestSunburstSvg(unittest.TestCase):
+
+    @test_for(get_svg_sectors)
+    def test_get_svg_sectors(self):
+        data = copy.deepcopy(E_DATA)
+        sectors, center, nb_rings = get_svg_sectors(data, 7)
+        self.assertIsNone(center)
+        self.assertEqual(nb_rings, 3)
+        spans = {data.onto_ids[i]: (depth, span) for i, depth, start, span in sectors}
+        self.assertEqual(spans['00'][0], 0)
+        self.assertAlmostEqual(spans['00'][1], 2 * math.pi)
+        self.assertEqual(spans['01'][0], 1)
+        self.assertAlmostEqual(spans['01'][1], 2 * math.pi * 0.4)
+        self.assertAlmostEqual(spans['05'][1], 2 * math.pi * 0.2)
+
+    @test_for(get_svg_sectors)
+    def test_get_svg_sectors_max_depth(self):
+        data = copy.deepcopy(E_DATA)
+        sectors, center, nb_rings = get_svg_sectors(data, 2)
+        self.assertEqual(nb_rings, 2)
+        self.assertEqual({data.onto_ids[i] for i, _, _, _ in sectors},
+                         {'00', '01', '02', '03', '04'})
+
+    @test_for(get_svg_sectors)
+    def test_get_svg_sectors_root_cut(self):
+        data = copy.deepcopy(E_DATA)
+        data.cut_root(ROOT_CUT)
+        sectors, center, nb_rings = get_svg_sectors(data, 7)
+        self.assertEqual(center, '0')
+        self.assertEqual(len(sectors), 9)
+        top_spans = sum(span for _, depth, _, span in sectors if depth == 1)
+        self.assertAlmostEqual(top_spans, 2 * math.pi)
+
+    @test_for(get_svg_color)
+    def test_get_svg_color(self):
+        colorscale = get_svg_colorscale('Viridis')
+        self.assertEqual(get_svg_color(1, 1, 10, colorscale), 'rgb(68,1,84)')
+        self.assertEqual(get_svg_color(10, 1, 10, colorscale), 'rgb(253,231,37)')
+        self.assertEqual(get_svg_color(20, 1, 10, colorscale), 'rgb(253,231,37)')
+        self.assertEqual(get_svg_color(nan, 1, 10, colorscale), SVG_NAN_COLOR)
+        self.assertEqual(get_svg_colorscale('RdBu_r')[0], [0.0, 'rgb(5,48,97)'])
+
+    @test_for(generate_sunburst_svg)
+    def test_generate_sunburst_svg(self):
+        data = copy.deepcopy(MC_DATA)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'case_svg')
+            svg = generate_sunburst_svg(data, output, analysis=TOPOLOGY_A, title='SVG title')
+            with open(output + '.svg', 'r') as f:
+                self.assertEqual(f.read(), svg)
+        self.assertTrue(svg.startswith('<svg'))
+        self.assertTrue(svg.endswith('</svg>'))
+        self.assertIn('SVG title', svg)
+        self.assertEqual(svg.count('<path'), data.len)